@@ -2,13 +2,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import threading
 import time
 import logging
 from datetime import datetime
 
 import chess
-import numpy as np
-import torch
 from flask import (
     Flask, redirect, url_for,
     session, request, jsonify
@@ -19,8 +18,9 @@ from flask_cors import CORS
 from flask_migrate import Migrate
 from flask_dance.contrib.google import make_google_blueprint, google
 
-from chess_engine import find_best_move
-from neural_model import load_model, serialize_board
+from chess_engine import Search, allocate_move_time, DEFAULT_OPTIONS
+from evaluation import explain_board
+from lazy_smp import parallel_search, SEARCH_THREADS
 from opening_book import get_book_move
 
 # --------------------
@@ -307,30 +307,188 @@ def delete_game(game_id):
     return jsonify({"message": "Game deleted"})
 
 # --------------------
-# Load Neural Model
+# Neural engines
 # --------------------
-device       = "cuda" if torch.cuda.is_available() else "cpu"
-model_path   = os.getenv("NEURAL_MODEL_PATH", "nets/value.pth")
-neural_model = load_model(model_path, device=device)
+# torch, NumPy and the networks are imported and loaded on the first request
+# that needs them, so minimax and book moves never pay for them. With
+# NEURAL_PRELOAD=1 the value network is loaded at import instead, as the
+# gunicorn master does so its workers share it (see gunicorn.conf.py).
+model_path    = os.getenv("NEURAL_MODEL_PATH", "nets/value.pth")
+# "fp32", "torchscript" or "int8" (see export_model.py)
+model_variant = os.getenv("NEURAL_MODEL_VARIANT", "fp32")
+nnue_path     = os.getenv("NNUE_PATH", "nets/nnue.npz")
+
+# Value network inference queue, MCTS trees and NNUE network, once loaded
+neural_service = None
+mcts_trees     = None
+nnue_net       = None
+_neural_lock   = threading.Lock()
+
+
+class NeuralUnavailable(Exception):
+    """A neural engine cannot run: its weights are missing or unusable here."""
+
+
+def get_neural_service():
+    """The value network's inference queue, loading the network on first use."""
+    global neural_service
+    if neural_service is not None:
+        return neural_service
+    with _neural_lock:
+        if neural_service is None:
+            if not os.path.exists(model_path):
+                raise NeuralUnavailable(f"Neural network weights not found at {model_path}")
+            import torch
+            from inference import InferenceService
+            from neural_model import load_model, predict_values
+
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            # Memory-mapped, so forked gunicorn workers share the weights
+            try:
+                model = load_model(model_path, device=device, variant=model_variant, mmap=True)
+            except ValueError as e:
+                # A variant this device cannot run, e.g. int8 on CUDA
+                raise NeuralUnavailable(str(e)) from e
+            # Positions from concurrent neural requests share forward passes
+            neural_service = InferenceService(lambda positions: predict_values(model, positions, device))
+            logger.info("Loaded neural network %s (%s)", model_path, model_variant)
+        return neural_service
+
+
+def neural_leaf_values(boards):
+    """Network values (White's view) of `boards`, batched with concurrent requests."""
+    from serialization import serialize_boards
+    return get_neural_service().evaluate(serialize_boards(boards))
+
+
+def get_mcts_trees():
+    """MCTS trees of recent games, reused from move to move."""
+    global mcts_trees
+    with _neural_lock:
+        if mcts_trees is None:
+            from mcts import GameTrees
+            mcts_trees = GameTrees(neural_leaf_values)
+        return mcts_trees
+
+
+def get_nnue():
+    """The NNUE network (see train_nnue.py), or None when no weights have been trained."""
+    global nnue_net
+    with _neural_lock:
+        if nnue_net is None and os.path.exists(nnue_path):
+            import nnue
+            nnue_net = nnue.load(nnue_path)
+        return nnue_net
+
+
+def _compiles_on_load():
+    """Whether loading the network would compile it, running a forward pass."""
+    if model_variant == "fp32" or not os.path.exists(model_path):
+        return False
+    from neural_model import current_export
+    return current_export(model_path, model_variant) is None
+
+
+if os.getenv("NEURAL_PRELOAD") == "1":
+    if _compiles_on_load():
+        # Tracing runs the network, whose OpenMP threads would not survive
+        # a fork: leave compiling to each process on first use
+        logger.warning("No up-to-date %s export of %s (see export_model.py); not preloading it",
+                       model_variant, model_path)
+    else:
+        try:
+            get_neural_service()
+        except NeuralUnavailable as e:
+            logger.warning("%s; neural engines are disabled until they exist", e)
 
 # --------------------
 # Chess Move Endpoint with timing
 # --------------------
+def _search_limit(data, name, default=None):
+    """data[name] as a positive integer, None when absent; ValueError otherwise."""
+    value = data.get(name, default)
+    if value is None:
+        return None
+    try:
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError
+        value = int(value)
+    except (ValueError, OverflowError):
+        raise ValueError(f"{name} must be a positive integer") from None
+    if value < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return value
+
+
+def _search_options(data):
+    """data["options"] checked against the search's switches; ValueError otherwise."""
+    options = data.get("options")
+    if options is None:
+        return None
+    if not isinstance(options, dict):
+        raise ValueError("options must be an object of search switches")
+    unknown = sorted(set(options) - set(DEFAULT_OPTIONS))
+    if unknown:
+        raise ValueError(f"Unknown options: {', '.join(unknown)}")
+    flags = sorted(k for k, v in options.items() if not isinstance(v, bool))
+    if flags:
+        raise ValueError(f"Options must be true or false: {', '.join(flags)}")
+    return options
+
+
 @app.route("/api/chess/move", methods=["POST"])
 def chess_move():
     data   = request.get_json() or {}
     fen    = data.get("fen")
-    depth  = data.get("depth", 3)
     engine = data.get("engine", "minimax")
     use_book = data.get("use_book", True)
+    game_id     = data.get("game_id")
+    want_stats  = data.get("stats", False)
+    try:
+        options     = _search_options(data)
+        depth       = _search_limit(data, "max_depth", data.get("depth"))
+        movetime_ms = _search_limit(data, "movetime_ms")
+        max_nodes   = _search_limit(data, "max_nodes")
+        playouts    = _search_limit(data, "playouts")
+        threads     = min(_search_limit(data, "threads", SEARCH_THREADS), os.cpu_count() or 1)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     try:
         board = chess.Board(fen)
     except Exception:
         return jsonify({"error": "Invalid FEN"}), 400
 
+    # Budget the move from the side to move's clock when playing a timed game
+    if game_id is not None and movetime_ms is None:
+        game = Game.query.filter_by(id=game_id, user_id=session.get("user_id")).first()
+        if not game:
+            return jsonify({"error": "Game not found"}), 404
+        remaining = game.white_time if board.turn == chess.WHITE else game.black_time
+        if remaining is not None:
+            movetime_ms = allocate_move_time(remaining)
+
+    net = None
+    if engine == "nnue":
+        net = get_nnue()
+        if net is None:
+            return jsonify({"error": f"NNUE weights not found at {nnue_path}"}), 503
+    elif engine in ("neural", "neural_search", "mcts"):
+        try:
+            get_neural_service()
+        except NeuralUnavailable as e:
+            return jsonify({"error": str(e)}), 503
+
+    # Without any limit, keep the historical fixed depth of 3
+    if depth is None and movetime_ms is None and max_nodes is None:
+        depth = 3
+
     start = time.time()
     book_move_used = False
+    pv = []
+    stats = None
     
     try:
         # Try opening book first (for both engines)
@@ -342,20 +500,43 @@ def chess_move():
                 logger.info("Book move used: %s", book_move.uci())
         
         if not book_move_used:
-            if engine == "minimax":
-                best_move = find_best_move(board, depth)
+            if engine in ("minimax", "neural_search", "nnue"):
+                # neural_search: the same search with network-scored leaves;
+                # nnue: with the incrementally updated NNUE evaluation
+                leaf_evaluator = neural_leaf_values if engine == "neural_search" else None
+                if threads > 1 and leaf_evaluator is None and net is None:
+                    result = parallel_search(
+                        board, threads=threads, max_depth=depth,
+                        movetime_ms=movetime_ms, max_nodes=max_nodes, options=options,
+                    )
+                else:
+                    result = Search(
+                        max_depth=depth,
+                        movetime_ms=movetime_ms,
+                        max_nodes=max_nodes,
+                        options=options,
+                        leaf_evaluator=leaf_evaluator,
+                        nnue=net,
+                    ).run(board)
+                best_move = result.move
+                pv        = [m.uci() for m in result.pv]
+                stats     = result.stats.as_dict()
+            elif engine == "mcts":
+                result    = get_mcts_trees().get(game_id).search(
+                    board, playouts=playouts, movetime_ms=movetime_ms,
+                )
+                best_move = result.move
+                pv        = [m.uci() for m in result.pv]
+                stats     = dict(result.stats, value=result.value)
             else:
                 # Neural network path
                 moves  = list(board.legal_moves)
                 boards = []
                 for m in moves:
                     board.push(m)
-                    boards.append(serialize_board(board))
+                    boards.append(board.copy(stack=False))
                     board.pop()
-                arr    = np.stack(boards)
-                tensor = torch.tensor(arr, dtype=torch.float32).view(-1,1,8,8).to(device)
-                with torch.no_grad():
-                    vals = neural_model(tensor).cpu().numpy().flatten()
+                vals       = neural_leaf_values(boards)
                 idx        = vals.argmax() if board.turn else vals.argmin()
                 best_move  = moves[idx]
     except Exception as e:
@@ -364,19 +545,63 @@ def chess_move():
 
     elapsed = time.time() - start
     logger.info(
-        "Engine=%s depth=%d fen=%s took %.2fs book=%s",
-        engine, depth, fen, elapsed, book_move_used
+        "Engine=%s depth=%s movetime_ms=%s max_nodes=%s threads=%d fen=%s took %.2fs book=%s",
+        engine, depth, movetime_ms, max_nodes, threads, fen, elapsed, book_move_used
     )
 
+    if stats is not None:
+        fields = {k: v for k, v in stats.items() if k != "iterations"}
+        logger.info(
+            "Search stats %s",
+            " ".join(f"{k}={v}" for k, v in fields.items()),
+            extra={"search_stats": stats},
+        )
+
     if best_move is None:
         return jsonify({"error": "No valid move"}), 500
 
-    return jsonify({
+    response = {
         "move": best_move.uci(),
         "from_book": book_move_used,
+        "pv": pv,
         "time_taken": round(elapsed, 3)
+    }
+    if want_stats:
+        response["stats"] = stats
+    return jsonify(response)
+
+# --------------------
+# Evaluation breakdown
+# --------------------
+@app.route("/api/eval/explain", methods=["GET", "POST"])
+def explain_eval():
+    data = request.get_json(silent=True) or {}
+    fen  = data.get("fen") or request.args.get("fen")
+    if not fen:
+        return jsonify({"error": "fen is required"}), 400
+    try:
+        board = chess.Board(fen)
+    except Exception:
+        return jsonify({"error": "Invalid FEN"}), 400
+
+    score, terms, times = explain_board(board)
+    return jsonify({
+        "fen": board.fen(),
+        "score": score,
+        "terms": terms,
+        "time_us": {term: round(t * 1e6, 1) for term, t in times.items()},
     })
 
+# --------------------
+# Neural inference queue stats
+# --------------------
+@app.route("/api/inference/stats")
+def inference_stats():
+    if neural_service is None:
+        # Nothing has used the network yet
+        return jsonify({"loaded": False, "queue_depth": 0, "batches": 0, "requests": 0, "positions": 0})
+    return jsonify(dict(neural_service.stats(), loaded=True))
+
 # --------------------
 # Main
 # --------------------
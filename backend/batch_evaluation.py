@@ -0,0 +1,292 @@
+"""
+Vectorized handcrafted evaluation of many positions at once.
+
+Piece bitboards are unpacked into an (N, 12, 64) array and every term of
+evaluation.evaluate_board is computed with array operations, giving the
+same scores. Game-ending positions are screened with array operations too:
+only boards where no legal move is found that way fall back to python-chess
+move generation.
+"""
+import argparse
+import random
+import time
+
+import chess
+import numpy as np
+
+from evaluation import (
+    evaluate_board,
+    _MG_TABLES, _EG_TABLES, PHASE_WEIGHTS, TOTAL_PHASE, PASSED_PAWN_BONUS,
+    DOUBLED_PAWN_PENALTY, ISOLATED_PAWN_PENALTY, KING_SHIELD_BONUS, CENTER_BONUS,
+    BISHOP_PAIR_BONUS,
+)
+from serialization import PLANES, board_bitboards, board_planes
+
+# Every linear term is one column of a (12 * 64, K) matrix, so a single
+# product of the flattened planes gives them all. Values are small
+# integers, exact in float32.
+_COL_MG, _COL_EG, _COL_PHASE, _COL_MOBILITY, _COL_LIGHT_BISHOPS = range(5)
+_COL_COUNTS = slice(5, 17)       # pieces per plane
+_COL_FILES  = slice(17, 33)      # White then Black pawns per file
+
+
+def _linear_terms():
+    columns = np.zeros((12, 64, 33), dtype=np.float32)
+    for plane, (color, pt) in enumerate(PLANES):
+        sign = 1 if color == chess.WHITE else -1
+        for sq in chess.SQUARES:
+            file, rank = chess.square_file(sq), chess.square_rank(sq)
+            column = columns[plane, sq]
+            column[_COL_MG] = _MG_TABLES[color][pt][sq]
+            column[_COL_EG] = _EG_TABLES[color][pt][sq]
+            column[_COL_PHASE] = PHASE_WEIGHTS[pt]
+            # Pieces other than pawns and kings on the central squares
+            if pt not in (chess.PAWN, chess.KING) and 2 <= file <= 5 and 2 <= rank <= 5:
+                column[_COL_MOBILITY] = sign * CENTER_BONUS
+            if pt == chess.BISHOP and chess.BB_SQUARES[sq] & chess.BB_LIGHT_SQUARES:
+                column[_COL_LIGHT_BISHOPS] = 1
+            column[_COL_COUNTS.start + plane] = 1
+            if pt == chess.PAWN:
+                column[_COL_FILES.start + (0 if color == chess.WHITE else 8) + file] = 1
+    return columns.reshape(12 * 64, -1)
+
+
+_LINEAR = _linear_terms()
+
+
+def _shield_masks(color):
+    """[king square, square]: 1 where a pawn of `color` shields that king."""
+    masks = np.zeros((64, 64), dtype=np.float32)
+    step  = 1 if color == chess.WHITE else -1
+    for k in chess.SQUARES:
+        rank = chess.square_rank(k) + step
+        if 0 <= rank <= 7:
+            for f in range(max(0, chess.square_file(k) - 1), min(8, chess.square_file(k) + 2)):
+                masks[k, chess.square(f, rank)] = 1
+    return masks
+
+
+def _blocker_masks(color):
+    """[enemy pawn square, pawn square]: 1 where the enemy pawn stops it passing."""
+    masks = np.zeros((64, 64), dtype=np.float32)
+    for s in chess.SQUARES:
+        for e in chess.SQUARES:
+            ahead = (chess.square_rank(e) > chess.square_rank(s) if color == chess.WHITE
+                     else chess.square_rank(e) < chess.square_rank(s))
+            if ahead and abs(chess.square_file(e) - chess.square_file(s)) <= 1:
+                masks[e, s] = 1
+    return masks
+
+
+_SHIELD  = {color: _shield_masks(color) for color in chess.COLORS}
+_BLOCKER = {color: _blocker_masks(color) for color in chess.COLORS}
+_PASSED_BONUS = {
+    chess.WHITE: np.array([PASSED_PAWN_BONUS[chess.square_rank(sq)] for sq in chess.SQUARES], dtype=np.float32),
+    chess.BLACK: np.array([PASSED_PAWN_BONUS[7 - chess.square_rank(sq)] for sq in chess.SQUARES], dtype=np.float32),
+}
+
+
+_NOT_A  = np.uint64(~chess.BB_FILE_A & chess.BB_ALL)
+_NOT_H  = np.uint64(~chess.BB_FILE_H & chess.BB_ALL)
+_NOT_AB = np.uint64(~(chess.BB_FILE_A | chess.BB_FILE_B) & chess.BB_ALL)
+_NOT_GH = np.uint64(~(chess.BB_FILE_G | chess.BB_FILE_H) & chess.BB_ALL)
+_ALL    = np.uint64(chess.BB_ALL)
+
+# (shift, mask applied after shifting); positive shifts go up the board
+_ORTHOGONAL = [(8, _ALL), (-8, _ALL), (1, _NOT_A), (-1, _NOT_H)]
+_DIAGONAL   = [(9, _NOT_A), (7, _NOT_H), (-7, _NOT_A), (-9, _NOT_H)]
+_KNIGHT     = [(17, _NOT_A), (15, _NOT_H), (10, _NOT_AB), (6, _NOT_GH),
+               (-6, _NOT_AB), (-10, _NOT_GH), (-15, _NOT_A), (-17, _NOT_H)]
+
+
+def _shift(bb, n):
+    return bb << np.uint64(n) if n > 0 else bb >> np.uint64(-n)
+
+
+def _steps(bb, directions):
+    attacks = np.zeros_like(bb)
+    for n, mask in directions:
+        attacks |= _shift(bb, n) & mask
+    return attacks
+
+
+def _slides(bb, empty, directions):
+    """Sliding attacks of `bb` through `empty` squares (Kogge-Stone fill)."""
+    attacks = np.zeros_like(bb)
+    for n, mask in directions:
+        gen, pro = bb, empty & mask
+        for step in (n, 2 * n, 4 * n):
+            gen = gen | (pro & _shift(gen, step))
+            pro = pro & _shift(pro, step)
+        attacks |= _shift(gen, n) & mask
+    return attacks
+
+
+def _attacks(bb, white, empty):
+    """
+    Squares attacked by the pieces in `bb` (N, 6 bitboards); `white` says
+    per board which way its pawns capture.
+    """
+    pawns, knights, bishops, rooks, queens, kings = (bb[:, i] for i in range(6))
+    pawn_attacks = np.where(
+        white,
+        _steps(pawns, [(7, _NOT_H), (9, _NOT_A)]),
+        _steps(pawns, [(-9, _NOT_H), (-7, _NOT_A)]),
+    )
+    return (pawn_attacks | _steps(knights, _KNIGHT)
+            | _steps(kings, _ORTHOGONAL + _DIAGONAL)
+            | _slides(rooks | queens, empty, _ORTHOGONAL)
+            | _slides(bishops | queens, empty, _DIAGONAL))
+
+
+def _pinned(king, own, empty, rook_sliders, bishop_sliders):
+    """Own pieces pinned to `king` by an enemy slider."""
+    pinned = np.zeros_like(king)
+    for directions, sliders in ((_ORTHOGONAL, rook_sliders), (_DIAGONAL, bishop_sliders)):
+        for direction in directions:
+            blocker = _slides(king, empty, [direction]) & own
+            beyond  = _slides(blocker, empty, [direction]) & sliders
+            pinned |= np.where(beyond != 0, blocker, np.uint64(0))
+    return pinned
+
+
+def _has_legal_move(bitboards, turns):
+    """
+    True where the side to move provably has a legal move: a king step to a
+    square the enemy doesn't attack (attacks computed with the king removed
+    so it can't hide behind itself), or, when not in check, any move of an
+    unpinned knight, slider or pawn push. False means "unknown".
+    """
+    turns   = turns[:, None]
+    mine    = np.where(turns, bitboards[:, :6], bitboards[:, 6:])
+    theirs  = np.where(turns, bitboards[:, 6:], bitboards[:, :6])
+    own     = np.bitwise_or.reduce(mine, axis=1)
+    king    = mine[:, 5]
+    occupied = own | np.bitwise_or.reduce(theirs, axis=1)
+    empty    = ~occupied & _ALL
+    turns    = turns[:, 0]
+
+    enemy_attacks = _attacks(theirs, ~turns, empty | king)
+    king_step = (_steps(king, _ORTHOGONAL + _DIAGONAL) & ~own & ~enemy_attacks) != 0
+
+    free = ~_pinned(king, own, empty, theirs[:, 3] | theirs[:, 4], theirs[:, 2] | theirs[:, 4])
+    pawns    = mine[:, 0] & free
+    pushes   = np.where(turns, pawns << np.uint64(8), pawns >> np.uint64(8)) & empty
+    targets  = (_steps(mine[:, 1] & free, _KNIGHT)
+                | _slides((mine[:, 3] | mine[:, 4]) & free, empty, _ORTHOGONAL)
+                | _slides((mine[:, 2] | mine[:, 4]) & free, empty, _DIAGONAL)) & ~own
+    in_check = (enemy_attacks & king) != 0
+    return king_step | (~in_check & ((pushes | targets) != 0))
+
+
+def _insufficient_material(counts, light_bishops):
+    """Board.is_insufficient_material() from piece counts, for every board."""
+    pawns   = counts[:, 0] + counts[:, 6]
+    knights = counts[:, 1] + counts[:, 7]
+    bishops = counts[:, 2] + counts[:, 8]
+    bishops_same_color = (light_bishops == 0) | (light_bishops == bishops)
+    result = np.ones(len(counts), dtype=bool)
+    for own, opp in ((0, 6), (6, 0)):
+        insufficient = np.select(
+            [counts[:, own] + counts[:, own + 3] + counts[:, own + 4] > 0,
+             counts[:, own + 1] > 0,
+             counts[:, own + 2] > 0],
+            [False,
+             (counts[:, own:own + 6].sum(axis=1) <= 2) & (counts[:, opp:opp + 4].sum(axis=1) == 0),
+             bishops_same_color & (pawns == 0) & (knights == 0)],
+            default=True,
+        )
+        result &= insufficient
+    return result
+
+
+def _pawn_structure(files, pawns, enemy, color):
+    """Doubled, isolated and passed pawn terms for one side, unsigned."""
+    neighbors = np.zeros_like(files)
+    neighbors[:, 1:]  += files[:, :-1]
+    neighbors[:, :-1] += files[:, 1:]
+    doubled  = np.where(files > 1, files, 0).sum(axis=1) * DOUBLED_PAWN_PENALTY
+    isolated = np.where(neighbors == 0, files, 0).sum(axis=1) * ISOLATED_PAWN_PENALTY
+    passed   = pawns * (enemy @ _BLOCKER[color] == 0)
+    return passed @ _PASSED_BONUS[color] - doubled - isolated
+
+
+def _king_shield(kings, pawns, has_king, color):
+    """Shield pawn count times KING_SHIELD_BONUS for one side; 0 without a king."""
+    shield = _SHIELD[color][kings.argmax(axis=1)]
+    return (pawns * shield).sum(axis=1) * KING_SHIELD_BONUS * has_king
+
+
+def evaluate_boards(boards):
+    """
+    Scores of many positions, identical to [evaluate_board(b) for b in boards]
+    as a float64 array (pawns, from White's perspective).
+    """
+    boards = list(boards)
+    if not boards:
+        return np.zeros(0)
+    bitboards = board_bitboards(boards)
+    x = board_planes(boards, bitboards).astype(np.float32)
+    terms  = (x.reshape(len(boards), -1) @ _LINEAR).astype(np.int64)
+    counts = terms[:, _COL_COUNTS]
+    files  = terms[:, _COL_FILES]
+
+    white_pawns, black_pawns = x[:, 0], x[:, 6]
+    mg = terms[:, _COL_MG]
+    mg = mg + _king_shield(x[:, 5], white_pawns, counts[:, 5] > 0, chess.WHITE)
+    mg = mg - _king_shield(x[:, 11], black_pawns, counts[:, 11] > 0, chess.BLACK)
+    phase = np.minimum(terms[:, _COL_PHASE], TOTAL_PHASE)
+
+    score  = (mg * phase + terms[:, _COL_EG] * (TOTAL_PHASE - phase)) // TOTAL_PHASE
+    score += _pawn_structure(files[:, :8], white_pawns, black_pawns, chess.WHITE).astype(np.int64)
+    score -= _pawn_structure(files[:, 8:], black_pawns, white_pawns, chess.BLACK).astype(np.int64)
+    score += terms[:, _COL_MOBILITY]
+    score += ((counts[:, 2] >= 2).astype(np.int64) - (counts[:, 8] >= 2)) * BISHOP_PAIR_BONUS
+    result = score / 100.0
+
+    # Game-ending positions, as in evaluate_board
+    result[_insufficient_material(counts, terms[:, _COL_LIGHT_BISHOPS])] = 0.0
+    turns = np.array([board.turn for board in boards])
+    for i in np.flatnonzero(~_has_legal_move(bitboards, turns)):
+        board = boards[i]
+        if not any(board.generate_legal_moves()):
+            if board.is_check():
+                result[i] = -10000 if board.turn == chess.WHITE else 10000
+            else:
+                result[i] = 0.0
+    return result
+
+
+def random_positions(count, seed=0, max_plies=150):
+    """Positions from random games, for tests and timing."""
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(0, max_plies)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        boards.append(board.copy(stack=False))
+    return boards
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch vs scalar evaluation timing")
+    parser.add_argument("--positions", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    boards = random_positions(args.positions, args.seed)
+    start  = time.perf_counter()
+    scalar = [evaluate_board(b) for b in boards]
+    scalar_s = time.perf_counter() - start
+    start  = time.perf_counter()
+    batch  = evaluate_boards(boards)
+    batch_s = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(scalar, batch))
+    print(f"{len(boards)} positions: scalar {scalar_s * 1000:.1f}ms, "
+          f"batch {batch_s * 1000:.1f}ms ({scalar_s / batch_s:.1f}x), {mismatches} mismatches")
+    raise SystemExit(1 if mismatches else 0)
@@ -0,0 +1,217 @@
+"""
+Fixed-position engine benchmark.
+
+Runs the minimax search over a curated set of tactical (WAC) and positional
+FENs at a fixed depth or fixed time per position. Reports nodes, NPS,
+time-to-depth and how many tactical positions were solved. Results can be
+written as a JSON baseline and compared against an earlier one; the run
+fails when NPS drops by more than the allowed threshold.
+
+    python bench.py --depth 3 --save baseline.json
+    python bench.py --depth 3 --baseline baseline.json --threshold 0.1
+
+With --startup it instead times the import of app.py in fresh interpreters,
+without and with the value network loaded at import (NEURAL_PRELOAD), and
+fails when the import without it misses STARTUP_TARGET_MS.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import chess
+
+from chess_engine import Search
+from transposition import TranspositionTable
+
+# (name, fen, best moves in SAN); positional entries have no best move
+POSITIONS = [
+    ("wac001", "2rr3k/pp3pp1/1nnqbN1p/3pN3/2pP4/2P3Q1/PPB4P/R4RK1 w - - 0 1", ["Qg6"]),
+    ("wac002", "8/7p/5k2/5p2/p1p2P2/Pr1pPK2/1P1R3P/8 b - - 0 1", ["Rxb2"]),
+    ("wac003", "5rk1/1ppb3p/p1pb4/6q1/3P1p1r/2P1R2P/PP1BQ1P1/5RKN w - - 0 1", ["Rg3"]),
+    ("wac004", "r1bq2rk/pp3pbp/2p1p1pQ/7P/3P4/2PB1N2/PP3PPR/2KR4 w - - 0 1", ["Qxh7+"]),
+    ("wac005", "5k2/6pp/p1qN4/1p1p4/3P4/2PKP2Q/PP3r2/3R4 b - - 0 1", ["Qc4+"]),
+    ("wac006", "7k/p7/1R5K/6r1/6p1/6P1/8/8 w - - 0 1", ["Rb7"]),
+    ("wac007", "rnbqkb1r/pppp1ppp/8/4P3/6n1/7P/PPPNPPP1/R1BQKBNR b KQkq - 0 1", ["Ne3"]),
+    ("wac008", "r4q1k/p2bR1rp/2p2Q1N/5p2/5p2/2P5/PP3PPP/R5K1 w - - 0 1", ["Rf7"]),
+    ("wac009", "3q1rk1/p4pp1/2pb3p/3p4/6Pr/1PNQ4/P1PB1PP1/4RRK1 b - - 0 1", ["Bh2+"]),
+    ("wac010", "2br2k1/2q3rn/p2NppQ1/2p1P3/Pp5R/4P3/1P3PPP/3R2K1 w - - 0 1", ["Rh7"]),
+    ("start", chess.STARTING_FEN, []),
+    ("italian", "r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3", []),
+    ("qgd", "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8", []),
+    ("ruy_lopez", "r2q1rk1/1b2bppp/p2p1n2/1p2p3/4P3/1BN2N2/PPP2PPP/R2QR1K1 w - - 0 12", []),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", []),
+    ("rook_endgame", "2r3k1/pp3ppp/2n5/3p4/3P4/2N5/PP3PPP/2R3K1 w - - 0 1", []),
+]
+
+DEFAULT_DEPTH     = 3
+DEFAULT_THRESHOLD = 0.10
+BENCH_TT_MB       = 16
+
+# Import time of app.py when no neural engine is loaded at import
+STARTUP_TARGET_MS = 1500
+STARTUP_REPEATS   = 5
+
+_STARTUP_PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import app\n"
+    "print(time.perf_counter() - start, 'torch' in sys.modules, 'numpy' in sys.modules)\n"
+)
+
+
+def run_position(name, fen, best_moves, depth=None, movetime_ms=None, options=None):
+    """Search one position with a fresh table; returns a result dict."""
+    board  = chess.Board(fen)
+    search = Search(
+        max_depth=depth, movetime_ms=movetime_ms,
+        tt=TranspositionTable(BENCH_TT_MB), options=options,
+    )
+    start   = time.perf_counter()
+    result  = search.run(board)
+    elapsed = time.perf_counter() - start
+
+    expected = {board.parse_san(san) for san in best_moves}
+    return {
+        "name": name,
+        "move": result.move.uci() if result.move else None,
+        "depth": result.depth,
+        "nodes": result.nodes,
+        "time_ms": round(elapsed * 1000, 1),
+        "nps": int(result.nodes / elapsed) if elapsed > 0 else 0,
+        "solved": result.move in expected if expected else None,
+    }
+
+
+def run_bench(depth=None, movetime_ms=None, options=None, positions=POSITIONS):
+    """Run every position; returns a summary dict suitable for a JSON baseline."""
+    if depth is None and movetime_ms is None:
+        depth = DEFAULT_DEPTH
+    results = [
+        run_position(name, fen, best, depth, movetime_ms, options)
+        for name, fen, best in positions
+    ]
+    total_nodes = sum(r["nodes"] for r in results)
+    total_ms    = sum(r["time_ms"] for r in results)
+    tactical    = [r for r in results if r["solved"] is not None]
+    return {
+        "mode": "depth" if movetime_ms is None else "movetime",
+        "depth": depth,
+        "movetime_ms": movetime_ms,
+        "positions": results,
+        "total_nodes": total_nodes,
+        "time_to_depth_ms": round(total_ms, 1) if movetime_ms is None else None,
+        "nps": int(total_nodes * 1000 / total_ms) if total_ms > 0 else 0,
+        "solved": sum(r["solved"] for r in tactical),
+        "tactical": len(tactical),
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two bench summaries. Returns (ok, lines): `ok` is False when
+    NPS dropped by more than `threshold` (a fraction) against the baseline.
+    """
+    lines = []
+    ok = True
+    base_nps = baseline.get("nps") or 0
+    if base_nps:
+        change = current["nps"] / base_nps - 1
+        lines.append(f"nps: {base_nps} -> {current['nps']} ({change:+.1%})")
+        if change < -threshold:
+            ok = False
+            lines.append(f"REGRESSION: nps dropped more than {threshold:.0%}")
+    if baseline.get("total_nodes"):
+        change = current["total_nodes"] / baseline["total_nodes"] - 1
+        lines.append(f"nodes: {baseline['total_nodes']} -> {current['total_nodes']} ({change:+.1%})")
+    if baseline.get("time_to_depth_ms") and current.get("time_to_depth_ms"):
+        change = current["time_to_depth_ms"] / baseline["time_to_depth_ms"] - 1
+        lines.append(
+            f"time to depth: {baseline['time_to_depth_ms']}ms -> "
+            f"{current['time_to_depth_ms']}ms ({change:+.1%})"
+        )
+    lines.append(f"solved: {baseline.get('solved')} -> {current['solved']}")
+    return ok, lines
+
+
+def startup_time(repeats=STARTUP_REPEATS, neural=False, env=None):
+    """
+    Median time to import app.py in a fresh interpreter, loading the value
+    network at import when `neural`. Also reports whether torch and NumPy
+    were imported. `env` adds environment variables.
+    """
+    env = dict(os.environ, NEURAL_PRELOAD="1" if neural else "0", **(env or {}))
+    times = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", _STARTUP_PROBE], cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout.split()
+        elapsed, torch_loaded, numpy_loaded = output[-3:]
+        times.append(float(elapsed))
+    return {
+        "neural": neural,
+        "time_ms": round(sorted(times)[len(times) // 2] * 1000, 1),
+        "torch": torch_loaded == "True",
+        "numpy": numpy_loaded == "True",
+    }
+
+
+def check_startup(repeats=STARTUP_REPEATS, target_ms=STARTUP_TARGET_MS):
+    """Startup with and without the network; `ok` is False when the lean start misses the target."""
+    lean, neural = startup_time(repeats), startup_time(repeats, neural=True)
+    lines = [
+        f"app import without neural stack: {lean['time_ms']}ms (target {target_ms}ms), "
+        f"torch={lean['torch']} numpy={lean['numpy']}",
+        f"app import with value network:   {neural['time_ms']}ms",
+    ]
+    ok = lean["time_ms"] <= target_ms and not lean["torch"]
+    if not ok:
+        lines.append("REGRESSION: app import without the neural stack is too slow or imports torch")
+    return ok, lines
+
+
+def _print_summary(summary):
+    print(f"{'position':<14} {'move':<6} {'depth':>5} {'nodes':>9} {'ms':>9} {'nps':>8} solved")
+    for r in summary["positions"]:
+        solved = "" if r["solved"] is None else ("yes" if r["solved"] else "no")
+        print(f"{r['name']:<14} {r['move'] or '-':<6} {r['depth']:>5} {r['nodes']:>9} "
+              f"{r['time_ms']:>9.1f} {r['nps']:>8} {solved}")
+    print(f"total nodes {summary['total_nodes']}, nps {summary['nps']}, "
+          f"solved {summary['solved']}/{summary['tactical']}")
+    if summary["time_to_depth_ms"] is not None:
+        print(f"time to depth {summary['depth']}: {summary['time_to_depth_ms']}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fixed-position engine benchmark")
+    parser.add_argument("--depth", type=int, help=f"fixed depth (default {DEFAULT_DEPTH})")
+    parser.add_argument("--movetime", type=int, help="fixed time per position (ms)")
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--baseline", help="compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed NPS drop as a fraction (default 0.10)")
+    parser.add_argument("--startup", action="store_true",
+                        help=f"time the app import instead (target {STARTUP_TARGET_MS}ms)")
+    args = parser.parse_args()
+
+    if args.startup:
+        ok, lines = check_startup()
+        print("\n".join(lines))
+        sys.exit(0 if ok else 1)
+
+    summary = run_bench(depth=args.depth, movetime_ms=args.movetime)
+    _print_summary(summary)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        ok, lines = compare(summary, baseline, args.threshold)
+        print("\n".join(lines))
+        sys.exit(0 if ok else 1)
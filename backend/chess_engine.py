@@ -1,6 +1,11 @@
-import math
+import time
+import weakref
 import chess
-from evaluation import evaluate_board
+from evaluation import (
+    evaluate_board, eval_state, update_state, get_pawn_table, EvalProfile, PIECE_VALUES,
+)
+import zobrist
+from transposition import TranspositionTable, EvalCache, EXACT, LOWER, UPPER, decode_move
 
 # Material values for MVV-LVA move ordering
 VALUES = {
@@ -12,7 +17,200 @@ VALUES = {
     chess.KING:   0,
 }
 
-_transposition_table = {}
+# Depth used when the caller gives no depth, time or node limit
+DEFAULT_DEPTH = 3
+# Hard cap for iterative deepening when only time/node limits are given
+MAX_DEPTH = 64
+# Expected number of moves left in the game when budgeting from a clock
+MOVES_TO_GO = 30
+# Never plan to spend less than this on a clock-budgeted move
+MIN_MOVE_TIME_MS = 50
+
+# Nodes between checks of an external stop event
+STOP_CHECK_INTERVAL = 1024
+
+# Scores inside the search are integer centipawns for the side to move
+MATE_SCORE     = 10000
+MATE_THRESHOLD = MATE_SCORE - 2 * MAX_DEPTH
+INFINITY       = MATE_SCORE + 1
+# Static scores are kept below mate scores, whatever the evaluator returns
+MAX_EVAL_SCORE = MATE_THRESHOLD - 1
+
+# Aspiration windows around the previous iteration's score (centipawns)
+ASPIRATION_MIN_DEPTH  = 3
+ASPIRATION_WINDOW     = 50
+ASPIRATION_MAX_WINDOW = 800
+
+# Null-move pruning: reduction and minimum remaining depth
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+
+# Late move reductions: quiet moves after the first few are searched
+# one ply shallower (two when very late and deep) unless they beat alpha
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3
+LMR_DEEP_MOVES = 6
+
+# Static exchange values (centipawns); the king outweighs any exchange so it
+# never "wins" a capture onto a defended square
+SEE_VALUES = {**PIECE_VALUES, chess.KING: 20000}
+
+# Leaf evaluator values (White's view, -1..1) are scaled to centipawns by
+# this, staying well inside the mate score range
+LEAF_VALUE_SCALE = 1000
+
+# Quiescence delta pruning: skip captures that can't lift the score to alpha
+# even when winning the captured piece plus this margin
+DELTA_MARGIN = 200
+
+# Search features that can be switched per request
+DEFAULT_OPTIONS = {
+    "aspiration":   True,   # narrow root window from the previous iteration
+    "null_move":    True,   # null-move pruning with verification search
+    "lmr":          True,   # late move reductions for quiet moves
+    "see":          True,   # drop losing captures in quiescence, order by SEE
+    "delta_pruning": True,  # drop captures too small to reach alpha
+    "killers":      True,   # two killer moves per ply
+    "history":      True,   # butterfly history of quiet cutoffs
+    "countermoves": True,   # quiet reply that refuted the previous move
+    "eval_cache":   True,   # reuse static evaluations of repeated positions
+    "eval_profile": False,  # time each evaluation term (slower, bypasses eval_cache)
+}
+
+# Move ordering tiers; quiet moves below these are ordered by history
+_TT_MOVE_SCORE  = 1 << 30
+_CAPTURE_SCORE  = 1 << 28
+_KILLER_SCORES  = (1 << 27, 1 << 26)
+_COUNTER_SCORE  = 1 << 25
+# History is halved once any entry passes this, keeping it below the tiers
+_HISTORY_LIMIT  = 1 << 20
+
+# Shared by searches in this process; bounded by TT_SIZE_MB
+_transposition_table = TranspositionTable()
+# Static evaluations, shared the same way; bounded by EVAL_CACHE_MB
+_eval_cache = EvalCache()
+# Transposition table and score cache per alternative evaluator (leaf
+# evaluator or NNUE network object), created on first use so scores of
+# different evaluators, or of reloaded weights, never share entries
+_evaluator_tables = weakref.WeakKeyDictionary()
+
+
+def _search_tables(evaluator):
+    """
+    (transposition table, evaluation cache) for searches scored by
+    `evaluator`, kept for as long as that object lives.
+    """
+    if evaluator is None:
+        return _transposition_table, _eval_cache
+    if evaluator not in _evaluator_tables:
+        _evaluator_tables[evaluator] = TranspositionTable(), EvalCache()
+    return _evaluator_tables[evaluator]
+
+
+class _CountedProbes:
+    """
+    One search's view of a cache shared with concurrent searches, counting
+    only its own `probes` and `hits`.
+    """
+
+    def __init__(self, table):
+        self.table  = table
+        self.probes = 0
+        self.hits   = 0
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.table.probe(key)
+        if entry is not None:
+            self.hits += 1
+        return entry
+
+    def store(self, key, *entry):
+        self.table.store(key, *entry)
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when a time or node limit is reached."""
+
+
+class SearchStats:
+    """Counters and timings collected by one search."""
+
+    def __init__(self):
+        self.nodes        = 0     # all nodes, including quiescence
+        self.qnodes       = 0     # quiescence nodes
+        self.tt_probes    = 0
+        self.tt_hits      = 0
+        self.tt_cutoffs   = 0
+        self.cutoffs      = 0     # beta cutoffs in the main search
+        self.first_move_cutoffs = 0
+        self.pawn_probes  = 0     # pawn hash lookups by the evaluation
+        self.pawn_hits    = 0
+        self.eval_probes  = 0     # static evaluation cache lookups
+        self.eval_hits    = 0
+        self.leaf_batches = 0     # leaf evaluator calls
+        self.leaf_evals   = 0     # positions scored by the leaf evaluator
+        self.depth        = 0     # deepest completed iteration
+        self.seldepth     = 0     # deepest ply reached, including quiescence
+        self.time_ms      = 0.0
+        self.iterations   = []    # one dict per completed iteration
+        self.eval_terms   = None  # EvalProfile summary with the eval_profile option
+
+    @property
+    def nps(self):
+        return int(self.nodes * 1000 / self.time_ms) if self.time_ms > 0 else 0
+
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def pawn_hit_rate(self):
+        return self.pawn_hits / self.pawn_probes if self.pawn_probes else 0.0
+
+    @property
+    def eval_hit_rate(self):
+        return self.eval_hits / self.eval_probes if self.eval_probes else 0.0
+
+    def as_dict(self):
+        stats = {
+            "nodes": self.nodes,
+            "qnodes": self.qnodes,
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tt_cutoffs": self.tt_cutoffs,
+            "first_move_cutoff_rate": round(self.first_move_cutoff_rate, 3),
+            "pawn_hit_rate": round(self.pawn_hit_rate, 3),
+            "eval_hit_rate": round(self.eval_hit_rate, 3),
+            "depth": self.depth,
+            "seldepth": self.seldepth,
+            "nps": self.nps,
+            "time_ms": round(self.time_ms, 1),
+            "iterations": self.iterations,
+        }
+        if self.leaf_batches:
+            stats["leaf_batches"] = self.leaf_batches
+            stats["leaf_evals"]   = self.leaf_evals
+        if self.eval_terms is not None:
+            stats["eval_terms"] = self.eval_terms
+        return stats
+
+
+class SearchResult:
+    """
+    Outcome of a search: best move and principal variation from the last
+    completed iteration. `score` is in pawns from White's point of view,
+    like evaluate_board.
+    """
+
+    def __init__(self, move=None, score=0.0, depth=0, nodes=0, pv=None, stats=None):
+        self.move  = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.pv    = pv if pv is not None else ([move] if move else [])
+        self.stats = stats if stats is not None else SearchStats()
+
 
 def mvv_lva(move, board):
     """MVV-LVA ordering, safe for en passant."""
@@ -31,81 +229,606 @@ def mvv_lva(move, board):
 
     return VALUES[victim_type] - VALUES[attacker]
 
-def quiescence(board, alpha, beta, is_maximizing):
-    stand_pat = evaluate_board(board)
-    if is_maximizing:
-        if stand_pat >= beta:
-            return beta
-        alpha = max(alpha, stand_pat)
-    else:
-        if stand_pat <= alpha:
-            return alpha
-        beta = min(beta, stand_pat)
-
-    # only capture moves
-    caps = [m for m in board.legal_moves if board.is_capture(m)]
-    caps.sort(key=lambda m: mvv_lva(m, board), reverse=True)
-    for m in caps:
-        board.push(m)
-        val = -quiescence(board, -beta, -alpha, not is_maximizing)
-        board.pop()
-        if is_maximizing:
-            alpha = max(alpha, val)
-            if alpha >= beta: break
-        else:
-            beta = min(beta, val)
-            if beta <= alpha: break
 
-    return alpha if is_maximizing else beta
+def captured_piece_type(board, move):
+    """Type of the piece a capture takes (pawn for en passant)."""
+    if board.is_en_passant(move):
+        return chess.PAWN
+    return board.piece_type_at(move.to_square)
 
-def minimax_alpha_beta(board, depth, alpha, beta, is_maximizing):
-    key = (board.fen(), depth, is_maximizing)
-    if key in _transposition_table:
-        return _transposition_table[key]
 
-    if depth == 0:
-        val = quiescence(board, alpha, beta, is_maximizing)
-        _transposition_table[key] = val
-        return val
+def see(board, move):
+    """
+    Static exchange evaluation of a capture: material won (centipawns) by the
+    side making it once all recaptures on the target square are played out,
+    each side capturing with its least valuable attacker and free to stop.
+    """
+    to_sq    = move.to_square
+    victim   = captured_piece_type(board, move)
+    occupied = board.occupied ^ chess.BB_SQUARES[move.from_square]
+    if board.is_en_passant(move):
+        occupied ^= chess.BB_SQUARES[to_sq + (-8 if board.turn == chess.WHITE else 8)]
 
-    moves = list(board.legal_moves)
-    moves.sort(
-        key=lambda m: (board.is_capture(m), mvv_lva(m, board)),
-        reverse=True
-    )
+    gains    = [SEE_VALUES[victim] if victim else 0]
+    on_square = move.promotion or board.piece_type_at(move.from_square)
+    if move.promotion:
+        gains[0] += SEE_VALUES[move.promotion] - SEE_VALUES[chess.PAWN]
 
-    best_val = -math.inf if is_maximizing else math.inf
-    for m in moves:
-        board.push(m)
-        val = minimax_alpha_beta(board, depth - 1, alpha, beta, not is_maximizing)
-        board.pop()
+    side = not board.turn
+    while True:
+        attackers = board.attackers_mask(side, to_sq, occupied) & occupied
+        if not attackers:
+            break
+        for piece_type in chess.PIECE_TYPES:
+            candidates = attackers & board.pieces_mask(piece_type, side)
+            if candidates:
+                break
+        attacker = chess.lsb(candidates)
+        gains.append(SEE_VALUES[on_square] - gains[-1])
+        on_square = piece_type
+        occupied ^= chess.BB_SQUARES[attacker]
+        side = not side
 
-        if is_maximizing:
-            best_val = max(best_val, val)
-            alpha    = max(alpha, best_val)
-            if alpha >= beta: break
-        else:
-            best_val = min(best_val, val)
-            beta     = min(beta, best_val)
-            if beta <= alpha: break
+    # Each side may decline to continue the exchange
+    while len(gains) > 1:
+        last = gains.pop()
+        gains[-1] = -max(-gains[-1], last)
+    return gains[0]
+
+
+def terminal_score(board):
+    """Side-to-move score (centipawns) of a finished game, or None while moves remain."""
+    if not any(board.generate_legal_moves()):
+        return -MATE_SCORE if board.is_check() else 0
+    if board.is_insufficient_material():
+        return 0
+    return None
+
+
+def has_non_pawn_material(board, color):
+    """True if `color` has a piece other than pawns and king (zugzwang guard)."""
+    return bool(board.occupied_co[color] & ~(board.pawns | board.kings))
+
+
+def _score_to_tt(score, ply):
+    """Mate scores are stored relative to the node rather than the root."""
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
 
-    _transposition_table[key] = best_val
-    return best_val
 
-def find_best_move(board, depth):
-    is_white  = board.turn
-    best_move = None
-    best_val  = -math.inf if is_white else math.inf
+def _score_from_tt(score, ply):
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
 
-    moves = list(board.legal_moves)
-    moves.sort(key=lambda m: board.is_capture(m), reverse=True)
 
-    for m in moves:
-        board.push(m)
-        val = minimax_alpha_beta(board, depth - 1, -math.inf, math.inf, not is_white)
+def _bound(val, alpha, beta):
+    """Bound type of a score returned from an (alpha, beta) window."""
+    if val <= alpha:
+        return UPPER
+    if val >= beta:
+        return LOWER
+    return EXACT
+
+
+def allocate_move_time(remaining_ms, moves_to_go=MOVES_TO_GO):
+    """
+    Per-move time budget (ms) from the remaining clock time.
+    Spends an even share of the clock and never more than half of it.
+    """
+    if remaining_ms is None or remaining_ms <= 0:
+        return MIN_MOVE_TIME_MS
+    budget = remaining_ms // moves_to_go
+    return int(max(MIN_MOVE_TIME_MS, min(budget, remaining_ms // 2)))
+
+
+class Search:
+    """
+    Iterative-deepening negamax principal variation search.
+
+    Each iteration searches one ply deeper than the last and orders the root
+    moves by the scores of the previous iteration. The search stops when
+    `max_depth` is completed, `movetime_ms` has elapsed or `max_nodes` nodes
+    have been visited; the result always comes from the last completed
+    iteration.
+
+    With a `leaf_evaluator`, leaves are scored by it instead of
+    evaluate_board: a callable taking a list of boards and returning one
+    value per board from White's point of view, -1 (Black wins) to 1 (White
+    wins), such as a value network. Whenever a node's children are leaves,
+    all of them are scored in one call, and scores are cached by Zobrist key
+    in `eval_cache`.
+
+    With an `nnue` network (see nnue.NNUE), positions are scored by it
+    instead, its accumulators being updated incrementally with every move.
+    """
+
+    def __init__(self, max_depth=None, movetime_ms=None, max_nodes=None, tt=None,
+                 options=None, stop_event=None, pawn_table=None, eval_cache=None,
+                 leaf_evaluator=None, nnue=None):
+        if max_depth is None:
+            limited = movetime_ms is not None or max_nodes is not None
+            max_depth = MAX_DEPTH if limited else DEFAULT_DEPTH
+        self.max_depth   = max(1, min(int(max_depth), MAX_DEPTH))
+        self.movetime_ms = movetime_ms
+        self.max_nodes   = max_nodes
+        self.leaf_evaluator = leaf_evaluator
+        self.nnue        = nnue
+        default_tt, default_cache = _search_tables(nnue if nnue is not None else leaf_evaluator)
+        self.tt          = tt if tt is not None else default_tt
+        self.options     = dict(DEFAULT_OPTIONS, **(options or {}))
+        self.stop_event  = stop_event
+        self.pawn_table  = pawn_table if pawn_table is not None else get_pawn_table()
+        self.eval_cache  = eval_cache if eval_cache is not None else default_cache
+        # Probed through these, so stats count this search's lookups only
+        self.pawn_probes = _CountedProbes(self.pawn_table)
+        self.eval_probes = _CountedProbes(self.eval_cache)
+        self.stats       = SearchStats()
+        self.nodes       = 0
+        self.deadline    = None
+        # Material/PST accumulators, one per pushed move (see evaluation.eval_state),
+        # or NNUE accumulators when searching with a network
+        self.eval_states = []
+        # Per-term evaluation values and timings with the eval_profile option
+        self.eval_profile = None
+
+        # Move-ordering tables belong to this search only
+        self.killers      = [[None, None] for _ in range(MAX_DEPTH + 1)]
+        self.history      = [[0] * 4096, [0] * 4096]   # [color][from * 64 + to]
+        self.countermoves = [None] * 4096              # [prev from * 64 + prev to]
+
+    def _check_limits(self):
+        self.nodes += 1
+        # Node and time limits only apply once an iteration has finished, so
+        # there is always a searched move to return
+        if self.stats.depth:
+            if self.max_nodes is not None and self.nodes > self.max_nodes:
+                raise SearchAborted()
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise SearchAborted()
+        # Another process may ask us to stop (parallel search helpers)
+        if (self.stop_event is not None and not self.nodes % STOP_CHECK_INTERVAL
+                and self.stop_event.is_set()):
+            raise SearchAborted()
+
+    def make(self, board, move, key):
+        """Push `move`, updating the evaluation state; returns the new Zobrist key."""
+        states = self.eval_states
+        if self.nnue is not None:
+            states.append(self.nnue.update(board, move, states[-1]))
+        else:
+            states.append(update_state(board, move, states[-1]))
+        return zobrist.push(board, move, key)
+
+    def unmake(self, board):
+        self.eval_states.pop()
         board.pop()
-        if (is_white and val > best_val) or (not is_white and val < best_val):
-            best_val  = val
-            best_move = m
 
-    return best_move
+    def order_moves(self, board, moves, ply, tt_move):
+        """Sort moves: TT move, captures by MVV-LVA, killers, counter-move, then history."""
+        opts     = self.options
+        killers  = self.killers[ply] if opts["killers"] else (None, None)
+        history  = self.history[board.turn] if opts["history"] else None
+        counter  = None
+        if opts["countermoves"] and board.move_stack:
+            prev = board.move_stack[-1]
+            counter = self.countermoves[prev.from_square * 64 + prev.to_square]
+
+        def score(m):
+            if m == tt_move:
+                return _TT_MOVE_SCORE
+            if board.is_capture(m):
+                return _CAPTURE_SCORE + mvv_lva(m, board)
+            if m == killers[0]:
+                return _KILLER_SCORES[0]
+            if m == killers[1]:
+                return _KILLER_SCORES[1]
+            if m == counter:
+                return _COUNTER_SCORE
+            if history is not None:
+                return history[m.from_square * 64 + m.to_square]
+            return 0
+
+        moves.sort(key=score, reverse=True)
+
+    def record_cutoff(self, board, move, ply, depth):
+        """Update killer, history and counter-move tables after a quiet beta cutoff."""
+        if self.options["killers"]:
+            slots = self.killers[ply]
+            if slots[0] != move:
+                slots[1], slots[0] = slots[0], move
+
+        if self.options["history"]:
+            history = self.history[board.turn]
+            idx = move.from_square * 64 + move.to_square
+            history[idx] += depth * depth
+            if history[idx] > _HISTORY_LIMIT:
+                for table in self.history:
+                    table[:] = [v // 2 for v in table]
+
+        if self.options["countermoves"] and board.move_stack:
+            prev = board.move_stack[-1]
+            self.countermoves[prev.from_square * 64 + prev.to_square] = move
+
+    def evaluate(self, board, ply=0, key=None):
+        """
+        Static evaluation in centipawns from the side to move's point of view,
+        looked up in the evaluation cache when the Zobrist `key` is given.
+        """
+        if self.leaf_evaluator is not None:
+            return self.evaluate_leaf(board, ply, key)
+        if self.nnue is not None:
+            return self.evaluate_nnue(board, ply, key)
+        # A profiled search evaluates every node, so cache hits do not hide terms
+        cached = key is not None and self.options["eval_cache"] and self.eval_profile is None
+        cache  = self.eval_probes if cached else None
+        score  = cache.probe(key) if cache is not None else None
+        if score is None:
+            state = self.eval_states[-1] if self.eval_states else None
+            score = int(round(
+                evaluate_board(board, state, self.pawn_probes, self.eval_profile) * 100
+            ))
+            score = score if board.turn == chess.WHITE else -score
+            if cache is not None:
+                cache.store(key, score)
+        # evaluate_board reports checkmate far outside the search's score
+        # range; map it onto a mate score at this ply
+        if score <= -MATE_SCORE:
+            return -MATE_SCORE + ply
+        return score
+
+    def evaluate_leaf(self, board, ply=0, key=None):
+        """evaluate() through the leaf evaluator; usually a hit left by prefetch_leaves."""
+        cache = self.eval_probes if key is not None and self.options["eval_cache"] else None
+        score = cache.probe(key) if cache is not None else None
+        if score is None:
+            score = terminal_score(board)
+            if score is None:
+                score = self.score_leaves([board])[0]
+            if cache is not None:
+                cache.store(key, score)
+        if score <= -MATE_SCORE:
+            return -MATE_SCORE + ply
+        return score
+
+    def evaluate_nnue(self, board, ply=0, key=None):
+        """evaluate() by the NNUE network from the current accumulators."""
+        cache = self.eval_probes if key is not None and self.options["eval_cache"] else None
+        score = cache.probe(key) if cache is not None else None
+        if score is None:
+            score = terminal_score(board)
+            if score is None:
+                # An untrained network can score far outside the search window
+                score = max(-MAX_EVAL_SCORE, min(MAX_EVAL_SCORE, self.nnue.evaluate(self.eval_states[-1])))
+                score = score if board.turn == chess.WHITE else -score
+            if cache is not None:
+                cache.store(key, score)
+        if score <= -MATE_SCORE:
+            return -MATE_SCORE + ply
+        return score
+
+    def score_leaves(self, boards):
+        """Side-to-move centipawn scores of `boards` from one leaf evaluator call."""
+        self.stats.leaf_batches += 1
+        self.stats.leaf_evals   += len(boards)
+        values = self.leaf_evaluator(boards)
+        return [
+            int(round(float(v) * LEAF_VALUE_SCALE)) * (1 if b.turn == chess.WHITE else -1)
+            for b, v in zip(boards, values)
+        ]
+
+    def prefetch_leaves(self, board, moves, key):
+        """
+        Score every child of this node reached by `moves` that is not cached
+        yet, in a single leaf evaluator call, and cache the scores. Finished
+        games get their exact score instead. Without the eval_cache option
+        there is nowhere to keep them, and leaves are scored one at a time.
+        """
+        if not self.options["eval_cache"]:
+            return
+        cache   = self.eval_probes
+        pending = []
+        keys    = []
+        for m in moves:
+            child_key = zobrist.push(board, m, key)
+            if cache.probe(child_key) is None:
+                score = terminal_score(board)
+                if score is None:
+                    pending.append(board.copy(stack=False))
+                    keys.append(child_key)
+                else:
+                    cache.store(child_key, score)
+            board.pop()
+        if pending:
+            for child_key, score in zip(keys, self.score_leaves(pending)):
+                cache.store(child_key, score)
+
+    def quiescence(self, board, alpha, beta, key, ply):
+        self._check_limits()
+        stats = self.stats
+        stats.qnodes += 1
+        if ply > stats.seldepth:
+            stats.seldepth = ply
+        best = self.evaluate(board, ply, key)
+        if best >= beta:
+            return best
+        alpha = max(alpha, best)
+
+        use_see   = self.options["see"]
+        use_delta = self.options["delta_pruning"]
+        caps = []
+        for m in board.generate_legal_captures():
+            if use_delta and not m.promotion:
+                gain = PIECE_VALUES[captured_piece_type(board, m)]
+                if best + gain + DELTA_MARGIN <= alpha:
+                    continue
+            if use_see:
+                order = see(board, m)
+                if order < 0:
+                    continue
+            else:
+                order = mvv_lva(m, board)
+            caps.append((order, m))
+        caps.sort(key=lambda c: c[0], reverse=True)
+        if self.leaf_evaluator is not None and len(caps) > 1:
+            self.prefetch_leaves(board, [m for _, m in caps], key)
+
+        for _, m in caps:
+            child_key = self.make(board, m, key)
+            score = -self.quiescence(board, -beta, -alpha, child_key, ply + 1)
+            self.unmake(board)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        return best
+
+    def pvs(self, board, depth, alpha, beta, key, ply, pv, allow_null=True):
+        """
+        Negamax principal variation search. Returns the score for the side to
+        move and fills `pv` with the principal variation when alpha is raised.
+        """
+        if depth <= 0:
+            return self.quiescence(board, alpha, beta, key, ply)
+
+        self._check_limits()
+        pv_node = beta - alpha > 1
+
+        # Side to move is part of the Zobrist key, so it identifies the node.
+        # PV nodes never take TT cutoffs so the principal variation stays whole.
+        stats = self.stats
+        stats.tt_probes += 1
+        entry   = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            stats.tt_hits += 1
+            _, tt_depth, flag, score, move_code, _ = entry
+            if not pv_node and tt_depth >= depth:
+                score = _score_from_tt(score, ply)
+                if (flag == EXACT or (flag == LOWER and score >= beta)
+                        or (flag == UPPER and score <= alpha)):
+                    stats.tt_cutoffs += 1
+                    return score
+            tt_move = decode_move(move_code)
+
+        in_check = board.is_check()
+
+        # Null move: if passing still fails high, the node is almost surely a
+        # cutoff. Skipped when only pawns are left, where zugzwang is common,
+        # and confirmed by a reduced search without null moves.
+        if (allow_null and self.options["null_move"] and not pv_node and not in_check
+                and depth >= NULL_MOVE_MIN_DEPTH
+                and has_non_pawn_material(board, board.turn)):
+            reduction = NULL_MOVE_REDUCTION + (depth >= 6)
+            null_key  = self.make(board, chess.Move.null(), key)
+            score = -self.pvs(
+                board, depth - 1 - reduction, -beta, -beta + 1, null_key, ply + 1, [], False
+            )
+            self.unmake(board)
+            if score >= beta:
+                score = self.pvs(board, depth - reduction, beta - 1, beta, key, ply, [], False)
+                if score >= beta:
+                    return beta if score >= MATE_THRESHOLD else score
+
+        moves = list(board.legal_moves)
+        if not moves:
+            return -MATE_SCORE + ply if in_check else 0
+        self.order_moves(board, moves, ply, tt_move)
+        # Children at depth 0 stand pat on their leaf score: score them together
+        if self.leaf_evaluator is not None and depth == 1:
+            self.prefetch_leaves(board, moves, key)
+
+        use_lmr    = self.options["lmr"] and depth >= LMR_MIN_DEPTH and not in_check
+        killers    = self.killers[ply]
+        alpha_orig = alpha
+        best       = -INFINITY
+        best_move  = None
+        for i, m in enumerate(moves):
+            reduction = 0
+            if (use_lmr and i >= LMR_MIN_MOVES and m != tt_move and m not in killers
+                    and not m.promotion and not board.is_capture(m)
+                    and not board.gives_check(m)):
+                reduction = 2 if i >= LMR_DEEP_MOVES and depth >= 6 else 1
+
+            child_pv  = []
+            child_key = self.make(board, m, key)
+            if i == 0:
+                score = -self.pvs(board, depth - 1, -beta, -alpha, child_key, ply + 1, child_pv)
+            else:
+                # Zero-window search proves the move is no better than alpha;
+                # a reduced move that fails high is re-searched at full depth,
+                # then with the full window if it still lands inside it
+                score = -self.pvs(
+                    board, depth - 1 - reduction, -alpha - 1, -alpha, child_key, ply + 1, child_pv
+                )
+                if reduction and score > alpha:
+                    score = -self.pvs(board, depth - 1, -alpha - 1, -alpha, child_key, ply + 1, child_pv)
+                if alpha < score < beta:
+                    score = -self.pvs(board, depth - 1, -beta, -alpha, child_key, ply + 1, child_pv)
+            self.unmake(board)
+
+            if score > best:
+                best, best_move = score, m
+                if score > alpha:
+                    alpha = score
+                    pv[:] = [m] + child_pv
+                    if alpha >= beta:
+                        stats.cutoffs += 1
+                        if i == 0:
+                            stats.first_move_cutoffs += 1
+                        if not board.is_capture(m):
+                            self.record_cutoff(board, m, ply, depth)
+                        break
+
+        self.tt.store(
+            key, depth, _bound(best, alpha_orig, beta), _score_to_tt(best, ply), best_move
+        )
+        return best
+
+    def search_root(self, board, moves, depth, alpha, beta):
+        """
+        Search the root moves to `depth` inside (alpha, beta).
+        Returns (best score, principal variation, [(score, move)] in move order).
+        """
+        self.eval_states = [self.nnue.refresh(board) if self.nnue is not None else eval_state(board)]
+        key    = zobrist.zobrist_key(board)
+        best   = -INFINITY
+        pv     = []
+        scored = []
+        if self.leaf_evaluator is not None and depth == 1:
+            self.prefetch_leaves(board, moves, key)
+        for i, m in enumerate(moves):
+            child_pv  = []
+            child_key = self.make(board, m, key)
+            try:
+                if i == 0:
+                    score = -self.pvs(board, depth - 1, -beta, -alpha, child_key, 1, child_pv)
+                else:
+                    score = -self.pvs(board, depth - 1, -alpha - 1, -alpha, child_key, 1, child_pv)
+                    if alpha < score < beta:
+                        score = -self.pvs(board, depth - 1, -beta, -alpha, child_key, 1, child_pv)
+            finally:
+                self.unmake(board)
+            scored.append((score, m))
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    pv = [m] + child_pv
+                    if alpha >= beta:
+                        break
+        return best, pv, scored
+
+    def aspiration_search(self, board, moves, depth, prev_score):
+        """
+        Root search in a narrow window around the previous iteration's score,
+        widening on the failing side until the score lands inside the window.
+        """
+        if prev_score is None or depth < ASPIRATION_MIN_DEPTH or not self.options["aspiration"]:
+            return self.search_root(board, moves, depth, -INFINITY, INFINITY)
+
+        delta = ASPIRATION_WINDOW
+        alpha = max(prev_score - delta, -INFINITY)
+        beta  = min(prev_score + delta, INFINITY)
+        while True:
+            best, pv, scored = self.search_root(board, moves, depth, alpha, beta)
+            if best <= alpha:
+                alpha = max(best - delta, -INFINITY)
+            elif best >= beta:
+                beta = min(best + delta, INFINITY)
+            else:
+                return best, pv, scored
+            delta *= 2
+            if delta > ASPIRATION_MAX_WINDOW:
+                alpha, beta = -INFINITY, INFINITY
+
+    def run(self, board, start_depth=1):
+        """
+        Iteratively deepen from `start_depth` until a limit is hit; returns a
+        SearchResult. The first iteration always completes unless stopped by
+        `stop_event`, which leaves an unsearched move with an empty PV.
+        """
+        self.nodes = 0
+        self.stats = stats = SearchStats()
+        self.tt.new_search()
+        self.pawn_probes = _CountedProbes(self.pawn_table)
+        self.eval_probes = _CountedProbes(self.eval_cache)
+        self.eval_profile = EvalProfile() if self.options["eval_profile"] else None
+        start = time.perf_counter()
+        if self.movetime_ms is not None:
+            self.deadline = start + self.movetime_ms / 1000.0
+
+        moves = list(board.legal_moves)
+        moves.sort(key=lambda m: board.is_capture(m), reverse=True)
+        result = SearchResult(move=moves[0] if moves else None, pv=[], stats=stats)
+        if not moves:
+            return result
+
+        # Search a copy so an aborted iteration can't leave moves pushed
+        board = board.copy(stack=False)
+        sign  = 1 if board.turn == chess.WHITE else -1
+        prev_score = None
+        for depth in range(min(start_depth, self.max_depth), self.max_depth + 1):
+            iter_start, iter_nodes = time.perf_counter(), self.nodes
+            try:
+                best, pv, scored = self.aspiration_search(board, moves, depth, prev_score)
+            except SearchAborted:
+                break
+            stats.depth = depth
+            stats.iterations.append({
+                "depth": depth,
+                "score": sign * best / 100.0,
+                "nodes": self.nodes - iter_nodes,
+                "time_ms": round((time.perf_counter() - iter_start) * 1000, 1),
+                "pv": [m.uci() for m in pv],
+            })
+            # PV move first, the rest by score keeping the previous order on ties
+            scored.sort(key=lambda s: s[0], reverse=True)
+            searched = [m for _, m in scored]
+            rest     = [m for m in moves if m not in searched]
+            moves    = [pv[0]] + [m for m in searched + rest if m != pv[0]]
+            prev_score = best
+            result = SearchResult(pv[0], sign * best / 100.0, depth, self.nodes, pv, stats)
+
+        result.nodes = stats.nodes = self.nodes
+        stats.pawn_probes = self.pawn_probes.probes
+        stats.pawn_hits   = self.pawn_probes.hits
+        stats.eval_probes = self.eval_probes.probes
+        stats.eval_hits   = self.eval_probes.hits
+        if self.eval_profile is not None:
+            stats.eval_terms = self.eval_profile.summary()
+        stats.time_ms = (time.perf_counter() - start) * 1000
+        return result
+
+
+def find_best_move(board, depth=None, movetime_ms=None, max_nodes=None, max_depth=None,
+                   tt=None, options=None, with_stats=False, leaf_evaluator=None, nnue=None):
+    """
+    Best move for the side to move, or (move, SearchStats) with `with_stats`.
+
+    `depth` and `max_depth` are synonyms for the deepest iteration to run.
+    With no limits at all, searches to DEFAULT_DEPTH. `leaf_evaluator`
+    scores leaves in place of evaluate_board, and so does an `nnue`
+    network (see Search).
+    """
+    search = Search(
+        max_depth=max_depth if max_depth is not None else depth,
+        movetime_ms=movetime_ms,
+        max_nodes=max_nodes,
+        tt=tt,
+        options=options,
+        leaf_evaluator=leaf_evaluator,
+        nnue=nnue,
+    )
+    result = search.run(board)
+    if with_stats:
+        return result.move, result.stats
+    return result.move
@@ -2,8 +2,15 @@
 Advanced positional evaluation for chess.
 Includes piece-square tables, king safety, pawn structure, and mobility.
 """
+import importlib
+import os
+import time
+
 import chess
 
+from pawn_hash import PawnHashTable, pawn_key, king_key
+from zobrist import PIECE_KEYS
+
 # Piece base values (centipawns)
 PIECE_VALUES = {
     chess.PAWN: 100,
@@ -95,6 +102,35 @@ KING_ENDGAME_TABLE = [
 ]
 # fmt: on
 
+# Scalar terms (centipawns, per pawn or piece)
+DOUBLED_PAWN_PENALTY  = 10
+ISOLATED_PAWN_PENALTY = 20
+PASSED_PAWN_BASE      = 10   # passed pawn on its starting rank
+PASSED_PAWN_STEP      = 10   # plus this per rank advanced
+KING_SHIELD_BONUS     = 10   # middlegame only
+CENTER_BONUS          = 5    # knight, bishop, rook or queen on c3-f6
+BISHOP_PAIR_BONUS     = 30
+
+# Everything a weight module written by tune_eval.py may replace
+WEIGHT_NAMES = (
+    "PIECE_VALUES", "PAWN_TABLE", "KNIGHT_TABLE", "BISHOP_TABLE", "ROOK_TABLE",
+    "QUEEN_TABLE", "KING_MIDDLEGAME_TABLE", "KING_ENDGAME_TABLE",
+    "DOUBLED_PAWN_PENALTY", "ISOLATED_PAWN_PENALTY", "PASSED_PAWN_BASE",
+    "PASSED_PAWN_STEP", "KING_SHIELD_BONUS", "CENTER_BONUS", "BISHOP_PAIR_BONUS",
+)
+
+
+def load_weights(module_name):
+    """The WEIGHT_NAMES defined by an importable weight module, as a dict."""
+    module = importlib.import_module(module_name)
+    return {name: getattr(module, name) for name in WEIGHT_NAMES if hasattr(module, name)}
+
+
+# EVAL_WEIGHTS names a module (e.g. tuned_weights) whose values replace the
+# defaults above; everything below is derived from them
+if os.getenv("EVAL_WEIGHTS"):
+    globals().update(load_weights(os.getenv("EVAL_WEIGHTS")))
+
 PST = {
     chess.PAWN: PAWN_TABLE,
     chess.KNIGHT: KNIGHT_TABLE,
@@ -120,6 +156,115 @@ def get_pst_value(piece_type, square, is_white, is_endgame=False):
         return table[square]
 
 
+# Game phase: each piece's contribution, from 24 with all pieces on the
+# board (pure middlegame) down to 0 with only kings and pawns (pure endgame)
+PHASE_WEIGHTS = {
+    chess.PAWN: 0,
+    chess.KNIGHT: 1,
+    chess.BISHOP: 1,
+    chess.ROOK: 2,
+    chess.QUEEN: 4,
+    chess.KING: 0,
+}
+TOTAL_PHASE = 24
+
+# Material plus piece-square value of a piece on each square, signed from
+# White's perspective: _MG_TABLES[color][piece_type][square], same for _EG
+_MG_TABLES = [
+    [None] + [
+        [(1 if color else -1) * (PIECE_VALUES[pt] + get_pst_value(pt, sq, color, False))
+         for sq in chess.SQUARES]
+        for pt in chess.PIECE_TYPES
+    ]
+    for color in (chess.BLACK, chess.WHITE)
+]
+_EG_TABLES = [
+    [None] + [
+        [(1 if color else -1) * (PIECE_VALUES[pt] + get_pst_value(pt, sq, color, True))
+         for sq in chess.SQUARES]
+        for pt in chess.PIECE_TYPES
+    ]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+_PAWN_KEYS = (PIECE_KEYS[chess.BLACK][chess.PAWN], PIECE_KEYS[chess.WHITE][chess.PAWN])
+
+# Shared by evaluations in this process; bounded by PAWN_HASH_MB
+_pawn_table = PawnHashTable()
+
+
+def eval_state(board):
+    """
+    Material and piece-square accumulators of a position as a tuple
+    (middlegame, endgame, phase, pawn key). Keep it current across moves
+    with update_state instead of recomputing it.
+    """
+    mg = eg = phase = 0
+    for square, piece in board.piece_map().items():
+        mg    += _MG_TABLES[piece.color][piece.piece_type][square]
+        eg    += _EG_TABLES[piece.color][piece.piece_type][square]
+        phase += PHASE_WEIGHTS[piece.piece_type]
+    return mg, eg, phase, pawn_key(board)
+
+
+def update_state(board, move, state):
+    """
+    State of the position after `move`, given `state` for the current one.
+    Call before pushing the move. Null moves leave the state unchanged.
+    """
+    if not move:
+        return state
+    mg, eg, phase, pawns = state
+    color      = board.turn
+    mg_tables  = _MG_TABLES[color]
+    eg_tables  = _EG_TABLES[color]
+    from_sq    = move.from_square
+    to_sq      = move.to_square
+    piece_type = board.piece_type_at(from_sq)
+    mg -= mg_tables[piece_type][from_sq]
+    eg -= eg_tables[piece_type][from_sq]
+
+    if piece_type == chess.KING and board.is_castling(move):
+        back_rank = from_sq & ~7
+        if board.is_kingside_castling(move):
+            king_to, rook_from, rook_to = back_rank + 6, back_rank + 7, back_rank + 5
+        else:
+            king_to, rook_from, rook_to = back_rank + 2, back_rank, back_rank + 3
+        rook_mg, rook_eg = mg_tables[chess.ROOK], eg_tables[chess.ROOK]
+        mg += mg_tables[chess.KING][king_to] + rook_mg[rook_to] - rook_mg[rook_from]
+        eg += eg_tables[chess.KING][king_to] + rook_eg[rook_to] - rook_eg[rook_from]
+        return mg, eg, phase, pawns
+
+    captured = board.piece_type_at(to_sq)
+    if captured:
+        mg    -= _MG_TABLES[not color][captured][to_sq]
+        eg    -= _EG_TABLES[not color][captured][to_sq]
+        phase -= PHASE_WEIGHTS[captured]
+        if captured == chess.PAWN:
+            pawns ^= _PAWN_KEYS[not color][to_sq]
+    elif piece_type == chess.PAWN and board.is_en_passant(move):
+        cap_sq = to_sq - 8 if color == chess.WHITE else to_sq + 8
+        mg    -= _MG_TABLES[not color][chess.PAWN][cap_sq]
+        eg    -= _EG_TABLES[not color][chess.PAWN][cap_sq]
+        pawns ^= _PAWN_KEYS[not color][cap_sq]
+    if piece_type == chess.PAWN:
+        pawns ^= _PAWN_KEYS[color][from_sq]
+        if not move.promotion:
+            pawns ^= _PAWN_KEYS[color][to_sq]
+    if move.promotion:
+        phase += PHASE_WEIGHTS[move.promotion]
+    placed = move.promotion or piece_type
+    mg += mg_tables[placed][to_sq]
+    eg += eg_tables[placed][to_sq]
+    return mg, eg, phase, pawns
+
+
+def taper(mg, eg, phase):
+    """Blend middlegame and endgame scores by game phase (0..TOTAL_PHASE)."""
+    phase = min(phase, TOTAL_PHASE)
+    return (mg * phase + eg * (TOTAL_PHASE - phase)) // TOTAL_PHASE
+
+
 def is_endgame(board):
     """Determine if position is an endgame based on material."""
     queens = len(board.pieces(chess.QUEEN, chess.WHITE)) + len(board.pieces(chess.QUEEN, chess.BLACK))
@@ -155,55 +300,65 @@ def evaluate_pst(board, endgame):
     return score
 
 
+# Pawn-structure masks, built once: each file, and the files beside it
+FILE_MASKS = list(chess.BB_FILES)
+ADJACENT_FILE_MASKS = [
+    (chess.BB_FILES[f - 1] if f > 0 else 0) | (chess.BB_FILES[f + 1] if f < 7 else 0)
+    for f in range(8)
+]
+# Passed-pawn bonus per rank, indexed by how far the pawn has advanced
+PASSED_PAWN_BONUS = [PASSED_PAWN_BASE + advance * PASSED_PAWN_STEP for advance in range(8)]
+
+
+def _front_span(pawns, color):
+    """
+    Squares strictly in front of `pawns` (from `color`'s side) on their own
+    and adjacent files: where an enemy pawn can no longer pass them.
+    """
+    if color == chess.WHITE:
+        span = pawns << 8
+        span |= span << 8
+        span |= span << 16
+        span |= span << 32
+    else:
+        span = pawns >> 8
+        span |= span >> 8
+        span |= span >> 16
+        span |= span >> 32
+    span &= chess.BB_ALL
+    return span | ((span << 1) & ~chess.BB_FILE_A & chess.BB_ALL) | ((span >> 1) & ~chess.BB_FILE_H)
+
+
 def evaluate_pawn_structure(board):
     """Evaluate pawn structure: doubled, isolated, and passed pawns."""
     score = 0
-    
-    for color in [chess.WHITE, chess.BLACK]:
-        pawns = board.pieces(chess.PAWN, color)
+    white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+    black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+
+    for color, pawns, enemy in ((chess.WHITE, white_pawns, black_pawns),
+                                (chess.BLACK, black_pawns, white_pawns)):
         sign = 1 if color == chess.WHITE else -1
-        
-        # Count pawns per file
-        files = [0] * 8
-        for sq in pawns:
-            files[chess.square_file(sq)] += 1
-        
-        for sq in pawns:
-            file = chess.square_file(sq)
-            rank = chess.square_rank(sq)
-            
+
+        for f in range(8):
+            count = chess.popcount(pawns & FILE_MASKS[f])
+            if not count:
+                continue
             # Doubled pawns penalty
-            if files[file] > 1:
-                score -= sign * 10
-            
+            if count > 1:
+                score -= sign * DOUBLED_PAWN_PENALTY * count
             # Isolated pawn penalty
-            has_neighbor = False
-            if file > 0 and files[file - 1] > 0:
-                has_neighbor = True
-            if file < 7 and files[file + 1] > 0:
-                has_neighbor = True
-            if not has_neighbor:
-                score -= sign * 20
-            
-            # Passed pawn bonus
-            is_passed = True
-            enemy_pawns = board.pieces(chess.PAWN, not color)
-            for enemy_sq in enemy_pawns:
-                enemy_file = chess.square_file(enemy_sq)
-                enemy_rank = chess.square_rank(enemy_sq)
-                if abs(enemy_file - file) <= 1:
-                    if color == chess.WHITE and enemy_rank > rank:
-                        is_passed = False
-                        break
-                    elif color == chess.BLACK and enemy_rank < rank:
-                        is_passed = False
-                        break
-            
-            if is_passed:
-                # Bonus increases as pawn advances
-                advance = rank if color == chess.WHITE else (7 - rank)
-                score += sign * (10 + advance * 10)
-    
+            if not pawns & ADJACENT_FILE_MASKS[f]:
+                score -= sign * ISOLATED_PAWN_PENALTY * count
+
+        # Passed pawn bonus, increasing as the pawn advances
+        passers = pawns & ~_front_span(enemy, not color)
+        if passers:
+            for rank in range(8):
+                count = chess.popcount(passers & chess.BB_RANKS[rank])
+                if count:
+                    advance = rank if color == chess.WHITE else 7 - rank
+                    score += sign * PASSED_PAWN_BONUS[advance] * count
+
     return score
 
 
@@ -235,7 +390,7 @@ def evaluate_king_safety(board, endgame):
         pawns = board.pieces(chess.PAWN, color)
         for sq in shield_squares:
             if sq in pawns:
-                score += sign * 10
+                score += sign * KING_SHIELD_BONUS
     
     return score
 
@@ -257,7 +412,7 @@ def evaluate_mobility(board):
                 
                 # Central squares give mobility bonus
                 if 2 <= file <= 5 and 2 <= rank <= 5:
-                    score += sign * 5
+                    score += sign * CENTER_BONUS
     
     return score
 
@@ -267,32 +422,177 @@ def evaluate_bishop_pair(board):
     score = 0
     
     if len(board.pieces(chess.BISHOP, chess.WHITE)) >= 2:
-        score += 30
+        score += BISHOP_PAIR_BONUS
     if len(board.pieces(chess.BISHOP, chess.BLACK)) >= 2:
-        score -= 30
+        score -= BISHOP_PAIR_BONUS
     
     return score
 
 
-def evaluate_board(board):
+def evaluate_pawns(board, pawns=None, table=None):
+    """
+    (pawn structure, king shield) scores through the pawn hash table.
+    `pawns` is the pawn-only key when already known (see eval_state).
+    """
+    if table is None:
+        table = _pawn_table
+    if pawns is None:
+        pawns = pawn_key(board)
+    key   = pawns ^ king_key(board)
+    entry = table.probe(key)
+    if entry is None:
+        entry = evaluate_pawn_structure(board), evaluate_king_safety(board, False)
+        table.store(key, *entry)
+    return entry
+
+
+# Terms reported by explain_board, in evaluation order
+EVAL_TERMS = ("terminal", "material", "pst", "pawns", "king_safety", "mobility", "bishop_pair")
+
+
+def game_phase(board):
+    """Game phase from TOTAL_PHASE (all pieces on) down to 0 (kings and pawns)."""
+    return min(TOTAL_PHASE, sum(
+        PHASE_WEIGHTS[pt] * chess.popcount(
+            board.pieces_mask(pt, chess.WHITE) | board.pieces_mask(pt, chess.BLACK)
+        )
+        for pt in (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN)
+    ))
+
+
+class EvalProfile:
+    """Per-term value totals and CPU time accumulated over many explain_board calls."""
+
+    def __init__(self):
+        self.calls  = 0
+        self.values = dict.fromkeys(EVAL_TERMS, 0)
+        self.times  = dict.fromkeys(EVAL_TERMS, 0.0)
+
+    def record(self, terms, times):
+        self.calls += 1
+        for term in EVAL_TERMS:
+            self.values[term] += terms[term]
+            self.times[term]  += times[term]
+
+    def summary(self):
+        """{term: {mean (centipawns), time_ms, time_share}} plus the call count."""
+        total = sum(self.times.values())
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "terms": {
+                term: {
+                    "mean": round(self.values[term] / calls, 1),
+                    "time_ms": round(self.times[term] * 1000, 2),
+                    "time_share": round(self.times[term] / total, 3) if total else 0.0,
+                }
+                for term in EVAL_TERMS
+            },
+        }
+
+
+def explain_board(board, profile=None):
+    """
+    Instrumented evaluate_board: returns (score, terms, times) where `score`
+    is what evaluate_board returns, `terms` the centipawn contribution of
+    each of EVAL_TERMS (summing to score * 100) and `times` the CPU seconds
+    of the calling thread spent on each. Every term is computed from scratch, without the
+    incremental state or pawn hash, so times show each term's raw cost.
+    Results are added to `profile` when given.
+    """
+    terms = dict.fromkeys(EVAL_TERMS, 0)
+    times = dict.fromkeys(EVAL_TERMS, 0.0)
+    # CPU time of this thread, so concurrent requests do not inflate it
+    clock = time.thread_time
+
+    start = clock()
+    if not any(board.generate_legal_moves()):
+        terminal = (-10000 if board.turn == chess.WHITE else 10000) if board.is_check() else 0
+    elif board.is_insufficient_material():
+        terminal = 0
+    else:
+        terminal = None
+    times["terminal"] = clock() - start
+    if terminal is not None:
+        terms["terminal"] = terminal * 100
+        if profile is not None:
+            profile.record(terms, times)
+        return float(terminal), terms, times
+
+    start = clock()
+    material = evaluate_material(board)
+    times["material"] = clock() - start
+
+    start = clock()
+    phase   = game_phase(board)
+    pst_mg  = evaluate_pst(board, False)
+    pst_eg  = evaluate_pst(board, True)
+    tapered = taper(material + pst_mg, material + pst_eg, phase)
+    times["pst"] = clock() - start
+
+    start = clock()
+    terms["pawns"] = evaluate_pawn_structure(board)
+    times["pawns"] = clock() - start
+
+    start = clock()
+    shield = evaluate_king_safety(board, False)
+    # King safety only counts in the middlegame
+    terms["king_safety"] = taper(material + pst_mg + shield, material + pst_eg, phase) - tapered
+    times["king_safety"] = clock() - start
+
+    start = clock()
+    terms["mobility"] = evaluate_mobility(board)
+    times["mobility"] = clock() - start
+
+    start = clock()
+    terms["bishop_pair"] = evaluate_bishop_pair(board)
+    times["bishop_pair"] = clock() - start
+
+    terms["material"] = material
+    terms["pst"]      = tapered - material
+    if profile is not None:
+        profile.record(terms, times)
+    return sum(terms.values()) / 100.0, terms, times
+
+
+def get_pawn_table():
+    """The process-wide pawn hash table used when none is passed in."""
+    return _pawn_table
+
+
+def evaluate_board(board, state=None, pawn_table=None, profile=None):
     """
     Complete positional evaluation.
     Returns score in centipawns from White's perspective.
     Positive = White is better, Negative = Black is better.
+
+    Material, piece-square tables and king safety are tapered between
+    middlegame and endgame by game phase. Pass `state` (see eval_state) when
+    it is maintained incrementally to skip recomputing material and PST.
+    Pawn terms are cached in `pawn_table` (the shared table by default).
+    With an EvalProfile as `profile`, evaluates through explain_board and
+    records per-term values and timings in it.
     """
-    # Check for checkmate/stalemate
-    if board.is_checkmate():
-        return -10000 if board.turn == chess.WHITE else 10000
-    if board.is_stalemate() or board.is_insufficient_material():
+    if profile is not None:
+        return explain_board(board, profile)[0]
+
+    # Checkmate/stalemate: one check test and a move generator that stops at
+    # the first legal move, instead of is_checkmate() and is_stalemate()
+    # each generating every legal move
+    if not any(board.generate_legal_moves()):
+        if board.is_check():
+            return -10000 if board.turn == chess.WHITE else 10000
+        return 0
+    if board.is_insufficient_material():
         return 0
     
-    endgame = is_endgame(board)
+    mg, eg, phase, pawns = state if state is not None else eval_state(board)
+    pawn_score, shield = evaluate_pawns(board, pawns, pawn_table)
+    # King safety only counts in the middlegame
+    mg += shield
     
-    score = 0
-    score += evaluate_material(board)
-    score += evaluate_pst(board, endgame)
-    score += evaluate_pawn_structure(board)
-    score += evaluate_king_safety(board, endgame)
+    score = taper(mg, eg, phase)
+    score += pawn_score
     score += evaluate_mobility(board)
     score += evaluate_bishop_pair(board)
     
@@ -0,0 +1,137 @@
+"""
+Export the value network for CPU inference and check the exports.
+
+Writes the TorchScript and int8 variants of the weights (see
+neural_model.MODEL_VARIANTS) next to them. It then compares every variant's
+values against the fp32 model on sample positions, and times each at
+batch sizes 1, 32 and 256. The run fails when a variant strays from fp32 by
+more than the tolerance.
+
+    python export_model.py --weights nets/value.pth
+    python export_model.py --no-export --json bench_model.json
+
+Select a variant for serving with NEURAL_MODEL_VARIANT.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import chess
+import numpy as np
+import torch
+
+from neural_model import MODEL_VARIANTS, export_model, load_model, predict_values, serialize_board
+
+BATCH_SIZES       = (1, 32, 256)
+DEFAULT_SAMPLES   = 4096
+DEFAULT_TOLERANCE = 0.05
+DEFAULT_REPEATS   = 50
+
+
+def sample_positions(n, data=None, seed=0):
+    """`n` serialized positions: from a generate_training_set dataset, or random games."""
+    if data and os.path.exists(data):
+        with np.load(data) as dataset:
+            X = dataset["arr_0"]
+            return X[np.random.default_rng(seed).choice(len(X), min(n, len(X)), replace=False)]
+    rng = random.Random(seed)
+    positions = []
+    board = chess.Board()
+    while len(positions) < n:
+        moves = list(board.legal_moves)
+        if not moves or board.ply() > 120:
+            board = chess.Board()
+            continue
+        board.push(rng.choice(moves))
+        positions.append(serialize_board(board))
+    return np.stack(positions)
+
+
+def check_accuracy(model, reference, positions):
+    """Error of `model` against the `reference` values of `positions`."""
+    values = predict_values(model, positions)
+    error  = np.abs(values - reference)
+    return {
+        "max_abs_error": round(float(error.max()), 5),
+        "mean_abs_error": round(float(error.mean()), 5),
+        # Positions where both agree on who is better
+        "sign_agreement": round(float(np.mean(np.sign(values) == np.sign(reference))), 4),
+    }
+
+
+def benchmark(model, positions, batch_sizes=BATCH_SIZES, repeats=DEFAULT_REPEATS):
+    """Median latency and throughput of predict_values per batch size."""
+    results = {}
+    for size in batch_sizes:
+        batch = np.resize(positions, (size, 64))
+        for _ in range(3):
+            predict_values(model, batch)
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict_values(model, batch)
+            times.append(time.perf_counter() - start)
+        median = float(np.median(times))
+        results[str(size)] = {
+            "latency_ms": round(median * 1000, 3),
+            "positions_per_s": int(size / median),
+        }
+    return results
+
+
+def run(weights_path, variants=MODEL_VARIANTS, samples=DEFAULT_SAMPLES, data=None,
+        repeats=DEFAULT_REPEATS, export=True):
+    """Export, check and benchmark every variant; returns a summary dict."""
+    if export:
+        for variant in variants:
+            if variant != "fp32":
+                export_model(weights_path, variant)
+    positions = sample_positions(samples, data)
+    reference = predict_values(load_model(weights_path), positions)
+    summary = {"torch_threads": torch.get_num_threads(), "samples": len(positions), "variants": {}}
+    for variant in variants:
+        model = load_model(weights_path, variant=variant)
+        summary["variants"][variant] = {
+            "accuracy": check_accuracy(model, reference, positions),
+            "batches": benchmark(model, positions, repeats=repeats),
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export and benchmark the value network.")
+    parser.add_argument("--weights", default=os.getenv("NEURAL_MODEL_PATH", "nets/value.pth"))
+    parser.add_argument("--variants", nargs="+", choices=MODEL_VARIANTS, default=list(MODEL_VARIANTS))
+    parser.add_argument("--data", default="processed/dataset_25M.npz",
+                        help="dataset to sample positions from; random games when missing")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="largest allowed absolute value error against fp32")
+    parser.add_argument("--no-export", action="store_true", help="check existing exports only")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    summary = run(args.weights, args.variants, args.samples, args.data,
+                  args.repeats, export=not args.no_export)
+    ok = True
+    print(f"{'variant':<12} {'batch':>5} {'latency ms':>11} {'pos/s':>9}   max err  sign agree")
+    for variant, result in summary["variants"].items():
+        accuracy = result["accuracy"]
+        for size, timing in result["batches"].items():
+            print(f"{variant:<12} {size:>5} {timing['latency_ms']:>11.3f} {timing['positions_per_s']:>9}"
+                  f"   {accuracy['max_abs_error']:.5f}  {accuracy['sign_agreement']:.2%}")
+        if accuracy["max_abs_error"] > args.tolerance:
+            ok = False
+            print(f"FAIL: {variant} differs from fp32 by more than {args.tolerance}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,29 +4,39 @@ import chess
 import chess.pgn
 import numpy as np
 
-def serialize_board(board):
+from serialization import serialize_board
+
+# Game results we train on, from White's perspective
+RESULT_VALUES = {'1-0': 1, '0-1': -1, '1/2-1/2': 0}
+
+
+def read_games(path):
     """
-    Converts the board to a flat array of 64 integers.
-    Mapping:
-      - Empty square: 0
-      - White pieces: Pawn=1, Knight=2, Bishop=3, Rook=4, Queen=5, King=6
-      - Black pieces: Pawn=-1, Knight=-2, Bishop=-3, Rook=-4, Queen=-5, King=-6
+    Yields (game, label) for every decided or drawn game in one PGN file,
+    with label from RESULT_VALUES. Games with any other result (e.g. '*')
+    are skipped.
     """
-    mapping = {None: 0}
-    mapping.update({
-        (chess.PAWN, True): 1,   (chess.PAWN, False): -1,
-        (chess.KNIGHT, True): 2, (chess.KNIGHT, False): -2,
-        (chess.BISHOP, True): 3, (chess.BISHOP, False): -3,
-        (chess.ROOK, True): 4,   (chess.ROOK, False): -4,
-        (chess.QUEEN, True): 5,  (chess.QUEEN, False): -5,
-        (chess.KING, True): 6,   (chess.KING, False): -6,
-    })
-    
-    board_array = []
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        board_array.append(mapping[(piece.piece_type, piece.color)] if piece is not None else 0)
-    return np.array(board_array, dtype=np.int8)
+    with open(path, encoding="utf-8", errors="replace") as pgn_file:
+        while True:
+            game = chess.pgn.read_game(pgn_file)
+            if game is None:
+                break
+            result = game.headers.get("Result", None)
+            if result not in RESULT_VALUES:
+                continue
+            yield game, RESULT_VALUES[result]
+
+
+def pgn_files(data_folder="data"):
+    """Paths of the PGN files in `data_folder`, sorted."""
+    return [os.path.join(data_folder, fn) for fn in sorted(os.listdir(data_folder))
+            if fn.endswith(".pgn")]
+
+
+def iter_games(data_folder="data"):
+    """(game, label) for the games of every PGN file in `data_folder` (see read_games)."""
+    for path in pgn_files(data_folder):
+        yield from read_games(path)
 
 
 def get_dataset(num_samples=None):
@@ -39,32 +49,18 @@ def get_dataset(num_samples=None):
     """
     X, Y = [], []
     game_count = 0
-    result_values = {'1-0': 1, '0-1': -1, '1/2-1/2': 0}
-    data_folder = "data"
-    
-    for fn in os.listdir(data_folder):
-        if not fn.endswith(".pgn"):
-            continue
-        path = os.path.join(data_folder, fn)
-        with open(path, encoding="utf-8", errors="replace") as pgn_file:
-            while True:
-                game = chess.pgn.read_game(pgn_file)
-                if game is None:
-                    break
-                result = game.headers.get("Result", None)
-                if result not in result_values:
-                    continue
-                label = result_values[result]
-                board = game.board()
-                for move in game.mainline_moves():
-                    board.push(move)
-                    serialized = serialize_board(board)
-                    X.append(serialized)
-                    Y.append(label)
-                print(f"Parsed game {game_count}: total samples so far = {len(X)}")
-                game_count += 1
-                if num_samples is not None and len(X) >= num_samples:
-                    return np.array(X), np.array(Y)
+
+    for game, label in iter_games():
+        board = game.board()
+        for move in game.mainline_moves():
+            board.push(move)
+            serialized = serialize_board(board)
+            X.append(serialized)
+            Y.append(label)
+        print(f"Parsed game {game_count}: total samples so far = {len(X)}")
+        game_count += 1
+        if num_samples is not None and len(X) >= num_samples:
+            return np.array(X), np.array(Y)
     return np.array(X), np.array(Y)
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+"""
+Gunicorn settings for serving the backend:
+
+    gunicorn app:app --config gunicorn.conf.py
+
+The app, with torch and the value network (NEURAL_PRELOAD), is imported
+once in the master (preload_app) and the workers are forked from it. They
+share the master's pages copy-on-write, so model weights and library code
+take memory once rather than once per worker. To keep those pages shared:
+  - the garbage collector is frozen before forking, so collections in a
+    worker do not write to (and so copy) the master's objects;
+  - fp32 network weights are memory-mapped from their file (see
+    neural_model.load_model), so they stay shared even across restarts.
+    TorchScript and int8 exports are read into the master's memory and
+    shared copy-on-write only;
+  - nothing runs the network in the master, whose OpenMP threads would
+    not survive the fork. A TorchScript or int8 variant without an
+    up-to-date export_model.py file would be compiled by tracing, which
+    runs it, so it is not preloaded: each worker compiles its own.
+Each worker serves requests on several threads (gthread), so the
+concurrent neural requests of different clients reach its inference
+service together and share batches; a sync worker would serve them one
+at a time. Each worker's torch is limited to its share of the cores, so
+workers running the network at once do not oversubscribe them. Worker memory is
+logged when a worker starts, every MEMORY_LOG_REQUESTS requests and on
+exit, to show how much of it stays shared.
+"""
+import gc
+import os
+import sys
+
+from process_memory import format_memory, memory_usage
+
+bind         = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers      = int(os.getenv("WEB_CONCURRENCY", 4))
+worker_class = "gthread"
+threads      = int(os.getenv("GUNICORN_THREADS", 4))
+preload_app  = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+if preload_app:
+    # The app loads the value network lazily unless told to at import
+    os.environ.setdefault("NEURAL_PRELOAD", "1")
+
+# Intra-op threads per worker; by default the cores split between workers
+torch_threads = int(os.getenv("TORCH_THREADS_PER_WORKER", max(1, (os.cpu_count() or 1) // workers)))
+# Also caps the OpenMP/MKL pools of libraries imported after this point
+for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(name, str(torch_threads))
+
+memory_log_requests = int(os.getenv("MEMORY_LOG_REQUESTS", 1000))
+
+
+def when_ready(server):
+    server.log.info("Master pid %s memory: %s", os.getpid(), format_memory(memory_usage()))
+
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # torch is only imported yet when the app was preloaded
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(torch_threads)
+    worker.requests_served = 0
+
+
+def post_worker_init(worker):
+    worker.log.info("Worker %s started, memory: %s", worker.pid, format_memory(memory_usage()))
+
+
+def post_request(worker, req, environ, resp):
+    worker.requests_served += 1
+    if memory_log_requests and worker.requests_served % memory_log_requests == 0:
+        worker.log.info("Worker %s after %d requests, memory: %s",
+                        worker.pid, worker.requests_served, format_memory(memory_usage()))
+
+
+def worker_exit(server, worker):
+    server.log.info("Worker %s exiting, memory: %s", worker.pid, format_memory(memory_usage()))
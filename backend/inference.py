@@ -0,0 +1,186 @@
+"""
+Micro-batching inference for the value network.
+
+Concurrent requests each hand a few dozen serialized positions to one
+InferenceService. A single worker thread gathers whatever is pending into
+one batch, up to `max_batch` positions or until the oldest request has
+waited `max_wait_ms`, runs one forward pass and hands each request its
+slice of the results. The forward function is injected, so this module
+does not depend on torch.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+MAX_BATCH   = int(os.getenv("NEURAL_MAX_BATCH", 256))
+MAX_WAIT_MS = float(os.getenv("NEURAL_MAX_WAIT_MS", 2))
+
+# Requests whose waits are kept for the latency percentiles
+LATENCY_WINDOW = 1000
+
+
+class _Request:
+    __slots__ = ("positions", "submitted", "done", "values", "error")
+
+    def __init__(self, positions):
+        self.positions = positions
+        self.submitted = time.perf_counter()
+        self.done      = threading.Event()
+        self.values    = None
+        self.error     = None
+
+
+class InferenceService:
+    """
+    Batches `forward` calls across threads. `forward` maps an (N, ...) array
+    of positions to N values; evaluate() blocks until its positions are
+    scored. A request is never split, so one larger than `max_batch` runs
+    alone. The worker thread starts on first use, also in forked children.
+    """
+
+    def __init__(self, forward, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.forward     = forward
+        self.max_batch   = max_batch
+        self.max_wait_ms = max_wait_ms
+        self._lock   = threading.Lock()
+        self._pid    = None
+        self._thread = None
+        self._pending = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.batches    = 0
+            self.requests   = 0
+            self.positions  = 0
+            self.forward_s  = 0.0
+            self.histogram  = {}
+            self._waits     = deque(maxlen=LATENCY_WINDOW)
+            self._wait_max  = 0.0
+            self._wait_sum  = 0.0
+
+    def evaluate(self, positions):
+        """Values of `positions`, scored in a batch shared with other callers."""
+        positions = np.asarray(positions)
+        if not len(positions):
+            return np.zeros(0, dtype=np.float32)
+        request = _Request(positions)
+        with self._lock:
+            self._ensure_worker()
+            self._pending += len(positions)
+            self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.values
+
+    def close(self):
+        """Stops the worker once the requests already queued are done."""
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                self._queue.put(None)
+                thread, self._thread = self._thread, None
+            else:
+                thread = None
+        if thread is not None:
+            thread.join()
+
+    def _ensure_worker(self):
+        # A forked child inherits neither the parent's thread nor a usable queue
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid    = os.getpid()
+            self._queue  = queue.Queue()
+            self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                            name="inference", daemon=True)
+            self._thread.start()
+
+    def _run(self, requests):
+        carry = None
+        stop  = False
+        while not stop:
+            first, carry = carry or requests.get(), None
+            if first is None:
+                break
+            batch    = [first]
+            size     = len(first.positions)
+            deadline = first.submitted + self.max_wait_ms / 1000
+            while size < self.max_batch:
+                try:
+                    request = requests.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                if size + len(request.positions) > self.max_batch:
+                    carry = request
+                    break
+                batch.append(request)
+                size += len(request.positions)
+            # A carried request was taken before any stop marker, so it
+            # always gets the next turn of the loop
+            self._run_batch(batch, size)
+
+    def _run_batch(self, batch, size):
+        start = time.perf_counter()
+        try:
+            values = np.asarray(self.forward(np.concatenate([r.positions for r in batch])))
+            values = np.split(values.reshape(size), np.cumsum([len(r.positions) for r in batch])[:-1])
+        except Exception as e:
+            values = [None] * len(batch)
+            for request in batch:
+                request.error = e
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.batches   += 1
+            self.requests  += len(batch)
+            self.positions += size
+            self.forward_s += elapsed
+            self._pending  -= size
+            bucket = 1
+            while bucket < size:
+                bucket *= 2
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+            for request in batch:
+                wait = start - request.submitted
+                self._waits.append(wait)
+                self._wait_sum += wait
+                self._wait_max  = max(self._wait_max, wait)
+        for request, value in zip(batch, values):
+            request.values = value
+            request.done.set()
+
+    def stats(self):
+        """
+        Queue depth (positions waiting), batch-size histogram keyed by the
+        power of two each size rounds up to, and the latency added by
+        batching: how long requests waited before their forward pass.
+        """
+        with self._lock:
+            waits = sorted(self._waits)
+
+            def percentile(q):
+                return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 3) if waits else 0.0
+
+            return {
+                "queue_depth": self._pending,
+                "batches": self.batches,
+                "requests": self.requests,
+                "positions": self.positions,
+                "mean_batch_size": round(self.positions / self.batches, 2) if self.batches else 0.0,
+                "batch_sizes": {str(k): v for k, v in sorted(self.histogram.items())},
+                "wait_ms": {
+                    "mean": round(self._wait_sum / self.requests * 1000, 3) if self.requests else 0.0,
+                    "p50": percentile(0.5),
+                    "p95": percentile(0.95),
+                    "max": round(self._wait_max * 1000, 3),
+                },
+                "forward_ms_per_batch": round(self.forward_s / self.batches * 1000, 3) if self.batches else 0.0,
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait_ms,
+            }
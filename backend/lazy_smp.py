@@ -0,0 +1,151 @@
+"""
+Lazy SMP: several processes search the same root and share results only
+through a shared-memory transposition table.
+
+Helpers start at staggered depths so they fill the table with entries the
+main search will need next. The main search runs in the calling process;
+when it finishes, helpers are stopped and the deepest completed result wins.
+"""
+import argparse
+import atexit
+import multiprocessing
+import os
+import queue
+import time
+
+import chess
+
+from chess_engine import Search, SearchResult
+from transposition import SharedTranspositionTable, DEFAULT_SIZE_MB
+
+# Default number of processes per move request (1 = no helpers)
+SEARCH_THREADS = int(os.getenv("SEARCH_THREADS", 1))
+
+# Seconds to wait for helpers to report after being stopped
+HELPER_JOIN_TIMEOUT = 2.0
+
+_context = multiprocessing.get_context(
+    "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# One shared table per worker process, reused across requests
+_shared_tt = None
+
+
+def get_shared_tt(size_mb=DEFAULT_SIZE_MB):
+    global _shared_tt
+    if _shared_tt is None or _shared_tt.size_mb != size_mb:
+        if _shared_tt is not None:
+            _shared_tt.close()
+        _shared_tt = SharedTranspositionTable(size_mb)
+    return _shared_tt
+
+
+@atexit.register
+def _close_shared_tt():
+    if _shared_tt is not None:
+        _shared_tt.close()
+
+
+def _helper(fen, helper_id, tt, max_depth, movetime_ms, options, stop_event, results):
+    """Search `fen` until stopped and report the deepest completed iteration."""
+    search = Search(
+        max_depth=max_depth, movetime_ms=movetime_ms, tt=tt,
+        options=options, stop_event=stop_event,
+    )
+    # Odd helpers run one ply ahead of the main search
+    result = search.run(chess.Board(fen), start_depth=1 + helper_id % 2)
+    results.put((
+        helper_id, result.depth, result.score,
+        [m.uci() for m in result.pv], search.nodes,
+    ))
+
+
+def parallel_search(board, threads=SEARCH_THREADS, max_depth=None, movetime_ms=None,
+                    max_nodes=None, options=None, tt_size_mb=DEFAULT_SIZE_MB):
+    """
+    Search `board` with `threads` processes; returns a SearchResult whose
+    `nodes` counts all processes. Its `stats` are the main search's, with
+    the nodes of all processes and the depth of the result reported.
+    `max_nodes` only bounds the main search.
+    """
+    threads = max(1, int(threads))
+    tt = get_shared_tt(tt_size_mb)
+
+    search = Search(
+        max_depth=max_depth, movetime_ms=movetime_ms, max_nodes=max_nodes,
+        tt=tt, options=options,
+    )
+    if threads == 1:
+        return search.run(board)
+
+    stop_event = _context.Event()
+    results    = _context.Queue()
+    helpers = [
+        _context.Process(
+            target=_helper,
+            args=(board.fen(), i, tt, search.max_depth, movetime_ms, options,
+                  stop_event, results),
+            daemon=True,
+        )
+        for i in range(1, threads)
+    ]
+    for p in helpers:
+        p.start()
+
+    try:
+        best = search.run(board)
+    finally:
+        stop_event.set()
+
+    total_nodes = search.nodes
+    deadline = time.monotonic() + HELPER_JOIN_TIMEOUT
+    for _ in helpers:
+        try:
+            _, depth, score, pv, nodes = results.get(
+                timeout=max(0.0, deadline - time.monotonic())
+            )
+        except queue.Empty:
+            break
+        total_nodes += nodes
+        # Prefer deeper results; the main search wins ties
+        if depth > best.depth and pv:
+            moves = [chess.Move.from_uci(u) for u in pv]
+            best  = SearchResult(moves[0], score, depth, best.nodes, moves, best.stats)
+    for p in helpers:
+        p.join(timeout=max(0.0, deadline - time.monotonic()))
+        if p.is_alive():
+            p.terminate()
+
+    best.nodes = best.stats.nodes = total_nodes
+    best.stats.depth = max(best.stats.depth, best.depth)
+    return best
+
+
+def benchmark(fen, depth, max_threads, tt_size_mb=DEFAULT_SIZE_MB):
+    """Time-to-depth for 1..max_threads processes; returns [(threads, seconds, nodes)]."""
+    rows = []
+    for threads in range(1, max_threads + 1):
+        # Fresh table per run so earlier runs don't help later ones
+        get_shared_tt(tt_size_mb).clear()
+        start  = time.perf_counter()
+        result = parallel_search(
+            chess.Board(fen), threads=threads, max_depth=depth, tt_size_mb=tt_size_mb
+        )
+        rows.append((threads, time.perf_counter() - start, result.nodes))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lazy SMP time-to-depth scaling")
+    parser.add_argument("--fen", default="r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tt-mb", type=int, default=DEFAULT_SIZE_MB)
+    args = parser.parse_args()
+
+    rows = benchmark(args.fen, args.depth, args.threads, args.tt_mb)
+    base = rows[0][1]
+    print(f"{'threads':>7} {'time(s)':>8} {'speedup':>7} {'nodes':>9}")
+    for threads, seconds, nodes in rows:
+        print(f"{threads:>7} {seconds:>8.2f} {base / seconds:>7.2f} {nodes:>9}")
@@ -0,0 +1,341 @@
+"""
+Monte Carlo tree search driven by a value evaluator.
+
+The tree lives in flat NumPy arrays indexed by node number, with the
+children of a node stored as one contiguous block, so a node costs about
+20 bytes instead of a Python object. Each round selects up to `batch_size`
+leaves, marking the path to each with a virtual loss so the next selection
+spreads to other lines. It then scores all new leaves with one evaluator
+call and backs the values up. The evaluator has the Search leaf_evaluator
+interface: a list of boards in, one value per board out, from White's
+point of view in -1..1. Finished games are scored exactly without it.
+
+Between consecutive moves of a game, the subtree of the new position is
+kept (see MCTS.search) so earlier playouts are not thrown away.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import chess
+import numpy as np
+
+import zobrist
+from transposition import encode_move, decode_move
+
+# Exploration weight of the selection rule
+C_PUCT = 1.5
+# Leaves selected under virtual loss and evaluated together
+BATCH_SIZE = int(os.getenv("MCTS_BATCH", 16))
+# Playouts when neither a playout nor a time budget is given
+DEFAULT_PLAYOUTS = 800
+# Visits a pending playout counts as lost until it is backed up
+VIRTUAL_LOSS = 1
+# Node arrays start this large and double when full
+INITIAL_NODES = 4096
+# Plies below the previous root searched for the new position on reuse
+REUSE_PLIES = 2
+# Games whose trees are kept by GameTrees
+MAX_TREES = int(os.getenv("MCTS_MAX_TREES", 32))
+
+_UNKNOWN = np.float32(np.nan)
+
+
+def _outcome(board):
+    """Value of a finished game for the player who just moved, or None."""
+    if not any(board.generate_legal_moves()):
+        return 1.0 if board.is_check() else 0.0
+    if board.is_insufficient_material():
+        return 0.0
+    return None
+
+
+class MCTSResult:
+    """
+    Outcome of a tree search: the most visited root move, the expected
+    result `value` from White's point of view (-1..1), the principal
+    variation along the most visited children, and search statistics.
+    """
+
+    def __init__(self, move=None, value=0.0, pv=None, stats=None):
+        self.move  = move
+        self.value = value
+        self.pv    = pv or []
+        self.stats = stats or {}
+
+
+class MCTS:
+    """
+    Array-backed search tree for one game. Per node:
+      parent, move (encode_move), first_child (-1 until expanded),
+      num_children, visits, value_sum (for the player who made the move
+      into the node) and terminal (outcome of a finished game, else NaN).
+    """
+
+    def __init__(self, evaluator, batch_size=BATCH_SIZE, c_puct=C_PUCT):
+        self.evaluator  = evaluator
+        self.batch_size = max(1, batch_size)
+        self.c_puct     = c_puct
+        self.lock       = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._allocate(INITIAL_NODES)
+        self.size     = 0
+        self.root     = self._new_nodes(-1, [None])
+        self.root_key = None
+
+    def _allocate(self, capacity):
+        self.parent       = np.full(capacity, -1, dtype=np.int32)
+        self.move         = np.zeros(capacity, dtype=np.uint16)
+        self.first_child  = np.full(capacity, -1, dtype=np.int32)
+        self.num_children = np.zeros(capacity, dtype=np.uint8)
+        self.visits       = np.zeros(capacity, dtype=np.int32)
+        self.value_sum    = np.zeros(capacity, dtype=np.float32)
+        self.terminal     = np.full(capacity, _UNKNOWN, dtype=np.float32)
+
+    _FIELDS = ("parent", "move", "first_child", "num_children", "visits", "value_sum", "terminal")
+
+    @property
+    def capacity(self):
+        return len(self.parent)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self._FIELDS)
+
+    def _new_nodes(self, parent, moves):
+        """Appends one node per move under `parent`; returns the first index."""
+        first = self.size
+        end   = first + len(moves)
+        if end > self.capacity:
+            capacity = self.capacity
+            while capacity < end:
+                capacity *= 2
+            for name in self._FIELDS:
+                old = getattr(self, name)
+                new = np.resize(old, capacity)
+                new[len(old):] = {"parent": -1, "first_child": -1, "terminal": _UNKNOWN}.get(name, 0)
+                setattr(self, name, new)
+        self.parent[first:end] = parent
+        self.move[first:end]   = [encode_move(m) for m in moves]
+        self.size = end
+        return first
+
+    def _expand(self, node, board):
+        moves = list(board.legal_moves)
+        self.first_child[node]  = self._new_nodes(node, moves)
+        self.num_children[node] = len(moves)
+
+    def _best_child(self, node):
+        """Child maximizing Q + c * sqrt(N_parent) / (1 + N_child)."""
+        first  = self.first_child[node]
+        end    = first + self.num_children[node]
+        visits = self.visits[first:end]
+        q = np.divide(self.value_sum[first:end], visits,
+                      out=np.zeros(end - first, dtype=np.float32), where=visits > 0)
+        u = self.c_puct * np.sqrt(self.visits[node] + 1) / (1 + visits)
+        return first + int(np.argmax(q + u))
+
+    def _select(self, board):
+        """Path from the root to a leaf, pushing its moves on `board`."""
+        node = self.root
+        path = [node]
+        while self.num_children[node]:
+            node = self._best_child(node)
+            board.push(decode_move(int(self.move[node])))
+            path.append(node)
+        return np.array(path)
+
+    def _backup(self, path, value):
+        """Adds `value` (for the player moving into the leaf) along `path`, undoing virtual loss."""
+        signs = np.where(np.arange(len(path))[::-1] % 2 == 0, 1.0, -1.0).astype(np.float32)
+        self.value_sum[path] += signs * value + VIRTUAL_LOSS
+        self.visits[path]    += 1 - VIRTUAL_LOSS
+
+    def _set_root(self, board):
+        """Keep the subtree of `board` if it is within REUSE_PLIES of the root."""
+        key = zobrist.zobrist_key(board)
+        if self.root_key is not None and key != self.root_key:
+            node = self._find(self._root_board, self.root, key, REUSE_PLIES)
+            if node is None:
+                self.clear()
+            else:
+                self._reroot(node)
+        self.root_key    = key
+        self._root_board = board.copy(stack=False)
+
+    def _find(self, board, node, key, plies):
+        if not plies:
+            return None
+        first = self.first_child[node]
+        for child in range(first, first + self.num_children[node]):
+            # An unvisited child has no playouts worth keeping
+            if not self.visits[child]:
+                continue
+            board.push(decode_move(int(self.move[child])))
+            try:
+                if zobrist.zobrist_key(board) == key:
+                    return child
+                found = self._find(board, child, key, plies - 1)
+                if found is not None:
+                    return found
+            finally:
+                board.pop()
+        return None
+
+    def _reroot(self, node):
+        """Compact the subtree under `node` into fresh arrays, `node` becoming 0."""
+        old = {name: getattr(self, name) for name in self._FIELDS}
+        self._allocate(max(INITIAL_NODES, self.capacity))
+        for name in ("move", "num_children", "visits", "value_sum", "terminal"):
+            getattr(self, name)[0] = old[name][node]
+
+        # Breadth first, one level at a time: each expanded node's children
+        # get the next block of new indices, in their original order
+        level_old = np.array([node])
+        level_new = np.array([0])
+        size = 1
+        while len(level_old):
+            expanded = old["first_child"][level_old] >= 0
+            parents_old, parents_new = level_old[expanded], level_new[expanded]
+            counts = old["num_children"][parents_old].astype(np.int64)
+            total  = int(counts.sum())
+            if not total:
+                break
+            offsets = np.cumsum(counts) - counts
+            self.first_child[parents_new] = size + offsets
+            child_old = np.repeat(old["first_child"][parents_old] - offsets, counts) + np.arange(total)
+            child_new = np.arange(size, size + total)
+            self.parent[child_new] = np.repeat(parents_new, counts)
+            for name in ("move", "num_children", "visits", "value_sum", "terminal"):
+                getattr(self, name)[child_new] = old[name][child_old]
+            level_old, level_new = child_old, child_new
+            size += total
+        self.size = size
+        self.root = 0
+
+    def search(self, board, playouts=None, movetime_ms=None):
+        """
+        Runs playouts from `board` until `playouts` are done or `movetime_ms`
+        has elapsed (DEFAULT_PLAYOUTS without either) and returns an
+        MCTSResult. The tree is reused when `board` follows the previous
+        root by up to REUSE_PLIES moves, otherwise rebuilt.
+        """
+        with self.lock:
+            return self._search(board, playouts, movetime_ms)
+
+    def _search(self, board, playouts, movetime_ms):
+        start = time.perf_counter()
+        if playouts is None and movetime_ms is None:
+            playouts = DEFAULT_PLAYOUTS
+        deadline = start + movetime_ms / 1000.0 if movetime_ms is not None else None
+
+        self._set_root(board)
+        reused = int(self.visits[self.root])
+        board  = self._root_board.copy(stack=False)
+        if not self.num_children[self.root]:
+            if _outcome(board) is not None:
+                return MCTSResult(stats={"playouts": 0})
+            self._expand(self.root, board)
+
+        done = batches = evaluated = collisions = 0
+        while (playouts is None or done < playouts) and (deadline is None or time.perf_counter() < deadline):
+            pending = {}
+            limit = self.batch_size if playouts is None else min(self.batch_size, playouts - done)
+            for _ in range(limit):
+                path = self._select(board)
+                leaf = int(path[-1])
+                if leaf in pending:
+                    # Virtual loss did not steer away from a leaf already queued
+                    collisions += 1
+                    for _ in range(len(path) - 1):
+                        board.pop()
+                    break
+                self.visits[path]    += VIRTUAL_LOSS
+                self.value_sum[path] -= VIRTUAL_LOSS
+                outcome = self.terminal[leaf]
+                if np.isnan(outcome):
+                    outcome = _outcome(board)
+                    if outcome is not None:
+                        self.terminal[leaf] = outcome
+                if outcome is not None and not np.isnan(outcome):
+                    self._backup(path, float(outcome))
+                    done += 1
+                else:
+                    pending[leaf] = (path, board.copy(stack=False))
+                for _ in range(len(path) - 1):
+                    board.pop()
+
+            if pending:
+                leaves = list(pending.values())
+                values = self.evaluator([b for _, b in leaves])
+                for (path, leaf_board), value in zip(leaves, values):
+                    # White's view to the view of the player who moved into the leaf
+                    value = float(value) if leaf_board.turn == chess.BLACK else -float(value)
+                    self._expand(int(path[-1]), leaf_board)
+                    self._backup(path, value)
+                batches   += 1
+                evaluated += len(leaves)
+                done      += len(leaves)
+
+        return self._result(start, done, batches, evaluated, collisions, reused)
+
+    def _result(self, start, done, batches, evaluated, collisions, reused):
+        root  = self.root
+        first = self.first_child[root]
+        children = np.arange(first, first + self.num_children[root])
+        best = int(children[np.argmax(self.visits[children])])
+
+        pv, node = [], best
+        while True:
+            pv.append(decode_move(int(self.move[node])))
+            if not self.num_children[node] or not self.visits[node]:
+                break
+            first = self.first_child[node]
+            block = self.visits[first:first + self.num_children[node]]
+            if not block.max():
+                break
+            node = first + int(np.argmax(block))
+
+        # Value for the side to move at the root, turned to White's view
+        value = float(self.value_sum[best] / max(1, self.visits[best]))
+        if self._root_board.turn == chess.BLACK:
+            value = -value
+        elapsed = time.perf_counter() - start
+        return MCTSResult(pv[0], round(value, 4), pv, {
+            "playouts": done,
+            "evaluated": evaluated,
+            "batches": batches,
+            "mean_batch_size": round(evaluated / batches, 2) if batches else 0.0,
+            "collisions": collisions,
+            "reused_visits": reused,
+            "root_visits": int(self.visits[root]),
+            "nodes": self.size,
+            "memory_kb": round(self.nbytes / 1024, 1),
+            "time_ms": round(elapsed * 1000, 1),
+            "playouts_per_s": int(done / elapsed) if elapsed > 0 else 0,
+        })
+
+
+class GameTrees:
+    """The MCTS tree of each of the most recent MAX_TREES games, by game id."""
+
+    def __init__(self, evaluator, max_trees=MAX_TREES, **options):
+        self.evaluator = evaluator
+        self.max_trees = max_trees
+        self.options   = options
+        self._trees    = OrderedDict()
+        self._lock     = threading.Lock()
+
+    def get(self, game_id):
+        """Tree for `game_id`, new or reused; a fresh one when game_id is None."""
+        if game_id is None:
+            return MCTS(self.evaluator, **self.options)
+        with self._lock:
+            tree = self._trees.pop(game_id, None) or MCTS(self.evaluator, **self.options)
+            self._trees[game_id] = tree
+            while len(self._trees) > self.max_trees:
+                self._trees.popitem(last=False)
+            return tree
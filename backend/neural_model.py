@@ -1,34 +1,14 @@
 # neural_model.py
+import os
+import warnings
+
 import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-import chess
 
-def serialize_board(board):
-    """
-    Serializes the board to a flat numpy array of shape (64,) using the following mapping:
-      - Empty square: 0
-      - White pieces: Pawn=1, Knight=2, Bishop=3, Rook=4, Queen=5, King=6
-      - Black pieces: Pawn=-1, Knight=-2, Bishop=-3, Rook=-4, Queen=-5, King=-6
-    """
-    mapping = {None: 0}
-    mapping.update({
-        (chess.PAWN, True): 1,   (chess.PAWN, False): -1,
-        (chess.KNIGHT, True): 2, (chess.KNIGHT, False): -2,
-        (chess.BISHOP, True): 3, (chess.BISHOP, False): -3,
-        (chess.ROOK, True): 4,   (chess.ROOK, False): -4,
-        (chess.QUEEN, True): 5,  (chess.QUEEN, False): -5,
-        (chess.KING, True): 6,   (chess.KING, False): -6,
-    })
-    board_array = []
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        if piece is None:
-            board_array.append(0)
-        else:
-            board_array.append(mapping[(piece.piece_type, piece.color)])
-    return np.array(board_array, dtype=np.int8)
+# The network's input encoding, kept importable from here
+from serialization import serialize_board, serialize_boards
 
 class Net(nn.Module):
     def __init__(self):
@@ -49,8 +29,90 @@ class Net(nn.Module):
         x = self.fc2(x)
         return torch.tanh(x)
 
-def load_model(weights_path="nets/value.pth", device="cpu"):
+def predict_values(model, positions, device="cpu"):
+    """
+    Values of a stack of serialized boards, shape (N, 64), as a NumPy array
+    of N floats in [-1, 1] (positive favours White).
+    """
+    tensor = torch.as_tensor(np.asarray(positions), dtype=torch.float32).view(-1, 1, 8, 8).to(device)
+    with torch.no_grad():
+        return model(tensor).cpu().numpy().reshape(-1)
+
+# Inference variants of the value network: the eager fp32 Net, the same
+# traced and frozen with TorchScript, and TorchScript with its linear layers
+# dynamically quantized to int8 (convolutions stay fp32; CPU only)
+MODEL_VARIANTS = ("fp32", "torchscript", "int8")
+
+def exported_path(weights_path, variant):
+    """File export_model writes `variant` of the weights at `weights_path` to."""
+    root, _ = os.path.splitext(weights_path)
+    return f"{root}.{variant}.pt"
+
+class _jit_warnings(warnings.catch_warnings):
+    """
+    Silences the deprecation warnings of torch.jit and dynamic quantization:
+    torch.compile and torch.export, the suggested replacements, need a
+    compiler toolchain at run time, while TorchScript files load without one.
+    """
+
+    def __enter__(self):
+        super().__enter__()
+        warnings.simplefilter("ignore", FutureWarning)
+        warnings.filterwarnings("ignore", "torch.quantize_per_tensor", UserWarning)
+        warnings.filterwarnings("ignore", "torch.ao.quantization", DeprecationWarning)
+
+def compile_model(model, variant, device="cpu"):
+    """The eval-mode fp32 `model` as inference `variant`."""
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant {variant!r}, expected one of {MODEL_VARIANTS}")
+    if variant == "fp32":
+        return model
+    if variant == "int8" and device != "cpu":
+        raise ValueError("The int8 model variant runs on CPU only")
+    with torch.no_grad(), _jit_warnings():
+        if variant == "int8":
+            model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+        traced = torch.jit.trace(model, torch.zeros(1, 1, 8, 8, device=device))
+        return torch.jit.freeze(traced)
+
+def export_model(weights_path="nets/value.pth", variant="torchscript"):
+    """Saves `variant` of the weights at `weights_path`; returns the file written."""
+    path = exported_path(weights_path, variant)
+    model = compile_model(load_model(weights_path), variant)
+    with _jit_warnings():
+        torch.jit.save(model, path)
+    return path
+
+def current_export(weights_path, variant):
+    """The export_model file of `variant`, or None when missing or older than the weights."""
+    path = exported_path(weights_path, variant)
+    if not os.path.exists(path):
+        return None
+    if os.path.exists(weights_path) and os.path.getmtime(path) < os.path.getmtime(weights_path):
+        return None
+    return path
+
+def load_model(weights_path="nets/value.pth", device="cpu", variant="fp32", mmap=False):
+    """
+    The value network for inference as `variant` (see MODEL_VARIANTS). A
+    TorchScript variant is read from its export_model file when one exists
+    and is not older than the weights (which were then retrained),
+    otherwise compiled from the weights at load time.
+
+    With `mmap`, fp32 weights on CPU stay memory-mapped from the file
+    instead of being copied, so every process serving them shares one copy.
+    TorchScript variants are always loaded into private memory.
+    """
+    if variant != "fp32":
+        path = current_export(weights_path, variant)
+        if path is not None:
+            if variant == "int8" and device != "cpu":
+                raise ValueError("The int8 model variant runs on CPU only")
+            with _jit_warnings():
+                return torch.jit.load(path, map_location=device)
+        return compile_model(load_model(weights_path, device), variant, device)
+    mmap  = mmap and device == "cpu"
     model = Net().to(device)
-    model.load_state_dict(torch.load(weights_path, map_location=device))
+    model.load_state_dict(torch.load(weights_path, map_location=device, mmap=mmap), assign=mmap)
     model.eval()
     return model
@@ -0,0 +1,200 @@
+"""
+Efficiently updatable neural evaluation (NNUE-style) on NumPy int16 weights.
+
+Inputs are 768 sparse piece-square features (own/enemy x piece type x
+square), seen from each side: Black's view is mirrored vertically so both
+share one weight matrix. The first layer is kept as an accumulator per
+side: the sum of the weight rows of every active feature. A move changes
+two to four features, so the accumulators are updated incrementally
+(see NNUE.update) instead of recomputed. The output layer reads both
+accumulators, White's first, through a clipped ReLU.
+
+The training data (generate_training_set) has no side to move, so the
+network scores positions from White's point of view.
+
+Weights are quantized: the accumulator is scaled by QA and output weights
+by QB, so evaluation is integer arithmetic. Train with train_nnue.py.
+"""
+import os
+
+import chess
+import numpy as np
+
+from serialization import serialize_boards
+
+# Accumulator width per side
+HIDDEN = 128
+# Quantization scales of the accumulator and of the output weights
+QA = 255
+QB = 64
+# Centipawns per unit of the network's (pre-tanh) output
+CP_SCALE = 400
+
+NUM_FEATURES = 768
+# Padding feature with an all-zero weight row, for fixed-width feature lists
+NO_FEATURE = NUM_FEATURES
+MAX_ACTIVE = 32
+
+DEFAULT_PATH = os.getenv("NNUE_PATH", "nets/nnue.npz")
+
+
+def feature(perspective, color, piece_type, square):
+    """Feature index of a piece as seen by `perspective`."""
+    if perspective == chess.BLACK:
+        square ^= 56
+    return (0 if color == perspective else 384) + (piece_type - 1) * 64 + square
+
+
+# _FEATURES[color][piece_type][square]: the feature for both perspectives
+_FEATURES = [
+    [None] + [
+        [np.array([feature(chess.WHITE, color, pt, sq), feature(chess.BLACK, color, pt, sq)])
+         for sq in chess.SQUARES]
+        for pt in chess.PIECE_TYPES
+    ]
+    for color in (chess.BLACK, chess.WHITE)
+]
+
+
+def board_features(board):
+    """Active feature indices of both perspectives, White's first."""
+    pieces = board.piece_map().items()
+    return [
+        [feature(perspective, p.color, p.piece_type, sq) for sq, p in pieces]
+        for perspective in (chess.WHITE, chess.BLACK)
+    ]
+
+
+# Feature of every serialize_board code (-6..6, index + 6) on every square,
+# for each perspective; code 0 (empty) maps to NO_FEATURE
+def _array_feature_table():
+    table = np.full((2, 13, 64), NO_FEATURE, dtype=np.int64)
+    for p, perspective in enumerate((chess.WHITE, chess.BLACK)):
+        for code in range(-6, 7):
+            if code:
+                color = chess.WHITE if code > 0 else chess.BLACK
+                for sq in chess.SQUARES:
+                    table[p, code + 6, sq] = feature(perspective, color, abs(code), sq)
+    return table
+
+
+_ARRAY_FEATURES = _array_feature_table()
+
+
+def array_features(arrays):
+    """
+    (N, 2, MAX_ACTIVE) feature indices of serialized boards (N, 64), padded
+    with NO_FEATURE. Used to train from the generate_training_set dataset.
+    """
+    arrays = np.asarray(arrays, dtype=np.int64).reshape(-1, 64)
+    squares = np.arange(64)
+    features = _ARRAY_FEATURES[:, arrays + 6, squares]        # (2, N, 64)
+    features.sort(axis=2)
+    return features[:, :, :MAX_ACTIVE].transpose(1, 0, 2)
+
+
+class NNUE:
+    """
+    Quantized network: w1 (NUM_FEATURES + 1, HIDDEN) int16 with a zero
+    padding row, b1 (HIDDEN,) int16, w2 (2 * HIDDEN,) int16, b2 int32.
+    """
+
+    def __init__(self, w1, b1, w2, b2):
+        self.w1 = np.asarray(w1, dtype=np.int16)
+        self.b1 = np.asarray(b1, dtype=np.int16)
+        self.w2 = np.asarray(w2, dtype=np.int32)
+        self.b2 = int(b2)
+        self.hidden = self.b1.shape[0]
+        if self.w1.shape[0] == NUM_FEATURES:
+            self.w1 = np.vstack([self.w1, np.zeros((1, self.hidden), dtype=np.int16)])
+
+    @classmethod
+    def from_float(cls, w1, b1, w2, b2):
+        """Quantize float weights (accumulator in 0..1 units, output in tanh units)."""
+        limit = np.iinfo(np.int16).max
+        return cls(
+            np.clip(np.round(np.asarray(w1) * QA), -limit, limit),
+            np.clip(np.round(np.asarray(b1) * QA), -limit, limit),
+            np.clip(np.round(np.asarray(w2) * QB), -limit, limit),
+            round(float(b2) * QA * QB),
+        )
+
+    @classmethod
+    def random(cls, hidden=HIDDEN, seed=0):
+        """Small random network, for tests and benchmarks."""
+        rng = np.random.default_rng(seed)
+        return cls.from_float(rng.normal(0, 0.05, (NUM_FEATURES, hidden)),
+                              rng.uniform(0, 0.5, hidden),
+                              rng.normal(0, 0.2, 2 * hidden), 0.0)
+
+    def save(self, path):
+        np.savez(path, w1=self.w1[:NUM_FEATURES], b1=self.b1, w2=self.w2.astype(np.int16), b2=self.b2)
+
+    def refresh(self, board):
+        """Accumulators (2, hidden) int16 of `board` computed from scratch."""
+        acc = np.empty((2, self.hidden), dtype=np.int16)
+        for p, features in enumerate(board_features(board)):
+            acc[p] = self.b1 + self.w1[features].sum(axis=0, dtype=np.int16)
+        return acc
+
+    def update(self, board, move, acc):
+        """
+        Accumulators after `move`, given `acc` for the current position.
+        Call before pushing the move. Null moves leave them unchanged.
+        """
+        if not move:
+            return acc
+        color      = board.turn
+        from_sq    = move.from_square
+        to_sq      = move.to_square
+        piece_type = board.piece_type_at(from_sq)
+        own, enemy = _FEATURES[color], _FEATURES[not color]
+        w1 = self.w1
+
+        # One (2, hidden) row pair per changed piece: both perspectives at once
+        if piece_type == chess.KING and board.is_castling(move):
+            back_rank = from_sq & ~7
+            if board.is_kingside_castling(move):
+                king_to, rook_from, rook_to = back_rank + 6, back_rank + 7, back_rank + 5
+            else:
+                king_to, rook_from, rook_to = back_rank + 2, back_rank, back_rank + 3
+            return (acc + w1[own[chess.KING][king_to]] - w1[own[chess.KING][from_sq]]
+                    + w1[own[chess.ROOK][rook_to]] - w1[own[chess.ROOK][rook_from]])
+
+        acc = acc + w1[own[move.promotion or piece_type][to_sq]] - w1[own[piece_type][from_sq]]
+        captured = board.piece_type_at(to_sq)
+        if captured:
+            acc -= w1[enemy[captured][to_sq]]
+        elif piece_type == chess.PAWN and board.is_en_passant(move):
+            acc -= w1[enemy[chess.PAWN][to_sq - 8 if color == chess.WHITE else to_sq + 8]]
+        return acc
+
+    def output(self, acc):
+        """Raw integer output of accumulators `acc`: the float output * QA * QB."""
+        hidden = np.clip(acc, 0, QA).astype(np.int32).reshape(-1)
+        return int(hidden @ self.w2) + self.b2
+
+    def evaluate(self, acc):
+        """Centipawns from White's point of view for accumulators `acc`."""
+        return self.output(acc) * CP_SCALE // (QA * QB)
+
+    def evaluate_board(self, board):
+        return self.evaluate(self.refresh(board))
+
+    def values(self, boards):
+        """
+        White-view values (-1..1) of many boards at once, the interface of
+        Search's leaf_evaluator and the MCTS evaluator.
+        """
+        if not boards:
+            return np.zeros(0)
+        features = array_features(serialize_boards(boards))
+        acc = self.b1.astype(np.int32) + self.w1[features].sum(axis=2, dtype=np.int32)
+        hidden = np.clip(acc, 0, QA).reshape(len(boards), -1)
+        return np.tanh((hidden @ self.w2 + self.b2) / (QA * QB))
+
+
+def load(path=DEFAULT_PATH):
+    """NNUE network saved by NNUE.save (e.g. by train_nnue.py)."""
+    with np.load(path) as data:
+        return NNUE(data["w1"], data["b1"], data["w2"], int(data["b2"]))
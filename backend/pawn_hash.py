@@ -0,0 +1,72 @@
+"""
+Fixed-capacity pawn hash table.
+
+Pawn structure and the king pawn shield only depend on where the pawns and
+kings stand, which rarely changes between sibling nodes. Their scores are
+cached under a key built from the pawn-only Zobrist key and both king
+squares (see pawn_key).
+"""
+import os
+import chess
+
+from zobrist import PIECE_KEYS
+
+# Approximate bytes per stored entry (tuple + ints + list slot)
+ENTRY_BYTES = 120
+
+DEFAULT_SIZE_MB = float(os.getenv("PAWN_HASH_MB", 2))
+
+_KING_KEYS = (PIECE_KEYS[chess.BLACK][chess.KING], PIECE_KEYS[chess.WHITE][chess.KING])
+
+
+def pawn_key(board):
+    """Zobrist key of the pawns alone (XOR of their polyglot piece keys)."""
+    key = 0
+    for color in (chess.WHITE, chess.BLACK):
+        keys = PIECE_KEYS[color][chess.PAWN]
+        for sq in chess.scan_forward(board.pawns & board.occupied_co[color]):
+            key ^= keys[sq]
+    return key
+
+
+def king_key(board):
+    """Key of both king squares, combined with a pawn key for the shield term."""
+    key = 0
+    for color in (chess.WHITE, chess.BLACK):
+        sq = board.king(color)
+        if sq is not None:
+            key ^= _KING_KEYS[color][sq]
+    return key
+
+
+class PawnHashTable:
+    """
+    Bounded always-replace cache of (pawn structure, king shield) scores.
+    Memory stays around `size_mb`; `probes` and `hits` count lookups.
+    """
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB):
+        self.size_mb   = size_mb
+        self.num_slots = max(1, int(size_mb * 2**20) // ENTRY_BYTES)
+        self.clear()
+
+    def clear(self):
+        self._slots = [None] * self.num_slots
+        self.probes = 0
+        self.hits   = 0
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def probe(self, key):
+        """Returns (pawn structure score, king shield score) or None."""
+        self.probes += 1
+        entry = self._slots[key % self.num_slots]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1], entry[2]
+        return None
+
+    def store(self, key, pawn_score, shield_score):
+        self._slots[key % self.num_slots] = (key, pawn_score, shield_score)
@@ -0,0 +1,120 @@
+"""
+Perft: count leaf nodes of the legal move tree to a fixed depth.
+
+Checks move generation against published node counts and measures raw
+move-generation plus make/unmake throughput. Only `legal_moves`, `push`
+and `pop` are used, so any board representation exposing those can be
+passed in place of chess.Board.
+"""
+import argparse
+import time
+
+import chess
+
+# Standard perft positions with published node counts per depth
+# (https://www.chessprogramming.org/Perft_Results)
+POSITIONS = {
+    "start": (
+        chess.STARTING_FEN,
+        {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609},
+    ),
+    # Castling, en passant, promotions and pins all at once
+    "kiwipete": (
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        {1: 48, 2: 2039, 3: 97862, 4: 4085603},
+    ),
+    # En passant captures that expose the king along the rank
+    "en_passant": (
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624},
+    ),
+    # Promotions, underpromotions and castling out of check
+    "promotions": (
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        {1: 6, 2: 264, 3: 9467, 4: 422333},
+    ),
+    # Promotion with capture next to castling rights
+    "castling": (
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        {1: 44, 2: 1486, 3: 62379, 4: 2103487},
+    ),
+    "middlegame": (
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        {1: 46, 2: 2079, 3: 89890, 4: 3894594},
+    ),
+}
+
+
+def perft(board, depth, bulk=True):
+    """
+    Number of leaf nodes `depth` plies below `board`. With `bulk`, moves at
+    the last ply are counted without being made; turn it off to include
+    make/unmake of the leaves in timings.
+    """
+    if depth <= 0:
+        return 1
+    if depth == 1 and bulk:
+        return sum(1 for _ in board.legal_moves)
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += perft(board, depth - 1, bulk)
+        board.pop()
+    return nodes
+
+
+def divide(board, depth, bulk=True):
+    """Perft split by root move: {uci: nodes}."""
+    counts = {}
+    for move in board.legal_moves:
+        board.push(move)
+        counts[move.uci()] = perft(board, depth - 1, bulk)
+        board.pop()
+    return counts
+
+
+def run(fen, depth, board_factory=chess.Board, bulk=True):
+    """Perft one position; returns (nodes, seconds)."""
+    board = board_factory(fen)
+    start = time.perf_counter()
+    nodes = perft(board, depth, bulk)
+    return nodes, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perft move-generation benchmark")
+    parser.add_argument("--position", choices=sorted(POSITIONS), action="append",
+                        help="named test position (repeatable, default: all)")
+    parser.add_argument("--fen", help="custom position instead of the named ones")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--divide", action="store_true", help="print per-move counts")
+    parser.add_argument("--no-bulk", action="store_true",
+                        help="make/unmake leaf moves instead of counting them")
+    args = parser.parse_args()
+
+    if args.fen:
+        targets = [("custom", args.fen, {})]
+    else:
+        names   = args.position or list(POSITIONS)
+        targets = [(name,) + POSITIONS[name] for name in names]
+
+    failed = False
+    total_nodes, total_time = 0, 0.0
+    for name, fen, expected in targets:
+        if args.divide:
+            for uci, count in sorted(divide(chess.Board(fen), args.depth, not args.no_bulk).items()):
+                print(f"  {uci}: {count}")
+        nodes, seconds = run(fen, args.depth, bulk=not args.no_bulk)
+        total_nodes += nodes
+        total_time  += seconds
+        status = ""
+        if args.depth in expected:
+            ok = nodes == expected[args.depth]
+            failed |= not ok
+            status = "ok" if ok else f"MISMATCH (expected {expected[args.depth]})"
+        print(f"{name:<12} depth {args.depth}: {nodes:>10} nodes "
+              f"{seconds:7.2f}s {nodes / max(seconds, 1e-9):>10.0f} nps {status}")
+
+    print(f"{'total':<12} {total_nodes:>19} nodes {total_time:7.2f}s "
+          f"{total_nodes / max(total_time, 1e-9):>10.0f} nps")
+    raise SystemExit(1 if failed else 0)
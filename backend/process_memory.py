@@ -0,0 +1,42 @@
+"""
+Memory usage of a process, split into pages shared with other processes
+and pages of its own.
+
+RSS counts shared pages in full in every process that maps them, so it
+overstates what forked gunicorn workers cost together. PSS divides each
+shared page between its users, and the private size is what a process
+would free by exiting. Linux reports these in /proc/<pid>/smaps_rollup;
+elsewhere only the peak RSS is known.
+"""
+import resource
+import sys
+
+_FIELDS = {
+    "Rss": "rss_mb",
+    "Pss": "pss_mb",
+    "Shared_Clean": "shared_mb",
+    "Shared_Dirty": "shared_mb",
+    "Private_Clean": "private_mb",
+    "Private_Dirty": "private_mb",
+}
+
+
+def memory_usage(pid="self"):
+    """{"rss_mb", "pss_mb", "shared_mb", "private_mb"} of a process, in MB."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kB on Linux, bytes on macOS
+        return {"rss_mb": round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)}
+    usage = dict.fromkeys(_FIELDS.values(), 0.0)
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name in _FIELDS:
+            usage[_FIELDS[name]] += int(value.split()[0]) / 1024
+    return {k: round(v, 1) for k, v in usage.items()}
+
+
+def format_memory(usage):
+    return " ".join(f"{k}={v}" for k, v in usage.items())
@@ -0,0 +1,64 @@
+"""
+Board encodings for the neural networks and the vectorized evaluation.
+
+Every encoding starts from the 12 piece bitboards of a board, unpacked to
+squares with np.unpackbits, so no square is visited in Python:
+  - codes: (64,) int8, 0 for an empty square, 1..6 for a White pawn..king
+    and -1..-6 for Black's, a1 first. The value network's input and the
+    generate_training_set dataset format.
+  - planes: (12, 64) one-hot planes in PLANES order, for models taking a
+    plane per piece.
+"""
+import chess
+import numpy as np
+
+# Plane order: White pawn..king, then Black pawn..king
+PLANES = [(color, pt) for color in (chess.WHITE, chess.BLACK) for pt in chess.PIECE_TYPES]
+
+# Square code of each plane's pieces
+PLANE_CODES = np.array([pt if color == chess.WHITE else -pt for color, pt in PLANES], dtype=np.int8)
+
+
+def board_bitboards(boards):
+    """(N, 12) uint64 piece bitboards, in PLANES order."""
+    rows = np.array(
+        [(b.pawns, b.knights, b.bishops, b.rooks, b.queens, b.kings,
+          b.occupied_co[chess.WHITE], b.occupied_co[chess.BLACK]) for b in boards],
+        dtype="<u8",
+    ).reshape(-1, 8)
+    return np.concatenate([rows[:, :6] & rows[:, 6:7], rows[:, :6] & rows[:, 7:8]], axis=1)
+
+
+def board_planes(boards, bitboards=None):
+    """(N, 12, 64) uint8 piece planes, in PLANES order, a1 = square 0."""
+    if bitboards is None:
+        bitboards = board_bitboards(boards)
+    return np.unpackbits(bitboards.view(np.uint8), axis=-1, bitorder="little").reshape(-1, 12, 64)
+
+
+def serialize_boards(boards, out=None, planes=False):
+    """
+    Encodes `boards` as (N, 64) square codes, or (N, 12, 64) one-hot planes
+    with `planes`, all int8. With `out`, a preallocated int8 buffer of at
+    least N rows, the encodings are written into it and its first N rows
+    are returned, so a caller can reuse one buffer across requests.
+    """
+    shape = (len(boards),) + ((12, 64) if planes else (64,))
+    if out is None:
+        out = np.empty(shape, dtype=np.int8)
+    elif out.dtype != np.int8 or out.shape[1:] != shape[1:] or len(out) < len(boards):
+        raise ValueError(f"Buffer of shape {out.shape} and type {out.dtype} cannot hold {shape} int8")
+    out = out[:len(boards)]
+    if not len(boards):
+        return out
+    one_hot = board_planes(boards).view(np.int8)
+    if planes:
+        out[...] = one_hot
+    else:
+        np.einsum("p,nps->ns", PLANE_CODES, one_hot, out=out)
+    return out
+
+
+def serialize_board(board):
+    """(64,) int8 square codes of one board (see serialize_boards)."""
+    return serialize_boards([board])[0]
@@ -0,0 +1,63 @@
+"""
+The vectorized evaluator must agree exactly with evaluate_board.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import numpy as np
+import pytest
+import chess
+from evaluation import evaluate_board
+from batch_evaluation import (
+    evaluate_boards, board_planes, board_bitboards, random_positions, _has_legal_move,
+)
+
+# Game-ending and material-edge cases
+SPECIAL_FENS = [
+    "R5k1/5ppp/8/8/8/8/8/4K3 b - - 0 1",         # Black checkmated
+    "r3k3/8/8/8/8/8/5PPP/r5K1 w q - 0 1",        # White checkmated
+    "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1",            # stalemate
+    "8/8/8/4k3/8/8/8/4K3 w - - 0 1",             # bare kings
+    "8/8/8/4k3/8/8/8/2N1K3 w - - 0 1",           # lone knight
+    "8/8/2b5/4k3/8/8/8/2B1K3 w - - 0 1",         # bishops on opposite colors
+    "8/8/3b4/4k3/8/8/8/2B1K3 w - - 0 1",         # bishops on the same color
+    "8/8/8/4k3/8/8/4P3/4K3 w - - 0 1",           # pawn
+    "4k3/8/8/8/8/8/8/r3K3 w - - 0 1",            # in check, king can step
+    "4k3/8/8/8/8/8/3PPP2/r3K3 w - - 0 1",        # boxed-in king mated
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+]
+
+
+def test_matches_scalar_on_random_positions():
+    boards = random_positions(600, seed=1)
+    expected = np.array([evaluate_board(b) for b in boards])
+    assert np.array_equal(evaluate_boards(boards), expected)
+
+
+@pytest.mark.parametrize("fen", SPECIAL_FENS)
+def test_matches_scalar_on_special_positions(fen):
+    board = chess.Board(fen)
+    assert evaluate_boards([board])[0] == evaluate_board(board)
+
+
+def test_legal_move_screen_is_never_wrong():
+    """The array screen may miss legal moves but must never invent one."""
+    boards = random_positions(600, seed=2) + [chess.Board(f) for f in SPECIAL_FENS]
+    turns  = np.array([b.turn for b in boards])
+    found  = _has_legal_move(board_bitboards(boards), turns)
+    for board, has_move in zip(boards, found):
+        if has_move:
+            assert any(board.generate_legal_moves()), board.fen()
+
+
+def test_planes_layout():
+    planes = board_planes([chess.Board()])
+    assert planes.shape == (1, 12, 64)
+    assert planes[0, 0, chess.E2] == 1           # White pawn
+    assert planes[0, 11, chess.E8] == 1          # Black king
+    assert planes[0].sum() == 32
+
+
+def test_empty_batch():
+    assert evaluate_boards([]).shape == (0,)
@@ -0,0 +1,52 @@
+"""
+Fixed-position benchmark: result shape and baseline comparison.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+from bench import POSITIONS, run_bench, compare, startup_time
+
+
+def _summary(nps, nodes=1000, ms=500.0, solved=5):
+    return {"nps": nps, "total_nodes": nodes, "time_to_depth_ms": ms, "solved": solved}
+
+
+def test_run_bench_summary():
+    positions = [p for p in POSITIONS if p[0] in ("wac004", "start")]
+    summary   = run_bench(depth=1, positions=positions)
+    assert [r["name"] for r in summary["positions"]] == ["wac004", "start"]
+    assert summary["total_nodes"] == sum(r["nodes"] for r in summary["positions"])
+    assert summary["tactical"] == 1
+    assert summary["positions"][1]["solved"] is None
+    assert summary["time_to_depth_ms"] is not None
+
+
+def test_compare_within_threshold():
+    ok, lines = compare(_summary(950), _summary(1000), threshold=0.10)
+    assert ok
+    assert not any("REGRESSION" in line for line in lines)
+
+
+def test_compare_flags_nps_regression():
+    ok, lines = compare(_summary(850), _summary(1000), threshold=0.10)
+    assert not ok
+    assert any("REGRESSION" in line for line in lines)
+
+
+def test_compare_without_baseline_nps():
+    ok, _ = compare(_summary(100), {"solved": 0})
+    assert ok
+
+
+def test_startup_without_neural_stack():
+    result = startup_time(repeats=1)
+    # Timing is machine-dependent: bench.py --startup checks the target
+    assert not result["torch"] and not result["numpy"]
+    assert result["time_ms"] > 0
+
+
+def test_startup_with_missing_weights():
+    # Preloading degrades to disabled neural engines instead of failing
+    result = startup_time(repeats=1, neural=True, env={"NEURAL_MODEL_PATH": "/nonexistent/value.pth"})
+    assert not result["torch"]
@@ -1,7 +1,12 @@
 import time
 import pytest
 import chess
-from chess_engine import find_best_move
+from chess_engine import (
+    find_best_move, Search, allocate_move_time, has_non_pawn_material,
+    see, terminal_score, MIN_MOVE_TIME_MS, MATE_SCORE,
+)
+from evaluation import evaluate_material
+from transposition import TranspositionTable, EvalCache
 
 @pytest.mark.parametrize("fen,depth", [
     # Very sparse position: only kings on d1/d3. 4-ply is trivial here.
@@ -25,3 +30,281 @@ def test_minimax_depth4_completes_quickly(fen, depth):
 
     # And run quickly (adjust threshold as needed)
     assert dur < 0.5, f"Minimax depth {depth} took too long: {dur:.2f}s"
+
+
+def test_movetime_limit_returns_legal_move():
+    """A time-limited search stops near its budget with a legal move."""
+    board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3")
+
+    start = time.time()
+    result = Search(movetime_ms=200).run(board)
+    dur    = time.time() - start
+
+    assert result.move in board.legal_moves
+    assert result.depth >= 1
+    assert dur < 1.0, f"Search overran its 200ms budget: {dur:.2f}s"
+
+
+def test_node_limit_is_respected():
+    """The search never visits more nodes than max_nodes."""
+    board  = chess.Board()
+    result = Search(max_nodes=500).run(board)
+    assert result.move in board.legal_moves
+    assert result.nodes <= 501
+
+
+def test_max_depth_reached_without_limits():
+    """Only max_depth stops the search when no time/node limit is given."""
+    board  = chess.Board("8/8/8/8/8/8/3K4/3k4 w - - 0 1")
+    result = Search(max_depth=3).run(board)
+    assert result.depth == 3
+
+
+def test_allocate_move_time():
+    assert allocate_move_time(300000) == 10000
+    assert allocate_move_time(60) == MIN_MOVE_TIME_MS
+    assert allocate_move_time(None) == MIN_MOVE_TIME_MS
+
+
+# Fixed suite for comparing nodes-to-depth between search configurations
+ORDERING_SUITE = [
+    "r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3",
+    "2r3k1/pp3ppp/2n5/3p4/3P4/2N5/PP3PPP/2R3K1 w - - 0 1",
+]
+
+
+def _suite_nodes(depth, options):
+    total = 0
+    for fen in ORDERING_SUITE:
+        search = Search(max_depth=depth, tt=TranspositionTable(size_mb=1), options=options)
+        total += search.run(chess.Board(fen)).nodes
+    return total
+
+
+def test_quiet_move_heuristics_reduce_nodes():
+    """Killers, history and counter-moves should reach depth 3 with fewer nodes."""
+    plain = _suite_nodes(3, {"killers": False, "history": False, "countermoves": False})
+    ordered = _suite_nodes(3, None)
+    assert ordered < plain
+
+
+def test_ordering_tables_are_per_search():
+    """Two searches must not share killer/history tables."""
+    a, b = Search(max_depth=1), Search(max_depth=1)
+    assert a.killers is not b.killers
+    assert a.history is not b.history
+    assert a.countermoves is not b.countermoves
+
+
+def test_principal_variation_is_legal_line():
+    """The PV starts with the best move and is playable from the root."""
+    board  = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3")
+    result = Search(max_depth=3, tt=TranspositionTable(size_mb=1)).run(board)
+    assert result.pv[0] == result.move
+    line = board.copy()
+    for move in result.pv:
+        assert move in line.legal_moves
+        line.push(move)
+
+
+@pytest.mark.parametrize("aspiration", [True, False])
+def test_finds_mate_in_one(aspiration):
+    """Back-rank mate should be found with a winning score for White."""
+    board  = chess.Board("6k1/5ppp/8/8/8/8/8/R3K3 w Q - 0 1")
+    result = Search(
+        max_depth=3, tt=TranspositionTable(size_mb=1),
+        options={"aspiration": aspiration},
+    ).run(board)
+    assert result.move == chess.Move.from_uci("a1a8")
+    assert result.score > 90
+
+
+def test_quiescence_mate_stays_in_score_range():
+    """A checkmate reached by a capture in quiescence must not overflow the window."""
+    board  = chess.Board("5k2/6pp/p1qN4/1p1p4/3P4/2PKP2Q/PP3r2/3R4 b - - 0 1")
+    result = Search(max_depth=3, max_nodes=50000, tt=TranspositionTable(size_mb=1)).run(board)
+    assert result.depth == 3
+    assert result.move == chess.Move.from_uci("c6c4")
+
+
+def test_black_score_is_from_white_perspective():
+    """Scores are reported from White's point of view whoever is to move."""
+    board  = chess.Board("r3k3/8/8/8/8/8/5PPP/6K1 b q - 0 1")
+    result = Search(max_depth=3, tt=TranspositionTable(size_mb=1)).run(board)
+    assert result.move == chess.Move.from_uci("a8a1")
+    assert result.score < -90
+
+
+def test_selective_pruning_reduces_nodes():
+    """Null-move pruning and LMR should reach depth 4 with fewer nodes."""
+    full      = _suite_nodes(4, {"null_move": False, "lmr": False})
+    selective = _suite_nodes(4, None)
+    assert selective < full
+
+
+def test_null_move_guard_in_pawn_endgame():
+    """Pawn-only sides are excluded from null-move pruning."""
+    board = chess.Board("8/5k2/8/4p3/4P3/8/5K2/8 w - - 0 1")
+    assert not has_non_pawn_material(board, chess.WHITE)
+    board = chess.Board("8/5k2/8/4p3/4P3/8/5K2/7R w - - 0 1")
+    assert has_non_pawn_material(board, chess.WHITE)
+    assert not has_non_pawn_material(board, chess.BLACK)
+
+
+
+@pytest.mark.parametrize("fen,uci,expected", [
+    # Rook takes an undefended pawn
+    ("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1", "e1e5", 100),
+    # Knight takes a pawn defended by knight and bishop, backed by rook and queen
+    ("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "d3e5", -220),
+    # Queen takes a pawn defended by a pawn
+    ("4k3/8/2p5/3p4/4Q3/8/8/4K3 w - - 0 1", "e4d5", -800),
+    # Battery: x-ray rook behind the capturer wins the queen
+    ("4k3/3q4/8/8/8/8/3R4/3RK3 w - - 0 1", "d2d7", 900),
+    # King may not recapture onto a defended square
+    ("4k3/8/2p5/3p4/4K3/8/8/8 w - - 0 1", "e4d5", -19900),
+])
+def test_static_exchange_evaluation(fen, uci, expected):
+    board = chess.Board(fen)
+    assert see(board, chess.Move.from_uci(uci)) == expected
+
+
+def test_see_and_delta_pruning_reduce_nodes():
+    """Dropping losing and hopeless captures should shrink quiescence."""
+    plain  = _suite_nodes(3, {"see": False, "delta_pruning": False})
+    pruned = _suite_nodes(3, None)
+    assert pruned < plain
+
+
+def test_search_stats_are_collected():
+    """Every search reports node, TT and timing statistics."""
+    board  = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3")
+    move, stats = find_best_move(board, depth=3, tt=TranspositionTable(size_mb=1), with_stats=True)
+    assert move in board.legal_moves
+    assert stats.depth == 3
+    assert 0 < stats.qnodes < stats.nodes
+    assert stats.tt_probes >= stats.tt_hits >= stats.tt_cutoffs
+    assert stats.seldepth >= 3
+    assert 0.0 <= stats.first_move_cutoff_rate <= 1.0
+    assert [it["depth"] for it in stats.iterations] == [1, 2, 3]
+    assert stats.as_dict()["nps"] > 0
+
+
+@pytest.mark.parametrize("limits", [{"max_nodes": 1}, {"movetime_ms": 1}])
+def test_first_iteration_completes_under_tiny_limits(limits):
+    """A limit hit at once still returns a searched move, not the first capture."""
+    board  = chess.Board("4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1")
+    result = Search(tt=TranspositionTable(size_mb=1), **limits).run(board)
+    assert result.depth == 1 and result.stats.depth == 1
+    assert result.move != chess.Move.from_uci("d1d5")
+    assert result.pv[0] == result.move
+
+
+def test_eval_cache_does_not_change_the_search():
+    """Cached evaluations give the same result, and quiescence reuses them."""
+    board = chess.Board("r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8")
+    plain = Search(max_depth=3, tt=TranspositionTable(size_mb=1),
+                   options={"eval_cache": False}).run(board)
+    cached = Search(max_depth=3, tt=TranspositionTable(size_mb=1),
+                    eval_cache=EvalCache(size_mb=1)).run(board)
+    assert (cached.move, cached.score, cached.nodes) == (plain.move, plain.score, plain.nodes)
+    assert plain.stats.eval_probes == 0
+    assert cached.stats.eval_hits > 0
+
+
+def test_eval_profile_counts_cached_positions():
+    """A profiled search records every evaluation, even with a warm cache."""
+    board = chess.Board("r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8")
+    cache = EvalCache(size_mb=1)
+    Search(max_depth=2, tt=TranspositionTable(size_mb=1), eval_cache=cache).run(board)
+
+    class CountingSearch(Search):
+        evaluations = 0
+
+        def evaluate(self, board, ply=0, key=None):
+            self.evaluations += 1
+            return super().evaluate(board, ply, key)
+
+    search = CountingSearch(max_depth=2, tt=TranspositionTable(size_mb=1), eval_cache=cache,
+                            options={"eval_profile": True})
+    result = search.run(board)
+    assert result.stats.eval_terms["calls"] == search.evaluations > 0
+
+
+class MaterialLeaves:
+    """Leaf evaluator from material alone, squashed into -1..1; records batch sizes."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, boards):
+        self.batches.append(len(boards))
+        return [max(-1.0, min(1.0, evaluate_material(b) / 1000)) for b in boards]
+
+
+def _leaf_search(depth, evaluator, cache=None):
+    return Search(max_depth=depth, tt=TranspositionTable(size_mb=1),
+                  eval_cache=cache if cache is not None else EvalCache(size_mb=1),
+                  leaf_evaluator=evaluator)
+
+
+def test_leaf_evaluator_scores_leaves_in_batches():
+    """Leaves go to the evaluator a node's children at a time, not one by one."""
+    # Nxd5 wins the queen left en prise
+    board = chess.Board("rnb1kbnr/ppp1pppp/8/3q4/8/2N5/PPPP1PPP/R1BQKBNR w KQkq - 0 3")
+    leaves = MaterialLeaves()
+    result = _leaf_search(2, leaves).run(board)
+    assert result.move == chess.Move.from_uci("c3d5")
+    assert result.stats.leaf_batches == len(leaves.batches)
+    assert result.stats.leaf_evals == sum(leaves.batches)
+    assert max(leaves.batches) > 1
+    assert len(leaves.batches) < result.stats.leaf_evals / 4
+    stats = result.stats.as_dict()
+    assert stats["leaf_evals"] == result.stats.leaf_evals
+
+
+def test_leaf_cache_is_reused():
+    board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+    cache = EvalCache(size_mb=1)
+    first = _leaf_search(2, MaterialLeaves(), cache).run(board)
+    again = MaterialLeaves()
+    second = _leaf_search(2, again, cache).run(board)
+    assert second.move == first.move
+    assert sum(again.batches) < first.stats.leaf_evals / 4
+
+
+def test_leaf_search_without_eval_cache():
+    board  = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+    leaves = MaterialLeaves()
+    cache  = EvalCache(size_mb=1)
+    result = Search(max_depth=2, tt=TranspositionTable(size_mb=1), eval_cache=cache,
+                    leaf_evaluator=leaves, options={"eval_cache": False}).run(board)
+    assert result.move in board.legal_moves
+    assert cache.probes == 0 and result.stats.eval_probes == 0
+    assert set(leaves.batches) == {1}
+
+
+def test_leaf_search_still_finds_mate():
+    board = chess.Board("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+    result = _leaf_search(2, MaterialLeaves()).run(board)
+    assert result.move == chess.Move.from_uci("a1a8")
+    assert result.score > MATE_SCORE / 200
+
+
+def test_terminal_score():
+    assert terminal_score(chess.Board("R5k1/5ppp/8/8/8/8/8/4K3 b - - 0 1")) == -MATE_SCORE
+    assert terminal_score(chess.Board("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")) == 0
+    assert terminal_score(chess.Board()) is None
+
+
+def test_engine_does_not_import_torch():
+    """The network is injected: the search itself stays free of torch."""
+    import os
+    import subprocess
+    import sys
+    out = subprocess.run(
+        [sys.executable, "-c", "import sys, chess_engine; print('torch' in sys.modules)"],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)),
+    )
+    assert out.stdout.strip() == "False"
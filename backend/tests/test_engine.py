@@ -47,3 +47,70 @@ def test_api_neural_start(client):
     )
     assert res.status_code == 200
     assert "move" in res.get_json()
+
+def test_api_neural_search(client):
+    res = client.post(
+        "/api/chess/move",
+        json={"fen": "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+              "engine": "neural_search", "depth": 2, "use_book": False, "stats": True}
+    )
+    assert res.status_code == 200
+    data = res.get_json()
+    assert chess.Move.from_uci(data["move"]) in chess.Board(
+        "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3").legal_moves
+    assert data["stats"]["leaf_evals"] > data["stats"]["leaf_batches"] > 0
+
+def test_api_neural_without_weights(client, monkeypatch):
+    import app
+    monkeypatch.setattr(app, "neural_service", None)
+    monkeypatch.setattr(app, "model_path", "/nonexistent/value.pth")
+    for engine in ("neural", "neural_search", "mcts"):
+        res = client.post("/api/chess/move", json={
+            "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+            "engine": engine, "use_book": False,
+        })
+        assert res.status_code == 503
+        assert "/nonexistent/value.pth" in res.get_json()["error"]
+    assert client.get("/api/inference/stats").get_json()["loaded"] is False
+    # Minimax does not need the network
+    res = client.post("/api/chess/move", json={
+        "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "engine": "minimax", "depth": 1, "use_book": False,
+    })
+    assert res.status_code == 200
+
+def test_api_rejects_invalid_search_limits(client):
+    fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    for field, value in [("threads", "many"), ("threads", 0), ("depth", -1),
+                         ("max_depth", "x"), ("movetime_ms", 0), ("max_nodes", [5]),
+                         ("playouts", True), ("movetime_ms", "fast"),
+                         ("depth", 1.7), ("max_nodes", "1.5")]:
+        res = client.post("/api/chess/move", json={"fen": fen, field: value, "use_book": False})
+        assert res.status_code == 400, (field, value)
+        assert field in res.get_json()["error"]
+    res = client.post("/api/chess/move", json={
+        "fen": fen, "depth": "1", "threads": 1, "max_nodes": 500, "use_book": False,
+    })
+    assert res.status_code == 200
+
+def test_api_tiny_limits_return_a_searched_move(client):
+    fen = "4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1"
+    for limit in ({"max_nodes": 1}, {"movetime_ms": 1}):
+        res = client.post("/api/chess/move", json=dict(limit, fen=fen, use_book=False, threads=1))
+        assert res.status_code == 200
+        data = res.get_json()
+        assert data["move"] != "d1d5" and data["pv"][0] == data["move"]
+
+def test_api_rejects_invalid_options(client):
+    fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    for options, expected in [(["x"], "options"), ("abc", "options"),
+                              ({"nullmove": False}, "nullmove"), ({"lmr": "no"}, "lmr")]:
+        res = client.post("/api/chess/move", json={
+            "fen": fen, "depth": 1, "use_book": False, "options": options,
+        })
+        assert res.status_code == 400, options
+        assert expected in res.get_json()["error"]
+    res = client.post("/api/chess/move", json={
+        "fen": fen, "depth": 1, "use_book": False, "options": {"null_move": False, "lmr": False},
+    })
+    assert res.status_code == 200
@@ -5,6 +5,7 @@ import os
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
 
+import random
 import pytest
 import chess
 from evaluation import (
@@ -13,6 +14,13 @@ from evaluation import (
     evaluate_pawn_structure,
     is_endgame,
     evaluate_bishop_pair,
+    eval_state,
+    update_state,
+    taper,
+    TOTAL_PHASE,
+    explain_board,
+    EvalProfile,
+    EVAL_TERMS,
 )
 
 
@@ -36,6 +44,48 @@ class TestMaterialEvaluation:
         assert score < -400  # Rook is worth 500 centipawns
 
 
+def _reference_pawn_structure(board):
+    """Square-by-square pawn structure scoring the bitboard version must match."""
+    score = 0
+    for color in [chess.WHITE, chess.BLACK]:
+        pawns = board.pieces(chess.PAWN, color)
+        enemy = board.pieces(chess.PAWN, not color)
+        sign = 1 if color == chess.WHITE else -1
+        files = [0] * 8
+        for sq in pawns:
+            files[chess.square_file(sq)] += 1
+        for sq in pawns:
+            file, rank = chess.square_file(sq), chess.square_rank(sq)
+            if files[file] > 1:
+                score -= sign * 10
+            if not ((file > 0 and files[file - 1]) or (file < 7 and files[file + 1])):
+                score -= sign * 20
+            ahead = [
+                e for e in enemy
+                if abs(chess.square_file(e) - file) <= 1
+                and (chess.square_rank(e) > rank if color == chess.WHITE
+                     else chess.square_rank(e) < rank)
+            ]
+            if not ahead:
+                advance = rank if color == chess.WHITE else 7 - rank
+                score += sign * (10 + advance * 10)
+    return score
+
+
+def _pawn_corpus(games=40, plies=120, seed=3):
+    """Positions from random games, biased towards pawn moves and captures."""
+    rng = random.Random(seed)
+    for _ in range(games):
+        board = chess.Board()
+        for _ in range(plies):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            pawn_moves = [m for m in moves if board.piece_type_at(m.from_square) == chess.PAWN]
+            board.push(rng.choice(pawn_moves if pawn_moves and rng.random() < 0.5 else moves))
+            yield board.copy(stack=False)
+
+
 class TestPawnStructure:
     def test_doubled_pawns_penalty(self):
         """Doubled pawns should give a penalty."""
@@ -55,6 +105,21 @@ class TestPawnStructure:
         score = evaluate_pawn_structure(board_passed)
         assert score > 0
 
+    def test_matches_reference_on_corpus(self):
+        """Bitboard scoring must equal the square-by-square definition."""
+        for board in _pawn_corpus():
+            assert evaluate_pawn_structure(board) == _reference_pawn_structure(board), board.fen()
+
+    def test_blocked_by_adjacent_file_is_not_passed(self):
+        """An enemy pawn ahead on a neighbouring file stops the passed bonus."""
+        passed  = chess.Board("8/8/8/4P3/8/8/8/8 w - - 0 1")
+        blocked = chess.Board("8/3p4/8/4P3/8/8/8/8 w - - 0 1")
+        beside  = chess.Board("8/8/8/3pP3/8/8/8/8 w - - 0 1")
+        assert evaluate_pawn_structure(passed) == _reference_pawn_structure(passed)
+        assert evaluate_pawn_structure(blocked) == _reference_pawn_structure(blocked)
+        assert evaluate_pawn_structure(beside) == _reference_pawn_structure(beside)
+        assert evaluate_pawn_structure(blocked) < evaluate_pawn_structure(passed)
+
 
 class TestEndgameDetection:
     def test_starting_position_not_endgame(self):
@@ -105,8 +170,87 @@ class TestFullEvaluation:
             score = evaluate_board(board)
             assert score == 0
     
+    def test_stalemate_with_material_is_zero(self):
+        """Stalemate is a draw even when one side is far ahead."""
+        board = chess.Board("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")
+        assert board.is_stalemate()
+        assert evaluate_board(board) == 0
+
     def test_evaluation_returns_float(self):
         """Evaluation should return a float."""
         board = chess.Board()
         score = evaluate_board(board)
         assert isinstance(score, float)
+
+
+class TestIncrementalState:
+    @pytest.mark.parametrize("fen", [
+        chess.STARTING_FEN,
+        # Kiwipete: castling, en passant, promotions
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        # Promotion-heavy position
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    ])
+    def test_updates_match_full_recomputation(self, fen):
+        """State updated move by move should equal a full recomputation."""
+        rng = random.Random(11)
+        for _ in range(10):
+            board = chess.Board(fen)
+            state = eval_state(board)
+            for _ in range(80):
+                moves = list(board.legal_moves)
+                if not moves:
+                    break
+                move  = rng.choice(moves)
+                state = update_state(board, move, state)
+                board.push(move)
+                assert state == eval_state(board)
+
+    def test_null_move_keeps_state(self):
+        board = chess.Board()
+        state = eval_state(board)
+        assert update_state(board, chess.Move.null(), state) is state
+
+    def test_phase_runs_from_middlegame_to_endgame(self):
+        """All pieces give the full phase, kings and pawns give zero."""
+        assert eval_state(chess.Board())[2] == TOTAL_PHASE
+        assert eval_state(chess.Board("8/4k3/8/4P3/8/8/8/4K3 w - - 0 1"))[2] == 0
+
+    def test_taper_blends_by_phase(self):
+        assert taper(100, 0, TOTAL_PHASE) == 100
+        assert taper(100, 0, 0) == 0
+        assert taper(100, 0, TOTAL_PHASE // 2) == 50
+
+    def test_evaluate_with_state_matches_without(self):
+        board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        assert evaluate_board(board, eval_state(board)) == evaluate_board(board)
+
+
+class TestExplain:
+    @pytest.mark.parametrize("fen", [
+        chess.STARTING_FEN,
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "8/4k3/8/4P3/8/8/8/4K3 w - - 0 1",
+        "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1",
+    ])
+    def test_terms_sum_to_evaluation(self, fen):
+        board = chess.Board(fen)
+        score, terms, times = explain_board(board)
+        assert score == evaluate_board(board)
+        assert sum(terms.values()) == round(score * 100)
+        assert set(terms) == set(times) == set(EVAL_TERMS)
+
+    def test_checkmate_is_all_terminal(self):
+        board = chess.Board("R5k1/5ppp/8/8/8/8/8/4K3 b - - 0 1")
+        score, terms, _ = explain_board(board)
+        assert score == evaluate_board(board) > 90
+        assert terms["material"] == 0
+
+    def test_profile_accumulates(self):
+        profile = EvalProfile()
+        board = chess.Board()
+        assert evaluate_board(board, profile=profile) == evaluate_board(board)
+        explain_board(board, profile)
+        summary = profile.summary()
+        assert summary["calls"] == 2
+        assert abs(sum(t["time_share"] for t in summary["terms"].values()) - 1) < 0.01
@@ -163,3 +163,91 @@ class TestAuthentication:
         """Should return 401 when not authenticated."""
         res = unauthenticated_client.post("/api/games", json={})
         assert res.status_code == 401
+
+
+class TestEngineLimits:
+    START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+    def test_move_with_node_limit(self, client):
+        """Engine should accept a node budget."""
+        res = client.post("/api/chess/move", json={
+            "fen": self.START_FEN, "engine": "minimax",
+            "max_nodes": 300, "use_book": False,
+        })
+        assert res.status_code == 200
+        assert "move" in res.get_json()
+
+    def test_move_with_search_options(self, client):
+        """Search features can be switched off per request."""
+        res = client.post("/api/chess/move", json={
+            "fen": self.START_FEN, "engine": "minimax", "depth": 2,
+            "use_book": False, "options": {"null_move": False, "lmr": False},
+        })
+        assert res.status_code == 200
+        assert res.get_json()["pv"][0] == res.get_json()["move"]
+
+    def test_move_with_stats(self, client):
+        """Search statistics are returned only when asked for."""
+        res = client.post("/api/chess/move", json={
+            "fen": self.START_FEN, "depth": 2, "use_book": False, "stats": True,
+        })
+        stats = res.get_json()["stats"]
+        assert stats["depth"] == 2
+        assert stats["nodes"] > 0
+
+        res = client.post("/api/chess/move", json={
+            "fen": self.START_FEN, "depth": 1, "use_book": False,
+        })
+        assert "stats" not in res.get_json()
+
+    def test_move_budgeted_from_game_clock(self, client):
+        """A timed game's clock should bound the search."""
+        create_res = client.post("/api/games", json={"time_control": 3})
+        game_id = create_res.get_json()["id"]
+
+        res = client.post("/api/chess/move", json={
+            "fen": self.START_FEN, "engine": "minimax",
+            "game_id": game_id, "use_book": False,
+        })
+        assert res.status_code == 200
+        assert res.get_json()["time_taken"] < 1.0
+
+    def test_move_unknown_game(self, client):
+        """Should return 404 for a game that does not exist."""
+        res = client.post("/api/chess/move", json={
+            "fen": self.START_FEN, "game_id": 99999,
+        })
+        assert res.status_code == 404
+
+    def test_move_with_eval_profile(self, client):
+        """The eval_profile option adds a per-term summary to the stats."""
+        res = client.post("/api/chess/move", json={
+            "fen": self.START_FEN, "depth": 2, "use_book": False, "stats": True,
+            "options": {"eval_profile": True},
+        })
+        terms = res.get_json()["stats"]["eval_terms"]
+        assert terms["calls"] > 0
+        assert set(terms["terms"]) >= {"material", "pst", "pawns", "mobility"}
+
+
+class TestEvalExplain:
+    FEN = "r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3"
+
+    def test_explain_terms_sum_to_score(self, client):
+        res = client.post("/api/eval/explain", json={"fen": self.FEN})
+        assert res.status_code == 200
+        data = res.get_json()
+        assert sum(data["terms"].values()) == round(data["score"] * 100)
+        assert set(data["time_us"]) == set(data["terms"])
+
+    def test_explain_by_query_string(self, client):
+        res = client.get("/api/eval/explain", query_string={"fen": self.FEN})
+        assert res.status_code == 200
+
+    def test_explain_invalid_fen(self, client):
+        res = client.post("/api/eval/explain", json={"fen": "not a fen"})
+        assert res.status_code == 400
+
+    def test_explain_without_fen(self, client):
+        assert client.post("/api/eval/explain", json={}).status_code == 400
+        assert client.get("/api/eval/explain").status_code == 400
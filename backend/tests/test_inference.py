@@ -0,0 +1,136 @@
+"""
+The inference service must merge concurrent requests into shared batches
+and hand every caller exactly its own values.
+"""
+import os
+import sys
+import queue
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import numpy as np
+import pytest
+from inference import InferenceService, _Request
+
+
+class RecordingForward:
+    """Row sums as values; remembers the size of every batch it ran."""
+
+    def __init__(self):
+        self.sizes = []
+
+    def __call__(self, positions):
+        self.sizes.append(len(positions))
+        return positions.sum(axis=1).astype(np.float32)
+
+
+def _concurrent(service, requests):
+    """Submits every request from its own thread at once; returns the results."""
+    results = [None] * len(requests)
+    barrier = threading.Barrier(len(requests))
+
+    def worker(i):
+        barrier.wait()
+        results[i] = service.evaluate(requests[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(requests))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+@pytest.fixture
+def forward():
+    return RecordingForward()
+
+
+def test_single_request(forward):
+    service = InferenceService(forward, max_wait_ms=0)
+    positions = np.arange(64 * 3, dtype=np.int8).reshape(3, 64)
+    assert np.array_equal(service.evaluate(positions), positions.sum(axis=1))
+    assert len(service.evaluate(np.zeros((0, 64)))) == 0
+    service.close()
+
+
+def test_concurrent_requests_share_batches(forward):
+    service  = InferenceService(forward, max_batch=1024, max_wait_ms=200)
+    requests = [np.full((20 + i, 64), i, dtype=np.int8) for i in range(8)]
+    results  = _concurrent(service, requests)
+    service.close()
+
+    for i, values in enumerate(results):
+        assert np.array_equal(values, np.full(20 + i, 64 * i))
+    assert len(forward.sizes) < len(requests)
+    assert sum(forward.sizes) == sum(len(r) for r in requests)
+
+    stats = service.stats()
+    assert stats["requests"] == len(requests)
+    assert stats["batches"] == len(forward.sizes)
+    assert stats["queue_depth"] == 0
+    assert sum(stats["batch_sizes"].values()) == stats["batches"]
+    assert stats["wait_ms"]["max"] >= stats["wait_ms"]["p50"] >= 0
+
+
+def test_max_batch_is_respected(forward):
+    service  = InferenceService(forward, max_batch=64, max_wait_ms=100)
+    requests = [np.ones((30, 64), dtype=np.int8) for _ in range(6)]
+    results  = _concurrent(service, requests)
+    service.close()
+    assert all(np.array_equal(r, np.full(30, 64)) for r in results)
+    assert max(forward.sizes) <= 64
+
+
+def test_close_finishes_carried_request(forward):
+    """A request that did not fit its batch still runs when close() follows it."""
+    service  = InferenceService(forward, max_batch=64, max_wait_ms=100)
+    requests = queue.Queue()
+    pending  = [_Request(np.ones((30, 64), dtype=np.int8)) for _ in range(3)]
+    for request in pending + [None]:
+        requests.put(request)
+    service._run(requests)
+    assert forward.sizes == [60, 30]
+    assert all(r.done.is_set() and len(r.values) == 30 for r in pending)
+
+
+def test_oversized_request_runs_alone(forward):
+    service = InferenceService(forward, max_batch=8, max_wait_ms=0)
+    assert len(service.evaluate(np.ones((20, 64)))) == 20
+    service.close()
+    assert forward.sizes == [20]
+
+
+def test_errors_reach_the_caller():
+    def broken(positions):
+        raise RuntimeError("model failed")
+
+    service = InferenceService(broken, max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        service.evaluate(np.ones((2, 64)))
+    assert service.stats()["queue_depth"] == 0
+    service.close()
+
+
+def test_reset_stats(forward):
+    service = InferenceService(forward, max_wait_ms=0)
+    service.evaluate(np.ones((4, 64)))
+    service.reset_stats()
+    stats = service.stats()
+    assert stats["batches"] == 0 and stats["batch_sizes"] == {}
+    service.close()
+
+
+def test_api_reports_neural_batches():
+    from app import app as flask_app
+    flask_app.config["TESTING"] = True
+    with flask_app.test_client() as client:
+        before = client.get("/api/inference/stats").get_json()["positions"]
+        res = client.post("/api/chess/move", json={
+            "fen": "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+            "engine": "neural", "use_book": False,
+        })
+        assert res.status_code == 200
+        stats = client.get("/api/inference/stats").get_json()
+    assert stats["positions"] > before
+    assert "wait_ms" in stats and "batch_sizes" in stats
@@ -0,0 +1,46 @@
+"""
+Tests for the multi-process Lazy SMP search.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import chess
+from lazy_smp import parallel_search, get_shared_tt
+from zobrist import zobrist_key
+
+
+def test_parallel_search_returns_legal_move():
+    """Helpers run alongside the main search and add to the node count."""
+    board  = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3")
+    result = parallel_search(board, threads=2, max_depth=2, tt_size_mb=1)
+    assert result.move in board.legal_moves
+    assert result.depth >= 2
+    assert result.pv[0] == result.move
+
+
+def test_parallel_search_fills_shared_table():
+    """Positions searched are visible in the shared table afterwards."""
+    get_shared_tt(1).clear()
+    board  = chess.Board()
+    result = parallel_search(board, threads=2, max_depth=2, tt_size_mb=1)
+    board.push(result.move)
+    assert get_shared_tt(1).probe(zobrist_key(board)) is not None
+
+
+def test_single_thread_is_plain_search():
+    board  = chess.Board("6k1/5ppp/8/8/8/8/8/R3K3 w Q - 0 1")
+    result = parallel_search(board, threads=1, max_depth=3, tt_size_mb=1)
+    assert result.move == chess.Move.from_uci("a1a8")
+
+
+def test_helper_result_keeps_stats():
+    """A deeper helper result reports the main search's stats with every process's nodes."""
+    get_shared_tt(1).clear()
+    result = parallel_search(chess.Board(), threads=3, max_depth=3, max_nodes=60, tt_size_mb=1)
+    stats  = result.stats.as_dict()
+    # The main search alone completes depth 1 within 60 nodes
+    assert result.depth > 1
+    assert stats["depth"] == result.depth
+    assert stats["nodes"] == result.nodes > 60
+    assert stats["iterations"]
@@ -0,0 +1,153 @@
+"""
+Tests for the array-backed MCTS engine, with a material evaluator standing
+in for the value network.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import numpy as np
+import chess
+from evaluation import evaluate_material
+from mcts import MCTS, GameTrees
+from transposition import decode_move
+
+
+class MaterialValues:
+    """White-view values from material, squashed into -1..1; records batch sizes."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, boards):
+        self.batches.append(len(boards))
+        return [max(-1.0, min(1.0, evaluate_material(b) / 1000)) for b in boards]
+
+
+QUEEN_EN_PRISE = "rnb1kbnr/ppp1pppp/8/3q4/8/2N5/PPPP1PPP/R1BQKBNR w KQkq - 0 3"
+BACK_RANK_MATE = "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"
+
+
+def _check_tree(tree):
+    """Structural invariants of the node arrays, with no virtual loss left behind."""
+    assert tree.root == 0 and tree.parent[0] == -1
+    for node in range(tree.size):
+        n = tree.num_children[node]
+        if not n:
+            continue
+        first = tree.first_child[node]
+        children = np.arange(first, first + n)
+        assert (tree.parent[children] == node).all()
+        assert tree.visits[children].sum() <= tree.visits[node]
+    visits = tree.visits[:tree.size]
+    assert (visits >= 0).all()
+    assert (np.abs(tree.value_sum[:tree.size]) <= visits + 1e-3).all()
+
+
+def test_wins_the_queen():
+    values = MaterialValues()
+    result = MCTS(values).search(chess.Board(QUEEN_EN_PRISE), playouts=800)
+    assert result.move == chess.Move.from_uci("c3d5")
+    assert result.value > 0
+    assert result.pv[0] == result.move
+
+
+def test_finds_mate_in_one():
+    result = MCTS(MaterialValues()).search(chess.Board(BACK_RANK_MATE), playouts=400)
+    assert result.move == chess.Move.from_uci("a1a8")
+    assert result.value > 0.9
+
+
+def test_black_value_is_from_white_perspective():
+    board = chess.Board(QUEEN_EN_PRISE).mirror()
+    result = MCTS(MaterialValues()).search(board, playouts=800)
+    assert result.move == chess.Move.from_uci("c6d4")
+    assert result.value < 0
+
+
+def test_playout_budget_and_batching():
+    values = MaterialValues()
+    tree   = MCTS(values, batch_size=16)
+    result = tree.search(chess.Board(), playouts=500)
+    stats  = result.stats
+    assert stats["playouts"] == 500
+    assert stats["root_visits"] == 500
+    assert stats["evaluated"] == sum(values.batches)
+    assert stats["batches"] == len(values.batches) < 500 / 4
+    assert stats["mean_batch_size"] > 4
+    _check_tree(tree)
+
+
+def test_movetime_budget():
+    result = MCTS(MaterialValues()).search(chess.Board(), movetime_ms=150)
+    assert result.move in chess.Board().legal_moves
+    assert result.stats["playouts"] > 0
+    assert result.stats["time_ms"] < 1000
+
+
+def test_nodes_are_compact():
+    tree = MCTS(MaterialValues())
+    tree.search(chess.Board(), playouts=1000)
+    assert tree.size > 1000
+    assert tree.nbytes / tree.capacity < 32
+
+
+def _most_visited(tree, node):
+    first = tree.first_child[node]
+    return first + int(np.argmax(tree.visits[first:first + tree.num_children[node]]))
+
+
+def test_tree_is_reused_between_moves():
+    tree  = MCTS(MaterialValues())
+    board = chess.Board()
+    tree.search(board, playouts=600)
+    # Our move, then the reply the tree expected most
+    ours  = _most_visited(tree, 0)
+    reply = _most_visited(tree, ours)
+    kept  = int(tree.visits[reply])
+    board.push(decode_move(int(tree.move[ours])))
+    board.push(decode_move(int(tree.move[reply])))
+
+    result = tree.search(board, playouts=100)
+    assert kept > 0
+    assert result.stats["reused_visits"] == kept
+    assert result.stats["root_visits"] == kept + 100
+    _check_tree(tree)
+
+
+def test_unrelated_position_rebuilds_tree():
+    tree = MCTS(MaterialValues())
+    tree.search(chess.Board(), playouts=200)
+    result = tree.search(chess.Board(QUEEN_EN_PRISE), playouts=200)
+    assert result.stats["reused_visits"] == 0
+    assert result.stats["root_visits"] == 200
+
+
+def test_game_over_has_no_move():
+    result = MCTS(MaterialValues()).search(chess.Board("R5k1/5ppp/8/8/8/8/8/4K3 b - - 0 1"))
+    assert result.move is None
+
+
+def test_game_trees_are_kept_per_game():
+    trees = GameTrees(MaterialValues(), max_trees=2)
+    assert trees.get(1) is trees.get(1)
+    assert trees.get(None) is not trees.get(None)
+    first = trees.get(1)
+    trees.get(2)
+    trees.get(3)
+    assert trees.get(1) is not first
+
+
+def test_api_mcts_move():
+    from app import app as flask_app
+    flask_app.config["TESTING"] = True
+    with flask_app.test_client() as client:
+        res = client.post("/api/chess/move", json={
+            "fen": QUEEN_EN_PRISE, "engine": "mcts", "playouts": 64,
+            "use_book": False, "stats": True,
+        })
+    assert res.status_code == 200
+    data = res.get_json()
+    assert chess.Move.from_uci(data["move"]) in chess.Board(QUEEN_EN_PRISE).legal_moves
+    assert data["stats"]["playouts"] == 64
+    assert -1 <= data["stats"]["value"] <= 1
@@ -0,0 +1,100 @@
+"""
+The TorchScript and int8 variants of the value network must load through
+load_model and stay close to the fp32 model.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import numpy as np
+import pytest
+import torch
+import export_model
+from neural_model import Net, MODEL_VARIANTS, exported_path, load_model, predict_values
+
+
+@pytest.fixture
+def weights(tmp_path):
+    torch.manual_seed(0)
+    path = str(tmp_path / "value.pth")
+    torch.save(Net().state_dict(), path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def positions():
+    return export_model.sample_positions(256)
+
+
+def test_variants_match_fp32(weights, positions):
+    reference = predict_values(load_model(weights), positions)
+    for variant in MODEL_VARIANTS:
+        values = predict_values(load_model(weights, variant=variant), positions)
+        assert values.shape == reference.shape
+        assert np.allclose(values, reference, atol=0.05), variant
+    assert np.allclose(predict_values(load_model(weights, variant="torchscript"), positions),
+                       reference, atol=1e-5)
+
+
+def test_exported_files_are_loaded(weights, positions):
+    for variant in ("torchscript", "int8"):
+        path = export_model.export_model(weights, variant)
+        assert path == exported_path(weights, variant) and os.path.exists(path)
+        assert isinstance(load_model(weights, variant=variant), torch.jit.ScriptModule)
+    # The exports no longer depend on the weights they came from
+    expected = predict_values(load_model(weights, variant="int8"), positions)
+    os.remove(weights)
+    assert np.array_equal(predict_values(load_model(weights, variant="int8"), positions), expected)
+
+
+def test_unknown_variant(weights):
+    with pytest.raises(ValueError):
+        load_model(weights, variant="fp16")
+
+
+def test_accuracy_and_benchmark(weights, positions):
+    summary = export_model.run(weights, samples=64, repeats=2, export=False)
+    assert set(summary["variants"]) == set(MODEL_VARIANTS)
+    for variant, result in summary["variants"].items():
+        assert result["accuracy"]["max_abs_error"] < 0.05
+        assert set(result["batches"]) == {"1", "32", "256"}
+        assert all(b["positions_per_s"] > 0 for b in result["batches"].values())
+    assert summary["variants"]["fp32"]["accuracy"]["max_abs_error"] == 0
+
+
+def test_stale_export_is_rebuilt(weights, positions):
+    path = export_model.export_model(weights, "torchscript")
+    # Retrain: new weights written after the export
+    torch.manual_seed(1)
+    torch.save(Net().state_dict(), weights)
+    os.utime(path, (os.path.getmtime(weights) - 10,) * 2)
+    expected = predict_values(load_model(weights), positions)
+    assert np.allclose(predict_values(load_model(weights, variant="torchscript"), positions),
+                       expected, atol=1e-5)
+
+
+def test_unusable_variant_disables_neural_engines(monkeypatch, weights):
+    import app
+    monkeypatch.setattr(app, "neural_service", None)
+    monkeypatch.setattr(app, "model_path", weights)
+    monkeypatch.setattr(app, "model_variant", "fp16")
+    with pytest.raises(app.NeuralUnavailable):
+        app.get_neural_service()
+    app.app.config["TESTING"] = True
+    with app.app.test_client() as client:
+        res = client.post("/api/chess/move", json={
+            "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+            "engine": "neural", "use_book": False,
+        })
+    assert res.status_code == 503
+
+
+def test_preload_skips_variants_that_need_compiling(monkeypatch, weights):
+    import app
+    monkeypatch.setattr(app, "model_path", weights)
+    monkeypatch.setattr(app, "model_variant", "fp32")
+    assert not app._compiles_on_load()
+    monkeypatch.setattr(app, "model_variant", "torchscript")
+    assert app._compiles_on_load()
+    export_model.export_model(weights, "torchscript")
+    assert not app._compiles_on_load()
@@ -0,0 +1,192 @@
+"""
+Tests for the NNUE evaluator: incremental accumulator updates must match a
+full refresh, and the network must plug into the alpha-beta search.
+"""
+import os
+import random
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import numpy as np
+import chess
+import pytest
+import nnue
+from chess_engine import Search
+from neural_model import serialize_board
+from nnue import NNUE
+from transposition import TranspositionTable, EvalCache
+
+SPECIAL_MOVES = [
+    # castling both ways, en passant, promotions with and without capture
+    "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1",
+    "r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1",
+    "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 2",
+    "4k3/8/8/8/3Pp3/8/8/4K3 b - d3 0 2",
+    "1n2k3/P7/8/8/8/8/7p/4K1N1 w - - 0 1",
+    "1n2k3/P7/8/8/8/8/7p/4K1N1 b - - 0 1",
+]
+
+
+@pytest.fixture(scope="module")
+def net():
+    return NNUE.random(hidden=32)
+
+
+def test_incremental_update_matches_refresh(net):
+    rng = random.Random(1)
+    for _ in range(20):
+        board = chess.Board()
+        acc   = net.refresh(board)
+        while not board.is_game_over() and board.ply() < 120:
+            move = rng.choice(list(board.legal_moves))
+            acc  = net.update(board, move, acc)
+            board.push(move)
+            assert np.array_equal(acc, net.refresh(board)), board.fen()
+
+
+def test_special_moves(net):
+    for fen in SPECIAL_MOVES:
+        board = chess.Board(fen)
+        for move in board.legal_moves:
+            acc = net.update(board, move, net.refresh(board))
+            board.push(move)
+            assert np.array_equal(acc, net.refresh(board)), (fen, move.uci())
+            board.pop()
+
+
+def test_perspectives_are_mirrored(net):
+    board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+    white, black = net.refresh(board)
+    mirrored = net.refresh(board.mirror())
+    assert np.array_equal(mirrored[0], black) and np.array_equal(mirrored[1], white)
+
+
+def test_array_features_match_boards(net):
+    boards   = [chess.Board(fen) for fen in SPECIAL_MOVES] + [chess.Board()]
+    features = nnue.array_features(np.stack([serialize_board(b) for b in boards]))
+    assert features.shape == (len(boards), 2, nnue.MAX_ACTIVE)
+    for board, active in zip(boards, features):
+        for expected, indices in zip(nnue.board_features(board), active):
+            assert sorted(expected) == sorted(i for i in indices if i != nnue.NO_FEATURE)
+
+
+def test_batch_values_match_evaluate(net):
+    boards = [chess.Board(fen) for fen in SPECIAL_MOVES]
+    values = net.values(boards)
+    assert values.shape == (len(boards),)
+    for board, value in zip(boards, values):
+        raw = net.output(net.refresh(board))
+        assert value == pytest.approx(np.tanh(raw / (nnue.QA * nnue.QB)))
+        assert net.evaluate_board(board) == raw * nnue.CP_SCALE // (nnue.QA * nnue.QB)
+
+
+def test_save_and_load(net, tmp_path):
+    path = str(tmp_path / "nnue.npz")
+    net.save(path)
+    loaded = nnue.load(path)
+    board  = chess.Board(SPECIAL_MOVES[0])
+    assert np.array_equal(loaded.refresh(board), net.refresh(board))
+    assert loaded.evaluate_board(board) == net.evaluate_board(board)
+
+
+def _nnue_search(net, fen, depth):
+    return Search(max_depth=depth, nnue=net, tt=TranspositionTable(1), eval_cache=EvalCache(1)).run(chess.Board(fen))
+
+
+def test_search_with_nnue(net):
+    board  = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+    result = _nnue_search(net, board.fen(), 3)
+    assert result.move in board.legal_moves
+    assert _nnue_search(net, "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", 3).move == chess.Move.from_uci("a1a8")
+
+
+def test_black_to_move_score_is_negated(net):
+    # A black-to-move evaluation is the negated White-view score
+    board  = chess.Board("r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1")
+    search = Search(max_depth=1, nnue=net, tt=TranspositionTable(1), eval_cache=EvalCache(1))
+    search.eval_states = [net.refresh(board)]
+    assert search.evaluate(board) == -net.evaluate_board(board)
+
+
+def test_training_reduces_loss():
+    torch = pytest.importorskip("torch")
+    from torch.utils.data import DataLoader
+    from train_nnue import Net, collate, train
+
+    rng    = random.Random(0)
+    boards = []
+    for _ in range(256):
+        board = chess.Board()
+        for _ in range(rng.randrange(4, 30)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        boards.append(serialize_board(board))
+    # Material balance as the target
+    X = np.stack(boards)
+    Y = np.tanh(np.sign(X) @ np.ones(64) / 4).astype(np.float32)
+    torch.manual_seed(0)
+    loader = DataLoader(list(zip(X, Y)), batch_size=64, shuffle=True, collate_fn=collate)
+    model  = Net(hidden=16)
+    losses = train(model, loader, epochs=8, lr=0.01)
+    assert losses[-1] < losses[0]
+
+    quantized = model.quantized()
+    with torch.no_grad():
+        expected = model(collate(list(zip(X[:8], Y[:8])))[0]).numpy()
+    assert np.allclose(quantized.values(_boards(X[:8])), expected, atol=0.05)
+
+
+def _boards(arrays):
+    """Boards of serialized arrays (which have no side to move)."""
+    boards = []
+    for array in arrays:
+        board = chess.Board(None)
+        for sq, code in enumerate(array):
+            if code:
+                board.set_piece_at(sq, chess.Piece(abs(int(code)), bool(code > 0)))
+        boards.append(board)
+    return boards
+
+
+def test_api_nnue_without_weights(monkeypatch):
+    import app
+    monkeypatch.setattr(app, "nnue_net", None)
+    monkeypatch.setattr(app, "nnue_path", "/nonexistent/nnue.npz")
+    app.app.config["TESTING"] = True
+    with app.app.test_client() as client:
+        res = client.post("/api/chess/move", json={"fen": chess.STARTING_FEN, "engine": "nnue"})
+    assert res.status_code == 503
+    assert "NNUE" in res.get_json()["error"]
+
+
+def test_api_nnue_move(monkeypatch, net):
+    import app
+    monkeypatch.setattr(app, "nnue_net", net)
+    app.app.config["TESTING"] = True
+    with app.app.test_client() as client:
+        res = client.post("/api/chess/move", json={
+            "fen": SPECIAL_MOVES[0], "engine": "nnue", "depth": 2, "use_book": False,
+        })
+    assert res.status_code == 200
+    assert chess.Move.from_uci(res.get_json()["move"]) in chess.Board(SPECIAL_MOVES[0]).legal_moves
+
+
+def test_search_with_huge_network_output_terminates(net):
+    # An output bias far beyond the mate scores must not break aspiration windows
+    biased = NNUE(net.w1, net.b1, net.w2, 30 * nnue.QA * nnue.QB)
+    assert biased.evaluate_board(chess.Board()) > 10000
+    search = Search(max_depth=4, nnue=biased, tt=TranspositionTable(1), eval_cache=EvalCache(1))
+    result = search.run(chess.Board())
+    assert result.move in chess.Board().legal_moves
+    assert abs(result.score) < 10000
+
+
+def test_each_network_gets_its_own_tables(net):
+    """A reloaded or different network must not see another one's scores."""
+    other = NNUE(net.w1, net.b1, net.w2, net.b2)
+    first, again, second = Search(nnue=net), Search(nnue=net), Search(nnue=other)
+    assert first.tt is again.tt and first.eval_cache is again.eval_cache
+    assert second.tt is not first.tt and second.eval_cache is not first.eval_cache
+    assert Search().tt is not first.tt
@@ -0,0 +1,83 @@
+"""
+Tests for the pawn hash table.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import chess
+from pawn_hash import PawnHashTable, pawn_key, king_key
+from evaluation import (
+    evaluate_pawns,
+    evaluate_pawn_structure,
+    evaluate_king_safety,
+)
+from chess_engine import Search
+from transposition import TranspositionTable, EvalCache
+
+
+def test_pawn_key_ignores_pieces():
+    """Moving a piece leaves the pawn key alone; moving a pawn changes it."""
+    board = chess.Board()
+    key = pawn_key(board)
+    board.push_san("Nf3")
+    assert pawn_key(board) == key
+    board.push_san("e5")
+    assert pawn_key(board) != key
+
+
+def test_king_move_changes_shield_key():
+    board = chess.Board("r1bq1rk1/pppp1ppp/2n2n2/2b1p3/2B1P3/2N2N2/PPPP1PPP/R1BQ1RK1 w - - 0 7")
+    before = king_key(board)
+    board.push_san("Kh1")
+    assert king_key(board) != before
+
+
+def test_cached_scores_match_direct_evaluation():
+    table = PawnHashTable(size_mb=0.1)
+    board = chess.Board("r2q1rk1/1b2bppp/p2p1n2/1p2p3/4P3/1BN2N2/PPP2PPP/R2QR1K1 w - - 0 12")
+    expected = (evaluate_pawn_structure(board), evaluate_king_safety(board, False))
+    assert evaluate_pawns(board, table=table) == expected
+    assert evaluate_pawns(board, table=table) == expected
+    assert (table.probes, table.hits) == (2, 1)
+    assert table.hit_rate == 0.5
+
+
+def test_table_is_bounded():
+    table = PawnHashTable(size_mb=0.001)
+    for key in range(10 * table.num_slots):
+        table.store(key, 0, 0)
+    assert len(table._slots) == table.num_slots
+    assert table.probe(0) is None
+
+
+def test_search_reports_pawn_hit_rate():
+    """Most pawn evaluations in a middlegame search should be cache hits."""
+    board  = chess.Board("r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8")
+    search = Search(max_depth=3, tt=TranspositionTable(size_mb=1), pawn_table=PawnHashTable(1))
+    stats  = search.run(board).stats
+    assert stats.pawn_probes > 0
+    assert stats.pawn_hit_rate > 0.5
+    assert stats.as_dict()["pawn_hit_rate"] == round(stats.pawn_hit_rate, 3)
+
+
+def test_search_counts_only_its_own_probes():
+    """Lookups by other searches sharing the tables stay out of the stats."""
+    board = chess.Board("r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP1B1PPP/R2QKB1R w KQ - 0 8")
+
+    class SharedWithOthers(Search):
+        def evaluate(self, board, ply=0, key=None):
+            # As a concurrent request probing the same tables would
+            self.pawn_table.probe(1)
+            self.eval_cache.probe(1)
+            return super().evaluate(board, ply, key)
+
+    def stats(search_class):
+        search = search_class(max_depth=3, tt=TranspositionTable(size_mb=1),
+                              pawn_table=PawnHashTable(1), eval_cache=EvalCache(1))
+        s = search.run(board).stats
+        return s.pawn_probes, s.pawn_hits, s.eval_probes, s.eval_hits
+
+    alone = stats(Search)
+    assert alone[0] > 0 and alone[2] > 0
+    assert stats(SharedWithOthers) == alone
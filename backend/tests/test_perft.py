@@ -0,0 +1,45 @@
+"""
+Perft correctness checks against published node counts.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import pytest
+import chess
+from perft import POSITIONS, perft, divide
+
+# Keep the suite fast: only depths with at most this many leaves
+MAX_TEST_NODES = 100000
+
+CASES = [
+    (name, fen, depth, nodes)
+    for name, (fen, counts) in POSITIONS.items()
+    for depth, nodes in counts.items()
+    if nodes <= MAX_TEST_NODES
+]
+
+
+@pytest.mark.parametrize("name,fen,depth,nodes", CASES,
+                         ids=[f"{c[0]}-d{c[2]}" for c in CASES])
+def test_perft_node_counts(name, fen, depth, nodes):
+    assert perft(chess.Board(fen), depth) == nodes
+
+
+def test_bulk_counting_matches_full_make_unmake():
+    fen, counts = POSITIONS["kiwipete"]
+    assert perft(chess.Board(fen), 2, bulk=False) == counts[2]
+
+
+def test_divide_sums_to_perft():
+    fen, counts = POSITIONS["en_passant"]
+    split = divide(chess.Board(fen), 3)
+    assert len(split) == counts[1]
+    assert sum(split.values()) == counts[3]
+
+
+def test_perft_leaves_board_unchanged():
+    board = chess.Board(POSITIONS["castling"][0])
+    before = board.fen()
+    perft(board, 2)
+    assert board.fen() == before
@@ -0,0 +1,82 @@
+"""
+The vectorized board encodings must match a square-by-square encoding.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import chess
+import numpy as np
+import pytest
+from batch_evaluation import random_positions
+from serialization import PLANES, serialize_board, serialize_boards
+
+
+def _reference(board):
+    codes = np.zeros(64, dtype=np.int8)
+    for square, piece in board.piece_map().items():
+        codes[square] = piece.piece_type if piece.color == chess.WHITE else -piece.piece_type
+    return codes
+
+
+@pytest.fixture(scope="module")
+def boards():
+    return random_positions(64, seed=3)
+
+
+def test_codes_match_reference(boards):
+    expected = np.stack([_reference(b) for b in boards])
+    assert np.array_equal(serialize_boards(boards), expected)
+    assert serialize_boards(boards).dtype == np.int8
+    for board, row in zip(boards, expected):
+        assert np.array_equal(serialize_board(board), row)
+
+
+def test_start_position():
+    codes = serialize_board(chess.Board())
+    assert list(codes[:8]) == [4, 2, 3, 5, 6, 3, 2, 4]
+    assert (codes[8:16] == 1).all() and (codes[16:48] == 0).all() and (codes[48:56] == -1).all()
+    assert codes[60] == -6
+
+
+def test_planes_are_one_hot(boards):
+    planes = serialize_boards(boards, planes=True)
+    codes  = serialize_boards(boards)
+    assert planes.shape == (len(boards), 12, 64) and planes.dtype == np.int8
+    assert (planes.sum(axis=1) == (codes != 0)).all()
+    for i, (color, piece_type) in enumerate(PLANES):
+        code = piece_type if color == chess.WHITE else -piece_type
+        assert np.array_equal(planes[:, i].astype(bool), codes == code)
+
+
+def test_preallocated_buffer(boards):
+    buffer = np.full((100, 64), 99, dtype=np.int8)
+    result = serialize_boards(boards, out=buffer)
+    assert result.shape == (len(boards), 64)
+    assert np.shares_memory(result, buffer)
+    assert np.array_equal(buffer[:len(boards)], serialize_boards(boards))
+    assert (buffer[len(boards):] == 99).all()
+
+    planes = np.empty((len(boards), 12, 64), dtype=np.int8)
+    serialize_boards(boards, out=planes, planes=True)
+    assert np.array_equal(planes, serialize_boards(boards, planes=True))
+
+
+def test_unusable_buffer(boards):
+    for buffer in (np.empty((10, 64), dtype=np.int8),
+                   np.empty((100, 64), dtype=np.float32),
+                   np.empty((100, 12, 64), dtype=np.int8)):
+        with pytest.raises(ValueError):
+            serialize_boards(boards, out=buffer)
+
+
+def test_no_boards():
+    assert serialize_boards([]).shape == (0, 64)
+    assert serialize_boards([], planes=True).shape == (0, 12, 64)
+
+
+def test_single_source_of_truth():
+    import generate_training_set
+    import neural_model
+    assert neural_model.serialize_board is serialize_board
+    assert generate_training_set.serialize_board is serialize_board
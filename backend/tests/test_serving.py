@@ -0,0 +1,101 @@
+"""
+Tests for the gunicorn serving setup: worker settings, memory reporting
+and memory-mapped model weights.
+"""
+import importlib.util
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import numpy as np
+import torch
+from batch_evaluation import random_positions
+from neural_model import Net, load_model, predict_values, serialize_boards
+from process_memory import format_memory, memory_usage
+
+BACKEND = os.path.abspath(os.path.join(__file__, os.pardir, os.pardir))
+
+
+def _load_config(monkeypatch, **env):
+    # The config sets thread variables in the environment: give it a copy
+    monkeypatch.setattr(os, "environ", os.environ.copy())
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    spec   = importlib.util.spec_from_file_location("gunicorn_conf", os.path.join(BACKEND, "gunicorn.conf.py"))
+    config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(config)
+    return config
+
+
+class FakeWorker:
+    pid = os.getpid()
+
+    class log:
+        messages = []
+
+        @classmethod
+        def info(cls, message, *args):
+            cls.messages.append(message % args)
+
+
+def test_config_defaults(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.delenv("TORCH_THREADS_PER_WORKER", raising=False)
+    monkeypatch.delenv("GUNICORN_THREADS", raising=False)
+    config = _load_config(monkeypatch, PORT="6001")
+    assert config.bind == "0.0.0.0:6001"
+    assert config.workers == 4
+    assert config.worker_class == "gthread"
+    assert config.threads == 4
+    assert config.preload_app is True
+    assert config.torch_threads == max(1, (os.cpu_count() or 1) // 4)
+
+
+def test_config_from_environment(monkeypatch):
+    config = _load_config(monkeypatch, WEB_CONCURRENCY="2", GUNICORN_PRELOAD="0",
+                          TORCH_THREADS_PER_WORKER="3", GUNICORN_THREADS="8")
+    assert config.workers == 2
+    assert config.threads == 8
+    assert config.preload_app is False
+    assert config.torch_threads == 3
+
+
+def test_worker_hooks_limit_threads_and_log_memory(monkeypatch):
+    config = _load_config(monkeypatch, TORCH_THREADS_PER_WORKER="1", MEMORY_LOG_REQUESTS="2")
+    threads = torch.get_num_threads()
+    worker  = FakeWorker()
+    try:
+        config.post_fork(None, worker)
+        assert torch.get_num_threads() == 1
+    finally:
+        torch.set_num_threads(threads)
+
+    FakeWorker.log.messages.clear()
+    config.post_worker_init(worker)
+    for _ in range(4):
+        config.post_request(worker, None, None, None)
+    assert worker.requests_served == 4
+    assert len(FakeWorker.log.messages) == 3
+    assert all("rss_mb=" in m for m in FakeWorker.log.messages)
+
+
+def test_memory_usage():
+    usage = memory_usage()
+    assert usage["rss_mb"] > 0
+    if sys.platform.startswith("linux"):
+        assert set(usage) == {"rss_mb", "pss_mb", "shared_mb", "private_mb"}
+        assert usage["pss_mb"] <= usage["rss_mb"]
+        assert usage["private_mb"] <= usage["rss_mb"]
+    assert format_memory(usage).startswith("rss_mb=")
+
+
+def test_memory_mapped_weights(tmp_path):
+    torch.manual_seed(0)
+    path = str(tmp_path / "value.pth")
+    torch.save(Net().state_dict(), path)
+    positions = serialize_boards(random_positions(16))
+    mapped    = load_model(path, mmap=True)
+    assert np.array_equal(predict_values(mapped, positions), predict_values(load_model(path), positions))
+    if sys.platform.startswith("linux"):
+        with open("/proc/self/maps") as f:
+            assert path in f.read()
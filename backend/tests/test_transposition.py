@@ -0,0 +1,119 @@
+"""
+Tests for the bounded transposition table.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import pickle
+import chess
+from transposition import (
+    TranspositionTable, SharedTranspositionTable, EvalCache,
+    EXACT, LOWER, UPPER, encode_move, decode_move,
+)
+
+
+class TestMoveEncoding:
+    def test_round_trip(self):
+        for uci in ["e2e4", "a7a8q", "h2h1n", "e1g1"]:
+            move = chess.Move.from_uci(uci)
+            assert decode_move(encode_move(move)) == move
+
+    def test_no_move(self):
+        assert encode_move(None) == 0
+        assert decode_move(0) is None
+
+
+class TestTranspositionTable:
+    def test_store_and_probe(self):
+        tt = TranspositionTable(size_mb=1)
+        move = chess.Move.from_uci("g1f3")
+        tt.store(12345, 4, EXACT, 0.25, move)
+        _, depth, flag, score, move_code, _ = tt.probe(12345)
+        assert (depth, flag, score) == (4, EXACT, 0.25)
+        assert decode_move(move_code) == move
+        assert tt.probe(54321) is None
+
+    def test_capacity_is_fixed(self):
+        """Storing many positions never grows the table."""
+        tt = TranspositionTable(size_mb=1)
+        slots = len(tt._slots)
+        for key in range(10 * slots):
+            tt.store(key, 1, LOWER, 0.0, None)
+        assert len(tt._slots) == slots
+
+    def test_depth_preferred_slot_survives(self):
+        """A shallow entry in the same bucket must not evict a deeper one."""
+        tt = TranspositionTable(size_mb=1)
+        n = tt.num_buckets
+        tt.store(1, 8, EXACT, 1.0, None)
+        tt.store(1 + n, 2, UPPER, 0.0, None)
+        tt.store(1 + 2 * n, 3, UPPER, 0.0, None)
+        assert tt.probe(1)[1] == 8
+        assert tt.probe(1 + 2 * n) is not None
+
+    def test_old_generation_is_replaced(self):
+        """Deep entries from earlier searches give way to new results."""
+        tt = TranspositionTable(size_mb=1)
+        n = tt.num_buckets
+        tt.store(1, 8, EXACT, 1.0, None)
+        tt.new_search()
+        tt.store(1 + n, 2, EXACT, 0.0, None)
+        assert tt.probe(1 + n)[1] == 2
+
+
+class TestEvalCache:
+    def test_store_and_probe(self):
+        cache = EvalCache(size_mb=0.1)
+        assert cache.probe(12345) is None
+        cache.store(12345, -37)
+        assert cache.probe(12345) == -37
+        assert (cache.probes, cache.hits) == (2, 1)
+
+    def test_capacity_is_fixed(self):
+        cache = EvalCache(size_mb=0.001)
+        for key in range(10 * cache.num_slots):
+            cache.store(key, key)
+        assert len(cache._keys) == cache.num_slots
+        assert cache.probe(0) is None
+        assert cache.probe(10 * cache.num_slots - 1) == 10 * cache.num_slots - 1
+
+
+class TestSharedTranspositionTable:
+    def test_store_and_probe(self):
+        tt = SharedTranspositionTable(size_mb=1)
+        try:
+            move = chess.Move.from_uci("e7e8q")
+            tt.store(2**64 - 5, 6, LOWER, -9995, move)
+            key, depth, flag, score, move_code, _ = tt.probe(2**64 - 5)
+            assert (key, depth, flag, score) == (2**64 - 5, 6, LOWER, -9995)
+            assert decode_move(move_code) == move
+            assert tt.probe(17) is None
+        finally:
+            tt.close()
+
+    def test_attach_by_name_sees_entries(self):
+        """A second handle on the same segment (as in a spawned helper) shares entries."""
+        tt = SharedTranspositionTable(size_mb=1)
+        try:
+            other = pickle.loads(pickle.dumps(tt))
+            other.store(99, 3, EXACT, 42, None)
+            assert tt.probe(99)[3] == 42
+            # Only the creator ages the table
+            other.new_search()
+            assert tt.generation == 0
+            other.close()
+        finally:
+            tt.close()
+
+    def test_depth_preferred_slot_survives(self):
+        tt = SharedTranspositionTable(size_mb=1)
+        try:
+            n = tt.num_buckets
+            tt.store(1, 8, EXACT, 100, None)
+            tt.store(1 + n, 2, UPPER, 0, None)
+            tt.store(1 + 2 * n, 3, UPPER, 0, None)
+            assert tt.probe(1)[1] == 8
+            assert tt.probe(1 + 2 * n) is not None
+        finally:
+            tt.close()
@@ -0,0 +1,120 @@
+"""
+The tuner's linear model must reproduce evaluate_board, and tuning must
+lower the loss and write a module evaluation.load_weights accepts.
+"""
+import os
+import random
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import numpy as np
+import chess
+import chess.pgn
+import evaluation
+from evaluation import evaluate_board, evaluate_material, load_weights, WEIGHT_NAMES
+from batch_evaluation import random_positions
+import tune_eval
+from tune_eval import (
+    Features, position_features, initial_weights, predict, gradient, collect, tune,
+    write_weights, is_quiet, NUM_PARAMS,
+)
+
+
+def _playable(boards):
+    return [b for b in boards if any(b.generate_legal_moves()) and not b.is_insufficient_material()]
+
+
+def _write_games(path, count, seed=0):
+    """Random capture-happy games, decided by the material left at the end."""
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for _ in range(count):
+            board = chess.Board()
+            for _ in range(rng.randint(20, 100)):
+                moves = list(board.legal_moves)
+                if not moves:
+                    break
+                captures = [m for m in moves if board.is_capture(m)]
+                board.push(rng.choice(captures if captures and rng.random() < 0.7 else moves))
+            material = evaluate_material(board)
+            game = chess.pgn.Game.from_board(board)
+            game.headers["Result"] = "1-0" if material > 150 else "0-1" if material < -150 else "1/2-1/2"
+            print(game, file=f, end="\n\n")
+
+
+def test_linear_model_matches_evaluate_board():
+    boards = _playable(random_positions(800, seed=2))
+    features = position_features(boards, np.zeros(len(boards)))
+    expected = np.array([evaluate_board(b) * 100 for b in boards])
+    # Only the floor division of the taper is left out of the model
+    assert np.abs(predict(initial_weights(), features) - expected).max() < 1
+
+
+def test_gradient_matches_finite_differences():
+    boards = _playable(random_positions(200, seed=4))
+    features = position_features(boards, np.zeros(len(boards)))
+    grad_score = np.random.default_rng(0).normal(size=len(boards))
+    theta = initial_weights()
+    grad = gradient(features, grad_score)
+    base = predict(theta, features) @ grad_score
+    for i in (0, 4, 5 + 64 + 27, 5 + 5 * 64 + 6, 5 + 6 * 64 + 60, NUM_PARAMS - 3, NUM_PARAMS - 1):
+        step = np.zeros(NUM_PARAMS)
+        step[i] = 1
+        assert abs((predict(theta + step, features) @ grad_score - base) - grad[i]) < 1e-6
+
+
+def test_quiet_filter():
+    assert is_quiet(chess.Board())
+    # A queen en prise
+    assert not is_quiet(chess.Board("rnb1kbnr/pppp1ppp/8/4p1q1/3P4/2N5/PPP1PPPP/R1BQKBNR w KQkq - 0 1"))
+    # In check
+    assert not is_quiet(chess.Board("4k3/8/8/8/8/8/8/r3K3 w - - 0 1"))
+    # Stalemate and insufficient material
+    assert not is_quiet(chess.Board("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1"))
+    assert not is_quiet(chess.Board("8/8/8/4k3/8/8/8/2N1K3 w - - 0 1"))
+
+
+def test_features_round_trip(tmp_path):
+    boards = _playable(random_positions(50, seed=5))
+    features = position_features(boards, np.ones(len(boards)))
+    path = str(tmp_path / "features.npz")
+    features.save(path)
+    loaded = Features.load(path)
+    assert len(loaded) == len(boards)
+    assert np.array_equal(predict(initial_weights(), loaded), predict(initial_weights(), features))
+
+
+def test_tuning_lowers_loss_and_writes_weights(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    _write_games(str(data / "games.pgn"), 120)
+    features = collect(str(data), max_positions=3000, workers=1)
+    assert 0 < len(features) <= 3000
+    assert set(np.unique(features.results)) <= {0.0, 0.5, 1.0}
+
+    theta, k, losses = tune(features, epochs=3, batch_size=512, log=lambda _: None)
+    assert k > 0
+    assert losses[-1] < losses[0]
+
+    out = tmp_path / "tuned_test_weights.py"
+    write_weights(theta, str(out), "test")
+    sys.path.insert(0, str(tmp_path))
+    try:
+        weights = load_weights("tuned_test_weights")
+    finally:
+        sys.path.remove(str(tmp_path))
+    assert set(weights) == set(WEIGHT_NAMES)
+    assert weights["PIECE_VALUES"][chess.KING] == 0
+    assert all(len(weights[name]) == 64 for name in tune_eval.TABLES)
+    assert weights["BISHOP_PAIR_BONUS"] == int(round(theta[-1]))
+
+
+def test_initial_weights_round_trip(tmp_path):
+    write_weights(initial_weights(), str(tmp_path / "current_weights.py"))
+    sys.path.insert(0, str(tmp_path))
+    try:
+        weights = load_weights("current_weights")
+    finally:
+        sys.path.remove(str(tmp_path))
+    for name in WEIGHT_NAMES:
+        assert weights[name] == getattr(evaluation, name), name
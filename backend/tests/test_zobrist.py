@@ -0,0 +1,47 @@
+"""
+Tests for incremental Zobrist keys.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(__file__, os.pardir, os.pardir)))
+
+import random
+import pytest
+import chess
+import chess.polyglot
+import zobrist
+
+
+@pytest.mark.parametrize("fen", [
+    chess.STARTING_FEN,
+    # Kiwipete: castling, en passant, promotions
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    # Promotion-heavy position
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+])
+def test_incremental_key_matches_polyglot(fen):
+    """Keys updated move by move should equal a full recomputation."""
+    rng = random.Random(7)
+    for _ in range(10):
+        board = chess.Board(fen)
+        key = zobrist.zobrist_key(board)
+        for _ in range(80):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            key = zobrist.push(board, rng.choice(moves), key)
+            assert key == chess.polyglot.zobrist_hash(board)
+
+
+def test_null_move_key():
+    """A null move only flips side to move (and clears en passant)."""
+    board = chess.Board("rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2")
+    key = zobrist.push(board, chess.Move.null(), zobrist.zobrist_key(board))
+    assert key == chess.polyglot.zobrist_hash(board)
+
+
+def test_double_pawn_push_en_passant_key():
+    """En passant only enters the key when a pawn can actually capture."""
+    board = chess.Board("4k3/8/8/8/3p4/8/4P3/4K3 w - - 0 1")
+    key = zobrist.push(board, chess.Move.from_uci("e2e4"), zobrist.zobrist_key(board))
+    assert key == chess.polyglot.zobrist_hash(board)
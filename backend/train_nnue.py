@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Train the NNUE evaluator (nnue.py) on the generate_training_set dataset and
+save its quantized weights to nets/nnue.npz.
+"""
+import argparse
+import os
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import Dataset, DataLoader
+from torch import optim
+
+from nnue import HIDDEN, MAX_ACTIVE, NUM_FEATURES, NO_FEATURE, QA, QB, NNUE, array_features
+
+# Float weights must stay within what the int16 quantization can hold: an
+# accumulator sums up to MAX_ACTIVE rows and the bias, scaled by QA
+W1_LIMIT = 2.0
+B1_LIMIT = 32000 / QA - MAX_ACTIVE * W1_LIMIT
+W2_LIMIT = 127 / QB
+
+
+class NNUEDataset(Dataset):
+    def __init__(self, path="processed/dataset_25M.npz"):
+        data = np.load(path)
+        self.X = data['arr_0']
+        self.Y = data['arr_1']
+        print("Loaded dataset: X shape =", self.X.shape, "Y shape =", self.Y.shape)
+
+    def __len__(self):
+        return self.X.shape[0]
+
+    def __getitem__(self, idx):
+        return self.X[idx], np.float32(self.Y[idx])
+
+
+def collate(batch):
+    """Serialized boards to (B, 2, MAX_ACTIVE) feature indices, and targets."""
+    boards, targets = zip(*batch)
+    features = torch.from_numpy(array_features(np.stack(boards)))
+    return features, torch.tensor(targets, dtype=torch.float32)
+
+
+class Net(nn.Module):
+    """Float twin of nnue.NNUE: shared feature transformer, clipped ReLU, linear output."""
+
+    def __init__(self, hidden=HIDDEN):
+        super().__init__()
+        self.ft  = nn.Embedding(NUM_FEATURES + 1, hidden, padding_idx=NO_FEATURE)
+        self.b1  = nn.Parameter(torch.zeros(hidden))
+        self.out = nn.Linear(2 * hidden, 1)
+        nn.init.normal_(self.ft.weight, 0, 0.05)
+        with torch.no_grad():
+            self.ft.weight[NO_FEATURE].zero_()
+
+    def forward(self, features):
+        # (B, 2, active, hidden) summed per perspective, White's first
+        acc = self.ft(features).sum(dim=2) + self.b1
+        hidden = acc.clamp(0, 1).flatten(1)
+        return torch.tanh(self.out(hidden)).squeeze(1)
+
+    def clip_weights(self):
+        with torch.no_grad():
+            self.ft.weight.clamp_(-W1_LIMIT, W1_LIMIT)
+            self.b1.clamp_(-B1_LIMIT, B1_LIMIT)
+            self.out.weight.clamp_(-W2_LIMIT, W2_LIMIT)
+
+    def quantized(self):
+        """The trained weights as an nnue.NNUE."""
+        return NNUE.from_float(
+            self.ft.weight[:NUM_FEATURES].detach().cpu().numpy(),
+            self.b1.detach().cpu().numpy(),
+            self.out.weight.detach().cpu().numpy().reshape(-1),
+            self.out.bias.item(),
+        )
+
+
+def train(model, loader, epochs, lr=0.001, device="cpu", out=None):
+    """Adam on the MSE to the game results; returns the loss of each epoch."""
+    optimizer = optim.Adam(model.parameters(), lr=lr)
+    criterion = nn.MSELoss()
+    losses = []
+    model.train()
+    for epoch in range(epochs):
+        total_loss = 0.0
+        for features, target in loader:
+            features, target = features.to(device), target.to(device)
+            optimizer.zero_grad()
+            loss = criterion(model(features), target)
+            loss.backward()
+            optimizer.step()
+            model.clip_weights()
+            total_loss += loss.item()
+        losses.append(total_loss / len(loader))
+        print(f"Epoch {epoch+1:03d}: Loss = {losses[-1]:.6f}")
+        if out:
+            model.quantized().save(out)
+    return losses
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data", default="processed/dataset_25M.npz")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--lr", type=float, default=0.001)
+    parser.add_argument("--hidden", type=int, default=HIDDEN)
+    parser.add_argument("--out", default="nets/nnue.npz")
+    args = parser.parse_args()
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    loader = DataLoader(NNUEDataset(args.data), batch_size=args.batch_size,
+                        shuffle=True, collate_fn=collate)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    train(Net(args.hidden).to(device), loader, args.epochs, args.lr, device, args.out)
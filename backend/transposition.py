@@ -0,0 +1,261 @@
+"""
+Fixed-capacity transposition table keyed by Zobrist hash.
+
+Each bucket has two slots: a depth-preferred slot that keeps the deepest
+result of the current search, and an always-replace slot for everything
+else. Entries store depth, bound type, score and best move.
+
+EvalCache is a smaller sibling that remembers static evaluations.
+"""
+import os
+from multiprocessing import shared_memory
+import chess
+
+# Bound types
+EXACT = 0
+LOWER = 1   # score is a lower bound (fail-high)
+UPPER = 2   # score is an upper bound (fail-low)
+
+# Approximate bytes per stored entry (tuple + ints + list slot) used to
+# turn a memory budget into a slot count
+ENTRY_BYTES = 192
+
+# Shared-memory slots are two 64-bit words: key ^ data, data
+SHARED_ENTRY_BYTES = 16
+
+# Packed data layout for shared entries (low to high bits)
+_SCORE_BITS = 21
+_SCORE_BIAS = 1 << (_SCORE_BITS - 1)
+_DEPTH_BITS = 7
+_FLAG_BITS  = 2
+_MOVE_BITS  = 15
+
+DEFAULT_SIZE_MB = int(os.getenv("TT_SIZE_MB", 16))
+
+# Approximate bytes per static evaluation cache entry
+EVAL_ENTRY_BYTES = 80
+
+EVAL_CACHE_MB = float(os.getenv("EVAL_CACHE_MB", 4))
+
+
+def encode_move(move):
+    """Pack a move into an int; 0 means no move."""
+    if not move:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code):
+    """Inverse of encode_move."""
+    if not code:
+        return None
+    return chess.Move(code & 63, (code >> 6) & 63, (code >> 12) or None)
+
+
+class TranspositionTable:
+    """
+    Bounded transposition table. Memory stays around `size_mb` no matter
+    how many positions are stored.
+    """
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB):
+        self.size_mb     = size_mb
+        self.num_buckets = max(1, int(size_mb * 2**20) // (2 * ENTRY_BYTES))
+        self.clear()
+
+    def clear(self):
+        self._slots     = [None] * (2 * self.num_buckets)
+        self.generation = 0
+
+    def new_search(self):
+        """Age existing entries so they lose depth priority to the new search."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key):
+        """Returns (key, depth, flag, score, move_code, generation) or None."""
+        i = (key % self.num_buckets) * 2
+        entry = self._slots[i]
+        if entry is not None and entry[0] == key:
+            return entry
+        entry = self._slots[i + 1]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        i = (key % self.num_buckets) * 2
+        entry = (key, depth, flag, score, encode_move(move), self.generation)
+        slots = self._slots
+        old   = slots[i]
+        if (old is None or old[0] == key or depth >= old[1]
+                or old[5] != self.generation):
+            # The displaced entry still gets a chance in the other slot
+            if old is not None and old[0] != key:
+                slots[i + 1] = old
+            slots[i] = entry
+        else:
+            slots[i + 1] = entry
+
+    def hashfull(self):
+        """Fraction of used slots, sampled from the first 1000."""
+        sample = self._slots[:1000]
+        return sum(e is not None for e in sample) / len(sample)
+
+
+class EvalCache:
+    """
+    Bounded always-replace cache of static evaluations keyed by Zobrist
+    hash. A static evaluation never goes stale, so newer positions simply
+    overwrite older ones in the same slot. `probes` and `hits` count lookups.
+    """
+
+    def __init__(self, size_mb=EVAL_CACHE_MB):
+        self.size_mb   = size_mb
+        self.num_slots = max(1, int(size_mb * 2**20) // EVAL_ENTRY_BYTES)
+        self.clear()
+
+    def clear(self):
+        self._keys   = [None] * self.num_slots
+        self._scores = [0] * self.num_slots
+        self.probes  = 0
+        self.hits    = 0
+
+    def probe(self, key):
+        """Cached score for `key`, or None."""
+        self.probes += 1
+        i = key % self.num_slots
+        if self._keys[i] == key:
+            self.hits += 1
+            return self._scores[i]
+        return None
+
+    def store(self, key, score):
+        i = key % self.num_slots
+        self._keys[i]   = key
+        self._scores[i] = score
+
+
+class SharedTranspositionTable:
+    """
+    Transposition table in shared memory for multi-process search, with the
+    same probe/store interface and bucket policy as TranspositionTable.
+
+    Each slot holds `key ^ data` and `data`. A reader that sees a slot torn
+    by a concurrent writer gets a key mismatch and treats it as a miss, so
+    no locking is needed. Scores must be integers (centipawns).
+
+    Forked processes inherit the mapping; with the spawn start method the
+    table attaches to the segment by name when unpickled. Only the process
+    that created the table ages it with new_search().
+    """
+
+    def __init__(self, size_mb=DEFAULT_SIZE_MB, name=None):
+        self.size_mb     = size_mb
+        self.num_buckets = max(1, int(size_mb * 2**20) // (2 * SHARED_ENTRY_BYTES))
+        nbytes = 8 + self.num_buckets * 2 * SHARED_ENTRY_BYTES
+        # Forked children inherit this object but must not own the segment
+        self._owner_pid = os.getpid() if name is None else None
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        # Word 0 is the generation; slot i uses words 1 + 2i and 2 + 2i
+        self._words = self._shm.buf.cast("Q")
+        if self._owner:
+            self.clear()
+
+    @property
+    def _owner(self):
+        return self._owner_pid == os.getpid()
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __getstate__(self):
+        return {"size_mb": self.size_mb, "name": self.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["size_mb"], name=state["name"])
+
+    @property
+    def generation(self):
+        return self._words[0]
+
+    def clear(self):
+        self._shm.buf[:] = bytes(len(self._shm.buf))
+
+    def new_search(self):
+        if self._owner:
+            self._words[0] = (self._words[0] + 1) & 0xFF
+
+    def _read(self, slot):
+        words = self._words
+        data  = words[2 + 2 * slot]
+        if not data:
+            return None
+        return words[1 + 2 * slot] ^ data, data
+
+    def probe(self, key):
+        """Returns (key, depth, flag, score, move_code, generation) or None."""
+        key &= 0xFFFFFFFFFFFFFFFF
+        i = (key % self.num_buckets) * 2
+        for slot in (i, i + 1):
+            entry = self._read(slot)
+            if entry is not None and entry[0] == key:
+                return _unpack(key, entry[1])
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        key  &= 0xFFFFFFFFFFFFFFFF
+        i     = (key % self.num_buckets) * 2
+        gen   = self.generation
+        data  = _pack(depth, flag, score, encode_move(move), gen)
+        old   = self._read(i)
+        if old is not None:
+            _, old_depth, _, _, _, old_gen = _unpack(*old)
+        if (old is None or old[0] == key or depth >= old_depth or old_gen != gen):
+            if old is not None and old[0] != key:
+                self._write(i + 1, old[0], old[1])
+            self._write(i, key, data)
+        else:
+            self._write(i + 1, key, data)
+
+    def _write(self, slot, key, data):
+        self._words[1 + 2 * slot] = key ^ data
+        self._words[2 + 2 * slot] = data
+
+    def hashfull(self):
+        """Fraction of used slots, sampled from the first 1000."""
+        n = min(1000, 2 * self.num_buckets)
+        return sum(self._read(slot) is not None for slot in range(n)) / n
+
+    def close(self):
+        """Detach from the segment; the creating process also frees it."""
+        self._words.release()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _pack(depth, flag, score, move_code, generation):
+    score = max(-_SCORE_BIAS, min(_SCORE_BIAS - 1, int(score))) + _SCORE_BIAS
+    data  = score
+    data |= depth << _SCORE_BITS
+    data |= flag << (_SCORE_BITS + _DEPTH_BITS)
+    data |= move_code << (_SCORE_BITS + _DEPTH_BITS + _FLAG_BITS)
+    data |= generation << (_SCORE_BITS + _DEPTH_BITS + _FLAG_BITS + _MOVE_BITS)
+    # Search scores stay far above the bias floor, so 0 can mean empty
+    return data
+
+
+def _unpack(key, data):
+    score = (data & ((1 << _SCORE_BITS) - 1)) - _SCORE_BIAS
+    data >>= _SCORE_BITS
+    depth = data & ((1 << _DEPTH_BITS) - 1)
+    data >>= _DEPTH_BITS
+    flag = data & ((1 << _FLAG_BITS) - 1)
+    data >>= _FLAG_BITS
+    move_code = data & ((1 << _MOVE_BITS) - 1)
+    data >>= _MOVE_BITS
+    return key, depth, flag, score, move_code, data
@@ -0,0 +1,383 @@
+"""
+Texel-style tuning of the handcrafted evaluation weights.
+
+Quiet positions from the PGN archive (see generate_training_set.read_games)
+are labelled with their game result and reduced to compact features from
+which evaluation.evaluate_board is linear in every weight in
+evaluation.WEIGHT_NAMES:
+
+  - non-king pieces as (plane, square) codes, each adding its material
+    value plus piece-square entry,
+  - both king squares, tapered between the two king tables by game phase,
+  - the scalar terms (doubled, isolated and passed pawns, king shield,
+    central pieces, bishop pair) as signed counts.
+
+Weights are fitted by mini-batch Adam on the logistic loss between the
+result and sigmoid(K * eval), K being fitted first to the starting
+weights, then written out as a module that EVAL_WEIGHTS can load.
+The floor division in evaluation.taper is ignored, so the linear model
+matches evaluate_board to within a centipawn.
+"""
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+import chess
+import numpy as np
+
+import evaluation
+from batch_evaluation import PLANES, board_planes, _BLOCKER, _SHIELD
+from chess_engine import see
+from generate_training_set import read_games, pgn_files
+
+PIECES = (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN)
+TABLES = ("PAWN_TABLE", "KNIGHT_TABLE", "BISHOP_TABLE", "ROOK_TABLE", "QUEEN_TABLE",
+          "KING_MIDDLEGAME_TABLE", "KING_ENDGAME_TABLE")
+SCALARS = ("DOUBLED_PAWN_PENALTY", "ISOLATED_PAWN_PENALTY", "PASSED_PAWN_BASE",
+           "PASSED_PAWN_STEP", "KING_SHIELD_BONUS", "CENTER_BONUS", "BISHOP_PAIR_BONUS")
+
+# Parameter vector layout: piece values, then the tables, then the scalars
+_VALUES_AT  = slice(0, len(PIECES))
+_TABLES_AT  = slice(_VALUES_AT.stop, _VALUES_AT.stop + 64 * len(TABLES))
+_SCALARS_AT = slice(_TABLES_AT.stop, _TABLES_AT.stop + len(SCALARS))
+NUM_PARAMS  = _SCALARS_AT.stop
+_KING_MG, _KING_EG = 5 * 64, 6 * 64
+
+# Non-king pieces are coded plane * 64 + square over these ten planes;
+# _NO_PIECE pads each position's list
+_PIECE_PLANES = [p for p, (color, pt) in enumerate(PLANES) if pt != chess.KING]
+_NO_PIECE     = 64 * len(_PIECE_PLANES)
+MAX_PIECES    = 30
+
+
+def _piece_indices():
+    """Sign, piece value index and table index of every non-king piece code."""
+    sign, value, table = [], [], []
+    for p in _PIECE_PLANES:
+        color, pt = PLANES[p]
+        for sq in chess.SQUARES:
+            sign.append(1.0 if color == chess.WHITE else -1.0)
+            value.append(PIECES.index(pt))
+            # White reads the tables mirrored (see evaluation.get_pst_value)
+            table.append(PIECES.index(pt) * 64 + (63 - sq if color == chess.WHITE else sq))
+    return np.array(sign), np.array(value), np.array(table)
+
+
+_SIGN, _VALUE_INDEX, _TABLE_INDEX = _piece_indices()
+
+_PHASE_PER_PLANE = np.array([evaluation.PHASE_WEIGHTS[pt] for _, pt in PLANES], dtype=np.float32)
+_CENTER = np.array([2 <= chess.square_file(sq) <= 5 and 2 <= chess.square_rank(sq) <= 5
+                    for sq in chess.SQUARES], dtype=np.float32)
+_ADVANCE = {
+    chess.WHITE: np.array([chess.square_rank(sq) for sq in chess.SQUARES], dtype=np.float32),
+    chess.BLACK: np.array([7 - chess.square_rank(sq) for sq in chess.SQUARES], dtype=np.float32),
+}
+
+
+class Features:
+    """
+    Tuning features of N positions:
+      pieces  (N, MAX_PIECES) uint16 piece codes, padded with _NO_PIECE
+      kings   (N, 2) uint8 White and Black king squares
+      phase   (N,) float32 game phase as a fraction of TOTAL_PHASE
+      dense   (N, len(SCALARS)) float32 signed counts for the scalar weights
+      results (N,) float32 game result for White: 1, 0.5 or 0
+    """
+
+    def __init__(self, pieces, kings, phase, dense, results):
+        self.pieces  = pieces
+        self.kings   = kings
+        self.phase   = phase
+        self.dense   = dense
+        self.results = results
+
+    def __len__(self):
+        return len(self.results)
+
+    def subset(self, index):
+        return Features(self.pieces[index], self.kings[index], self.phase[index],
+                        self.dense[index], self.results[index])
+
+    @classmethod
+    def concatenate(cls, parts):
+        return cls(*(np.concatenate([getattr(f, name) for f in parts])
+                     for name in ("pieces", "kings", "phase", "dense", "results")))
+
+    def save(self, path):
+        np.savez(path, pieces=self.pieces, kings=self.kings, phase=self.phase,
+                 dense=self.dense, results=self.results)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["pieces"], data["kings"], data["phase"], data["dense"], data["results"])
+
+
+def _pawn_terms(pawns, enemy, king, color):
+    """Doubled, isolated, passed and advance sums and shield count for one side."""
+    files = pawns.reshape(len(pawns), 8, 8).sum(axis=1)
+    neighbors = np.zeros_like(files)
+    neighbors[:, 1:]  += files[:, :-1]
+    neighbors[:, :-1] += files[:, 1:]
+    passed = pawns * (enemy @ _BLOCKER[color] == 0)
+    return (
+        np.where(files > 1, files, 0).sum(axis=1),
+        np.where(neighbors == 0, files, 0).sum(axis=1),
+        passed.sum(axis=1),
+        passed @ _ADVANCE[color],
+        (pawns * _SHIELD[color][king.argmax(axis=1)]).sum(axis=1) * king.any(axis=1),
+    )
+
+
+def position_features(boards, results):
+    """Features of `boards` (all with both kings) labelled with `results`."""
+    boards = list(boards)
+    n = len(boards)
+    x = board_planes(boards)
+    counts = x.sum(axis=2, dtype=np.int32)
+
+    codes = np.where(x[:, _PIECE_PLANES].reshape(n, _NO_PIECE),
+                     np.arange(_NO_PIECE, dtype=np.uint16), np.uint16(_NO_PIECE))
+    codes.sort(axis=1)
+    kings = np.stack([x[:, 5].argmax(axis=1), x[:, 11].argmax(axis=1)], axis=1).astype(np.uint8)
+    phase = np.minimum(counts @ _PHASE_PER_PLANE, evaluation.TOTAL_PHASE) / evaluation.TOTAL_PHASE
+
+    x = x.astype(np.float32)
+    white = _pawn_terms(x[:, 0], x[:, 6], x[:, 5], chess.WHITE)
+    black = _pawn_terms(x[:, 6], x[:, 0], x[:, 11], chess.BLACK)
+    doubled, isolated, passed, advance, shield = (w - b for w, b in zip(white, black))
+    center = x[:, 1:5].sum(axis=1) @ _CENTER - x[:, 7:11].sum(axis=1) @ _CENTER
+    pair   = (counts[:, 2] >= 2).astype(np.float32) - (counts[:, 8] >= 2)
+
+    dense = np.stack([-doubled, -isolated, passed, advance, shield * phase, center, pair], axis=1)
+    return Features(codes[:, :MAX_PIECES], kings, phase.astype(np.float32),
+                    dense.astype(np.float32), np.asarray(results, dtype=np.float32))
+
+
+def is_quiet(board):
+    """
+    True if the static evaluation can stand for the game result here: the
+    side to move is not in check, has a legal move, cannot win material
+    with a capture, and there is mating material on the board.
+    """
+    if board.is_check() or board.is_insufficient_material():
+        return False
+    if not any(board.generate_legal_moves()):
+        return False
+    return all(see(board, move) <= 0 for move in board.generate_legal_captures())
+
+
+def quiet_positions(path, skip_plies=8):
+    """
+    Yields (board, result) for the quiet positions of every game in the PGN
+    file `path` after the first `skip_plies` plies, result being 1, 0.5 or
+    0 for White. The board is a copy without move stack.
+    """
+    for game, label in read_games(path):
+        result = (label + 1) / 2
+        board  = game.board()
+        for ply, move in enumerate(game.mainline_moves(), 1):
+            board.push(move)
+            if ply > skip_plies and is_quiet(board):
+                yield board.copy(stack=False), result
+
+
+def _collect_file(path, max_positions=None, skip_plies=8, chunk_size=50000):
+    """Features of up to `max_positions` quiet positions of one PGN file."""
+    parts, boards, results = [], [], []
+    for board, result in quiet_positions(path, skip_plies):
+        boards.append(board)
+        results.append(result)
+        if len(boards) == chunk_size:
+            parts.append(position_features(boards, results))
+            boards, results = [], []
+        if max_positions is not None and sum(map(len, parts)) + len(boards) >= max_positions:
+            break
+    if boards or not parts:
+        parts.append(position_features(boards, results))
+    return Features.concatenate(parts)
+
+
+def collect(data_folder="data", max_positions=None, skip_plies=8, workers=None):
+    """
+    Features of up to `max_positions` quiet positions from the PGN files of
+    `data_folder`. Parsing and filtering dominate, so files are read by a
+    pool of `workers` processes (one per CPU by default, 1 to stay in process).
+    """
+    paths = pgn_files(data_folder)
+    jobs  = [(path, max_positions, skip_plies) for path in paths]
+    if workers == 1 or len(paths) <= 1:
+        parts = []
+        for job in jobs:
+            parts.append(_collect_file(*job))
+            if max_positions is not None and sum(map(len, parts)) >= max_positions:
+                break
+    else:
+        with Pool(workers) as pool:
+            parts = pool.starmap(_collect_file, jobs)
+    if not parts:
+        parts = [position_features([], [])]
+    features = Features.concatenate(parts)
+    if max_positions is not None and len(features) > max_positions:
+        features = features.subset(slice(0, max_positions))
+    return features
+
+
+def initial_weights():
+    """Parameter vector of the weights evaluation.py is running with."""
+    theta = np.zeros(NUM_PARAMS)
+    theta[_VALUES_AT]  = [evaluation.PIECE_VALUES[pt] for pt in PIECES]
+    theta[_TABLES_AT]  = np.concatenate([getattr(evaluation, name) for name in TABLES])
+    theta[_SCALARS_AT] = [getattr(evaluation, name) for name in SCALARS]
+    return theta
+
+
+def predict(theta, features):
+    """Linear evaluation (centipawns, White's view) of every position."""
+    tables = theta[_TABLES_AT]
+    per_code = np.append(_SIGN * (theta[_VALUES_AT][_VALUE_INDEX] + tables[_TABLE_INDEX]), 0.0)
+    white_king = 63 - features.kings[:, 0].astype(np.intp)
+    black_king = features.kings[:, 1].astype(np.intp)
+    phase = features.phase
+    return (
+        per_code[features.pieces].sum(axis=1)
+        + phase * (tables[_KING_MG + white_king] - tables[_KING_MG + black_king])
+        + (1 - phase) * (tables[_KING_EG + white_king] - tables[_KING_EG + black_king])
+        + features.dense @ theta[_SCALARS_AT]
+    )
+
+
+def gradient(features, grad_score):
+    """Gradient of the parameters given d(loss)/d(score) for every position."""
+    num_tables = _TABLES_AT.stop - _TABLES_AT.start
+    per_code = np.bincount(features.pieces.ravel(), np.repeat(grad_score, features.pieces.shape[1]),
+                           minlength=_NO_PIECE + 1)[:_NO_PIECE] * _SIGN
+    white_king = 63 - features.kings[:, 0].astype(np.intp)
+    black_king = features.kings[:, 1].astype(np.intp)
+    mg = grad_score * features.phase
+    eg = grad_score - mg
+    kings = (np.bincount(_KING_MG + white_king, mg, num_tables)
+             - np.bincount(_KING_MG + black_king, mg, num_tables)
+             + np.bincount(_KING_EG + white_king, eg, num_tables)
+             - np.bincount(_KING_EG + black_king, eg, num_tables))
+
+    grad = np.empty(NUM_PARAMS)
+    grad[_VALUES_AT]  = np.bincount(_VALUE_INDEX, per_code, len(PIECES))
+    grad[_TABLES_AT]  = np.bincount(_TABLE_INDEX, per_code, num_tables) + kings
+    grad[_SCALARS_AT] = features.dense.T.astype(np.float64) @ grad_score
+    return grad
+
+
+def _scale(k):
+    """Logit per centipawn of sigmoid(K * eval), a 10-based logistic over 400cp."""
+    return k * np.log(10) / 400
+
+
+def loss(theta, features, k, batch_size=262144):
+    """Mean logistic (cross-entropy) loss of the results under sigmoid(K * eval)."""
+    total = 0.0
+    for start in range(0, len(features), batch_size):
+        part = features.subset(slice(start, start + batch_size))
+        z = _scale(k) * predict(theta, part)
+        # log(1 + e^z) - y * z, the cross-entropy of sigmoid(z) against y
+        total += float((np.logaddexp(0, z) - part.results * z).sum())
+    return total / max(1, len(features))
+
+
+def fit_k(theta, features, low=0.1, high=3.0, steps=30):
+    """K minimizing the loss of `theta`: a coarse scan, then a finer one."""
+    for _ in range(2):
+        grid = np.linspace(low, high, steps)
+        best = min(grid, key=lambda k: loss(theta, features, k))
+        width = (high - low) / (steps - 1)
+        low, high = max(1e-3, best - width), best + width
+    return float(best)
+
+
+def tune(features, theta=None, k=None, epochs=10, batch_size=16384, lr=1.0,
+         seed=0, log=print):
+    """
+    Fits the weights to `features` by mini-batch Adam. Returns (theta, k,
+    losses) where losses holds the loss before training and after each epoch.
+    """
+    theta = initial_weights() if theta is None else np.array(theta, dtype=np.float64)
+    if k is None:
+        k = fit_k(theta, features)
+    rng = np.random.default_rng(seed)
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    m = np.zeros_like(theta)
+    v = np.zeros_like(theta)
+    step = 0
+    losses = [loss(theta, features, k)]
+    log(f"K = {k:.3f}, initial loss {losses[0]:.6f}")
+
+    for epoch in range(1, epochs + 1):
+        start = time.perf_counter()
+        order = rng.permutation(len(features))
+        for first in range(0, len(features), batch_size):
+            batch = features.subset(order[first:first + batch_size])
+            z = _scale(k) * predict(theta, batch)
+            grad_score = (1 / (1 + np.exp(-z)) - batch.results) * _scale(k) / len(batch)
+            grad = gradient(batch, grad_score)
+
+            step += 1
+            m = beta1 * m + (1 - beta1) * grad
+            v = beta2 * v + (1 - beta2) * grad * grad
+            theta -= lr * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+        losses.append(loss(theta, features, k))
+        log(f"epoch {epoch}: loss {losses[-1]:.6f} ({time.perf_counter() - start:.1f}s)")
+    return theta, k, losses
+
+
+def _format_table(name, values):
+    rows = [values[i:i + 8] for i in range(0, 64, 8)]
+    body = "\n".join("    " + ", ".join(f"{v:3d}" for v in row) + "," for row in rows)
+    return f"{name} = [\n{body}\n]\n"
+
+
+def write_weights(theta, path, comment=""):
+    """Writes `theta`, rounded to centipawns, as a module of WEIGHT_NAMES."""
+    ints = [int(round(v)) for v in theta]
+    values = dict(zip(PIECES, ints[_VALUES_AT]))
+    tables = ints[_TABLES_AT]
+    lines = [f'"""\nTuned evaluation weights, written by tune_eval.py.\n{comment}\n"""',
+             "import chess", "",
+             "PIECE_VALUES = {"]
+    lines += [f"    chess.{chess.piece_name(pt).upper()}: {values[pt]}," for pt in PIECES]
+    lines += ["    chess.KING: 0,", "}", "", "# fmt: off"]
+    for i, name in enumerate(TABLES):
+        lines.append(_format_table(name, tables[i * 64:(i + 1) * 64]))
+    lines.append("# fmt: on\n")
+    width = max(len(name) for name in SCALARS)
+    lines += [f"{name:<{width}} = {value}" for name, value in zip(SCALARS, ints[_SCALARS_AT])]
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune evaluation weights on PGN results")
+    parser.add_argument("--data", default="data", help="folder of .pgn files")
+    parser.add_argument("--features", help="cache of extracted features (.npz), built if missing")
+    parser.add_argument("--max-positions", type=int)
+    parser.add_argument("--skip-plies", type=int, default=8)
+    parser.add_argument("--workers", type=int, help="processes reading PGN files (default: all CPUs)")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=16384)
+    parser.add_argument("--lr", type=float, default=1.0)
+    parser.add_argument("--out", default="tuned_weights.py")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.features and os.path.exists(args.features):
+        features = Features.load(args.features)
+    else:
+        features = collect(args.data, args.max_positions, args.skip_plies, args.workers)
+        if args.features:
+            features.save(args.features)
+    print(f"{len(features)} quiet positions ({time.perf_counter() - start:.1f}s)")
+
+    theta, k, losses = tune(features, epochs=args.epochs, batch_size=args.batch_size, lr=args.lr)
+    write_weights(theta, args.out,
+                  f"{len(features)} positions, K = {k:.3f}, loss {losses[0]:.6f} -> {losses[-1]:.6f}")
+    print(f"Wrote {args.out}; load it with EVAL_WEIGHTS={os.path.splitext(os.path.basename(args.out))[0]}")
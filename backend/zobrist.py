@@ -0,0 +1,59 @@
+"""
+Polyglot-compatible Zobrist keys, updated incrementally as moves are pushed.
+Keys match chess.polyglot.zobrist_hash for the same position.
+"""
+import chess
+from chess.polyglot import POLYGLOT_RANDOM_ARRAY, ZobristHasher
+
+_hasher = ZobristHasher(POLYGLOT_RANDOM_ARRAY)
+
+# PIECE_KEYS[color][piece_type][square], using the polyglot piece ordering
+PIECE_KEYS = [
+    [None] + [
+        POLYGLOT_RANDOM_ARRAY[64 * ((piece_type - 1) * 2 + color):][:64]
+        for piece_type in chess.PIECE_TYPES
+    ]
+    for color in (chess.BLACK, chess.WHITE)
+]
+TURN_KEY = POLYGLOT_RANDOM_ARRAY[780]
+
+
+def zobrist_key(board):
+    """Full Zobrist key of a position (same value as chess.polyglot.zobrist_hash)."""
+    return _hasher(board)
+
+
+def push(board, move, key):
+    """
+    Push `move` on `board` and return the key of the resulting position,
+    given `key` for the current one. Null moves are supported.
+    """
+    key ^= _hasher.hash_castling(board) ^ _hasher.hash_ep_square(board)
+
+    if move:
+        color      = board.turn
+        keys       = PIECE_KEYS[color]
+        from_sq    = move.from_square
+        to_sq      = move.to_square
+        piece_type = board.piece_type_at(from_sq)
+        key ^= keys[piece_type][from_sq]
+
+        if piece_type == chess.KING and board.is_castling(move):
+            back_rank = from_sq & ~7
+            if board.is_kingside_castling(move):
+                king_to, rook_from, rook_to = back_rank + 6, back_rank + 7, back_rank + 5
+            else:
+                king_to, rook_from, rook_to = back_rank + 2, back_rank, back_rank + 3
+            key ^= keys[chess.KING][king_to]
+            key ^= keys[chess.ROOK][rook_from] ^ keys[chess.ROOK][rook_to]
+        else:
+            captured = board.piece_type_at(to_sq)
+            if captured:
+                key ^= PIECE_KEYS[not color][captured][to_sq]
+            elif piece_type == chess.PAWN and board.is_en_passant(move):
+                cap_sq = to_sq - 8 if color == chess.WHITE else to_sq + 8
+                key ^= PIECE_KEYS[not color][chess.PAWN][cap_sq]
+            key ^= keys[move.promotion or piece_type][to_sq]
+
+    board.push(move)
+    return key ^ _hasher.hash_castling(board) ^ _hasher.hash_ep_square(board) ^ TURN_KEY